@@ -0,0 +1,99 @@
+"""
+Micro-benchmark of trick resolution and hand serialization.
+
+Compares the table-driven implementations in :mod:`onze.cards` with the
+previous closure-based ones, which are reproduced below for reference.
+Run with ``hatch run dev:bench``.
+"""
+from random import Random
+from timeit import Timer
+from onze.cards import (
+    Card,
+    Hand,
+    Trick,
+    cards,
+    card_indices,
+    hand_to_mask,
+    ranks,
+    score_trick,
+    score_trick_indices,
+    scores,
+    suits,
+)
+from onze.protocol import write_hand, write_hand_mask, write_trick
+
+
+def legacy_make_card_key(follow: str | None = None, trump: str | None = None):
+    def card_key(card):
+        if card.suit == trump:
+            order = 5
+        elif card.suit == follow:
+            order = 4
+        else:
+            order = suits.index(card.suit)
+
+        return len(ranks) * order + ranks.index(card.rank)
+
+    return card_key
+
+
+def legacy_score_card(card: Card) -> int:
+    return scores[ranks.index(card.rank)]
+
+
+def legacy_score_trick(trick: Trick, trump: str | None = None) -> tuple[int, int]:
+    total = sum(map(legacy_score_card, trick))
+    follow = trick[0].suit
+    max_card = max(trick, key=legacy_make_card_key(follow, trump))
+    return total, trick.index(max_card)
+
+
+def legacy_write_hand(hand: Hand) -> str:
+    return write_trick(sorted(hand, key=legacy_make_card_key()))
+
+
+def measure(label: str, func, count: int) -> None:
+    timer = Timer(func)
+    number, _ = timer.autorange()
+    best = min(timer.repeat(repeat=5, number=number))
+    print(f"{label:<32} {best / number / count * 1e9:8.1f} ns")
+
+
+def main() -> None:
+    random = Random(42)
+    tricks = [random.sample(cards, 4) for _ in range(1000)]
+    trumps = [random.choice(suits) for _ in tricks]
+    index_tricks = [[card_indices[card] for card in trick] for trick in tricks]
+    index_trumps = [suits.index(trump) for trump in trumps]
+    hands = [set(random.sample(cards, 10)) for _ in range(1000)]
+    masks = list(map(hand_to_mask, hands))
+
+    print("per trick:")
+    measure(
+        "score_trick (before)",
+        lambda: list(map(legacy_score_trick, tricks, trumps)),
+        len(tricks),
+    )
+    measure(
+        "score_trick (after)",
+        lambda: list(map(score_trick, tricks, trumps)),
+        len(tricks),
+    )
+    measure(
+        "score_trick_indices",
+        lambda: list(map(score_trick_indices, index_tricks, index_trumps)),
+        len(tricks),
+    )
+
+    print("per hand:")
+    measure(
+        "write_hand (before)",
+        lambda: list(map(legacy_write_hand, hands)),
+        len(hands),
+    )
+    measure("write_hand (after)", lambda: list(map(write_hand, hands)), len(hands))
+    measure("write_hand_mask", lambda: list(map(write_hand_mask, masks)), len(masks))
+
+
+if __name__ == "__main__":
+    main()
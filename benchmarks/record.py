@@ -0,0 +1,85 @@
+"""
+Benchmark of binary game records.
+
+Records games with random moves to a temporary file, then measures how fast
+records are iterated over and decoded. Run with ``hatch run dev:bench``.
+"""
+import tempfile
+import time
+from pathlib import Path
+from random import Random
+from onze import game
+from onze.cards import Card, Hands, cards, deal_random_hands
+from onze.record import (
+    GameRecord,
+    GameRecorder,
+    RecordWriter,
+    iter_records,
+    read_record,
+)
+
+
+def record_random_game(seed: int) -> GameRecord:
+    deal_random = Random(seed)
+    move_random = Random(seed + 1)
+    recorder = GameRecorder(["a", "b", "c", "d"], seed)
+
+    def deal_hands() -> Hands:
+        hands = deal_random_hands(deal_random)
+        recorder.deal(hands)
+        return hands
+
+    def query_bid(player: int) -> int:
+        return move_random.choice((0, 0, 0, 50, 55, 60, 70, 80))
+
+    def query_card(player: int) -> Card | None:
+        return move_random.choice(cards)
+
+    scores = game.play_sync(
+        starter=0,
+        deal_hands=deal_hands,
+        query_bid=query_bid,
+        reply_bid=recorder.bid,
+        query_card=query_card,
+        reply_card=recorder.card,
+        winning_score=500,
+    )
+    return recorder.finish(scores)
+
+
+def measure(label: str, func, count: int) -> None:
+    best = float("inf")
+
+    for _ in range(5):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+
+    print(f"{label:<32} {count / best:12,.0f} records/s")
+
+
+def main() -> None:
+    records = [record_random_game(seed) for seed in range(1000)]
+    rounds = sum(len(record.rounds) for record in records)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / "games.rec"
+
+        with RecordWriter(path) as writer:
+            for record in records:
+                writer.write(record)
+
+        size = path.stat().st_size
+        print(f"{len(records)} games, {rounds} rounds, {size / rounds:.1f} bytes/round")
+        measure(
+            "iter_records", lambda: sum(1 for _ in iter_records(path)), len(records)
+        )
+        measure(
+            "iter_records + read_record",
+            lambda: [read_record(data) for data in iter_records(path)],
+            len(records),
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+"""
+Benchmark of the double-dummy solver on full deals.
+
+Solves the first deals dealt from consecutive seeds and reports the number
+of visited positions and the time taken for each one. Run with
+``hatch run dev:bench``, or ``python benchmarks/solver.py COUNT`` to change
+the number of deals.
+"""
+import sys
+import time
+from random import Random
+from statistics import median
+from onze.cards import deal_random_masks
+from onze.game import GameState
+from onze.solver import Solver
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 12
+    nodes = []
+    durations = []
+
+    for seed in range(count):
+        hands = deal_random_masks(Random(seed))
+        solver = Solver()
+        start = time.perf_counter()
+        value = solver.solve(GameState(seed % 4, hands))
+        durations.append(time.perf_counter() - start)
+        nodes.append(solver.nodes)
+        print(
+            f"seed {seed:<4} value {value:<4} {nodes[-1]:10,} nodes {durations[-1]:8.2f} s"
+        )
+
+    print(f"median {median(nodes):12,.0f} nodes {median(durations):8.2f} s")
+    print(f"max    {max(nodes):12,} nodes {max(durations):8.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,8 +4,22 @@ from sys import stderr
 # (the default standard output is used for communicating with the judge)
 print("this is an example bot", file=stderr)
 
+# Our player number in the current game, until the judge gives it to us
+player = None
+
 # Read the next command from the judge until the "end" command is received
 while (message := input()) != "end":
+    # A new game starts with this same process; since this bot listed
+    # "newgame" in its features file, it will receive another "player"
+    # command and must forget everything about the previous game
+    if message == "newgame":
+        player = None
+
+    # The judge tells us our player number for this game
+    if message.startswith("player "):
+        player = int(message.split()[1])
+        print(f"playing as player {player}", file=stderr)
+
     # The judge asks us to make a bid in the upcoming round
     if message == "bid ?":
         # We pass by replying with 0
@@ -0,0 +1,557 @@
+from collections.abc import Callable, Sequence
+from dataclasses import dataclass
+from random import Random
+from typing import Any
+from .cards import (
+    cards,
+    card_scores,
+    card_strengths,
+    deal_random_masks,
+    ranks,
+    score_trick_indices,
+    suit_masks,
+    suits,
+)
+from .game import Scores, _add_round_scores, _is_over
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None  # type: ignore
+
+
+@dataclass
+class BatchState:
+    """
+    State of a batch of games played in lockstep.
+
+    Per-game values are stored in NumPy arrays if the vectorized engine is in
+    use, or in lists otherwise. In both cases, the value for game `g` and
+    player `p` is found at `[g][p]`.
+    """
+
+    # Number of games in the batch
+    size: int
+
+    # Bitmask of the cards remaining in each player’s hand
+    hands: Any
+
+    # Player who started the bidding of the current round
+    starters: Any
+
+    # Highest bid of each player in the current bidding (0 if none)
+    bids: Any
+
+    # Whether each player is still taking part in the current bidding
+    pending: Any
+
+    # Winner of the current bidding (-1 while bidding is in progress)
+    bidders: Any
+
+    # Winning bid of the current round (0 while bidding is in progress)
+    bid_values: Any
+
+    # Player who played the first card of the current trick
+    leaders: Any
+
+    # Card indices of the current trick in play order (-1 if not played yet)
+    tricks: Any
+
+    # Number of cards played in the current trick, same for all games
+    trick_size: int
+
+    # Index of the trump suit (len(suits) if no card was played yet)
+    trumps: Any
+
+    # Bitmask of the cards played in the current round
+    played: Any
+
+    # Points collected by each team in the current round
+    round_scores: Any
+
+    # Total score of each team
+    total_scores: Any
+
+    # Number of rounds played in each game
+    rounds: Any
+
+
+QueryBids = Callable[[int, Sequence[int], BatchState], Sequence[int]]
+QueryCards = Callable[[int, Sequence[int], BatchState], Sequence[int]]
+
+
+def play_batch(
+    randoms: Sequence[Random],
+    query_bids: QueryBids,
+    query_cards: QueryCards,
+    starter: int = 0,
+    max_rounds: int | None = None,
+    winning_score: int | None = None,
+    vectorize: bool | None = None,
+) -> list[Scores]:
+    """
+    Run a batch of independent games in lockstep and return their scores.
+
+    Each game follows the same rules as :func:`game.play()` and deals its
+    hands from its own randomness source, so that a game gives the same
+    results as if it was played on its own. Strategies are asked for the
+    decisions of one player in a whole set of games at once.
+
+    :param randoms: randomness source of each game (this sets the batch size)
+    :param query_bids: called with a player, a sequence of game indices and
+        the batch state to request the bid of that player in each game
+        (invalid bids are silently replaced by a pass)
+    :param query_cards: called with a player, a sequence of game indices and
+        the batch state to request the index of the card played by that player
+        in each game (invalid cards are silently replaced with a valid one)
+    :param starter: initial player of each game (rotates at each round)
+    :param max_rounds: (see :func:`game.play()`)
+    :param winning_score: (see :func:`game.play()`)
+    :param vectorize: whether to use the NumPy-based engine, or None to use it
+        only if NumPy is available
+    :returns: final scores of the two teams in each game
+    """
+    if vectorize is None:
+        vectorize = numpy is not None
+
+    if vectorize and numpy is None:
+        raise RuntimeError("the vectorized engine requires NumPy")
+
+    if vectorize:
+
+        def deal(active: Any) -> Any:
+            return [deal_random_masks(randoms[game]) for game in active]
+
+        return _play_numpy(
+            len(randoms),
+            deal,
+            query_bids,
+            query_cards,
+            starter,
+            max_rounds,
+            winning_score,
+        )
+
+    return _play_python(
+        randoms,
+        query_bids,
+        query_cards,
+        starter,
+        max_rounds,
+        winning_score,
+    )
+
+
+def play_batch_numpy(
+    generator: "numpy.random.Generator",
+    size: int,
+    query_bids: QueryBids,
+    query_cards: QueryCards,
+    starter: int = 0,
+    max_rounds: int | None = None,
+    winning_score: int | None = None,
+) -> list[Scores]:
+    """
+    Run a batch of independent games in lockstep, dealing all hands at once.
+
+    This works like :func:`play_batch()` with the vectorized engine, but deals
+    the hands of all games from a single NumPy generator, which is much faster
+    but does not deal the same hands as :func:`game.play()`.
+
+    :param generator: randomness source of the whole batch
+    :param size: number of games in the batch
+    :param query_bids: (see :func:`play_batch()`)
+    :param query_cards: (see :func:`play_batch()`)
+    :param starter: (see :func:`play_batch()`)
+    :param max_rounds: (see :func:`game.play()`)
+    :param winning_score: (see :func:`game.play()`)
+    :returns: final scores of the two teams in each game
+    """
+    if numpy is None:
+        raise RuntimeError("the vectorized engine requires NumPy")
+
+    def deal(active: Any) -> Any:
+        return _deal_numpy(generator, len(active))
+
+    return _play_numpy(
+        size,
+        deal,
+        query_bids,
+        query_cards,
+        starter,
+        max_rounds,
+        winning_score,
+    )
+
+
+def _play_python(
+    randoms: Sequence[Random],
+    query_bids: QueryBids,
+    query_cards: QueryCards,
+    starter: int,
+    max_rounds: int | None,
+    winning_score: int | None,
+) -> list[Scores]:
+    size = len(randoms)
+    state = BatchState(
+        size=size,
+        hands=[[0] * 4 for _ in range(size)],
+        starters=[starter] * size,
+        bids=[[0] * 4 for _ in range(size)],
+        pending=[[True] * 4 for _ in range(size)],
+        bidders=[-1] * size,
+        bid_values=[0] * size,
+        leaders=[0] * size,
+        tricks=[[-1] * 4 for _ in range(size)],
+        trick_size=0,
+        trumps=[len(suits)] * size,
+        played=[0] * size,
+        round_scores=[{0: 0, 1: 0} for _ in range(size)],
+        total_scores=[{0: 0, 1: 0} for _ in range(size)],
+        rounds=[0] * size,
+    )
+    active = [
+        game
+        for game in range(size)
+        if not _is_over(state.total_scores[game], 0, max_rounds, winning_score)
+    ]
+
+    while active:
+        for game in active:
+            state.hands[game] = list(deal_random_masks(randoms[game]))
+            state.bids[game] = [0] * 4
+            state.pending[game] = [True] * 4
+            state.bidders[game] = -1
+            state.bid_values[game] = 0
+            state.trumps[game] = len(suits)
+            state.played[game] = 0
+            state.round_scores[game] = {0: 0, 1: 0}
+
+        _bid_python(state, active, query_bids)
+
+        for game in active:
+            state.leaders[game] = state.bidders[game]
+
+        _round_python(state, active, query_cards)
+
+        for game in active:
+            _add_round_scores(
+                state.total_scores[game],
+                state.bidders[game],
+                state.bid_values[game],
+                state.round_scores[game],
+            )
+            state.starters[game] = (state.starters[game] + 1) % 4
+            state.rounds[game] += 1
+
+        active = [
+            game
+            for game in active
+            if not _is_over(
+                state.total_scores[game],
+                state.rounds[game],
+                max_rounds,
+                winning_score,
+            )
+        ]
+
+    return state.total_scores
+
+
+def _bid_python(state: BatchState, active: list[int], query_bids: QueryBids) -> None:
+    current = {game: state.starters[game] for game in active}
+    minimum_bids = {game: 50 for game in active}
+
+    while current:
+        by_player: list[list[int]] = [[] for _ in range(4)]
+
+        for game, player in current.items():
+            by_player[player].append(game)
+
+        for player, games in enumerate(by_player):
+            if not games:
+                continue
+
+            for game, bid_value in zip(games, query_bids(player, games, state)):
+                pending = state.pending[game]
+
+                if bid_value % 5 == 0 and minimum_bids[game] <= bid_value <= 105:
+                    state.bids[game][player] = bid_value
+                    minimum_bids[game] = bid_value + 5
+                else:
+                    pending[player] = False
+
+                if pending.count(True) == 1:
+                    winner = pending.index(True)
+                    state.bidders[game] = winner
+                    state.bid_values[game] = state.bids[game][winner] or 50
+                    del current[game]
+                else:
+                    bidder = (player + 1) % 4
+
+                    while not pending[bidder]:
+                        bidder = (bidder + 1) % 4
+
+                    current[game] = bidder
+
+
+def _round_python(
+    state: BatchState, active: list[int], query_cards: QueryCards
+) -> None:
+    for step in range(len(cards)):
+        trick_size = step % 4
+        state.trick_size = trick_size
+        by_player: list[list[int]] = [[] for _ in range(4)]
+
+        for game in active:
+            by_player[(state.leaders[game] + trick_size) % 4].append(game)
+
+        for player, games in enumerate(by_player):
+            if not games:
+                continue
+
+            for game, card in zip(games, query_cards(player, games, state)):
+                hand = state.hands[game][player]
+                trick = state.tricks[game]
+
+                if trick_size == 0:
+                    playable = hand
+                else:
+                    playable = hand & suit_masks[trick[0] // len(ranks)] or hand
+
+                if not (0 <= card < len(cards) and playable >> card & 1):
+                    card = (playable & -playable).bit_length() - 1
+
+                state.hands[game][player] = hand ^ 1 << card
+                state.played[game] |= 1 << card
+                trick[trick_size] = card
+
+                if step == 0:
+                    state.trumps[game] = card // len(ranks)
+
+        if trick_size == 3:
+            for game in active:
+                score, winner = score_trick_indices(
+                    state.tricks[game], state.trumps[game]
+                )
+                winner = (state.leaders[game] + winner) % 4
+                state.round_scores[game][winner % 2] += score
+                state.leaders[game] = winner
+                state.tricks[game] = [-1] * 4
+
+    state.trick_size = 0
+
+
+def _play_numpy(
+    size: int,
+    deal: Callable[[Any], Any],
+    query_bids: QueryBids,
+    query_cards: QueryCards,
+    starter: int,
+    max_rounds: int | None,
+    winning_score: int | None,
+) -> list[Scores]:
+    state = BatchState(
+        size=size,
+        hands=numpy.zeros((size, 4), dtype=numpy.int64),
+        starters=numpy.full(size, starter, dtype=numpy.int64),
+        bids=numpy.zeros((size, 4), dtype=numpy.int64),
+        pending=numpy.ones((size, 4), dtype=bool),
+        bidders=numpy.full(size, -1, dtype=numpy.int64),
+        bid_values=numpy.zeros(size, dtype=numpy.int64),
+        leaders=numpy.zeros(size, dtype=numpy.int64),
+        tricks=numpy.full((size, 4), -1, dtype=numpy.int64),
+        trick_size=0,
+        trumps=numpy.full(size, len(suits), dtype=numpy.int64),
+        played=numpy.zeros(size, dtype=numpy.int64),
+        round_scores=numpy.zeros((size, 2), dtype=numpy.int64),
+        total_scores=numpy.zeros((size, 2), dtype=numpy.int64),
+        rounds=numpy.zeros(size, dtype=numpy.int64),
+    )
+    active = _filter_active_numpy(state, numpy.arange(size), max_rounds, winning_score)
+
+    while len(active):
+        state.hands[active] = deal(active)
+        state.bids[active] = 0
+        state.pending[active] = True
+        state.bidders[active] = -1
+        state.bid_values[active] = 0
+        state.trumps[active] = len(suits)
+        state.played[active] = 0
+        state.round_scores[active] = 0
+
+        _bid_numpy(state, active, query_bids)
+        state.leaders[active] = state.bidders[active]
+        _round_numpy(state, active, query_cards)
+
+        bidders = state.bidders[active]
+        bid_values = state.bid_values[active]
+        bidding_teams = bidders % 2
+        other_teams = 1 - bidding_teams
+        bidding_scores = state.round_scores[active, bidding_teams]
+        other_scores = state.round_scores[active, other_teams]
+        other_totals = state.total_scores[active, other_teams]
+        full_game = bid_values == 105
+
+        state.total_scores[active, bidding_teams] += numpy.where(
+            full_game,
+            numpy.where(bidding_scores < 100, 0, 500),
+            numpy.where(bidding_scores < bid_values, -bid_values, bidding_scores),
+        )
+        state.total_scores[active, other_teams] += numpy.where(
+            full_game,
+            numpy.where(bidding_scores < 100, 500, 0),
+            numpy.where(other_totals < 400, other_scores, 0),
+        )
+        state.starters[active] = (state.starters[active] + 1) % 4
+        state.rounds[active] += 1
+
+        active = _filter_active_numpy(state, active, max_rounds, winning_score)
+
+    return [{0: int(team0), 1: int(team1)} for team0, team1 in state.total_scores]
+
+
+def _deal_numpy(generator: Any, count: int) -> Any:
+    # Shuffle the card indices of each game and give ten cards to each player
+    order = generator.permuted(
+        numpy.broadcast_to(numpy.arange(len(cards)), (count, len(cards))), axis=1
+    )
+    bits = numpy.left_shift(1, order).reshape(count, 4, len(cards) // 4)
+    return bits.sum(axis=2)
+
+
+def _filter_active_numpy(
+    state: BatchState,
+    active: Any,
+    max_rounds: int | None,
+    winning_score: int | None,
+) -> Any:
+    over = numpy.zeros(len(active), dtype=bool)
+
+    if max_rounds is not None:
+        over |= state.rounds[active] > max_rounds
+
+    if winning_score is not None:
+        over |= (state.total_scores[active] >= winning_score).any(axis=1)
+
+    return active[~over]
+
+
+# Next player still taking part in the bidding after a given player, indexed
+# by the bitmask of players still bidding and by the current player
+_next_bidders = tuple(
+    tuple(
+        next(
+            (
+                (player + offset) % 4
+                for offset in range(1, 5)
+                if pending >> (player + offset) % 4 & 1
+            ),
+            -1,
+        )
+        for player in range(4)
+    )
+    for pending in range(16)
+)
+
+
+def _bid_numpy(state: BatchState, active: Any, query_bids: QueryBids) -> None:
+    next_bidders = numpy.array(_next_bidders, dtype=numpy.int64)
+    player_bits = numpy.array([1, 2, 4, 8], dtype=numpy.int64)
+    current = state.starters[active].copy()
+    minimum_bids = numpy.full(len(active), 50, dtype=numpy.int64)
+
+    while len(active):
+        for player in range(4):
+            (selected,) = (current == player).nonzero()
+
+            if not len(selected):
+                continue
+
+            games = active[selected]
+            bid_values = numpy.asarray(
+                query_bids(player, games, state), dtype=numpy.int64
+            )
+            minimums = minimum_bids[selected]
+            valid = (bid_values % 5 == 0) & (minimums <= bid_values)
+            valid &= bid_values <= 105
+
+            state.bids[games, player] = numpy.where(
+                valid, bid_values, state.bids[games, player]
+            )
+            state.pending[games, player] = valid
+            minimum_bids[selected] = numpy.where(valid, bid_values + 5, minimums)
+
+            pending = state.pending[games]
+            current[selected] = next_bidders[pending @ player_bits, player]
+            done = pending.sum(axis=1) == 1
+
+            if done.any():
+                winners = pending[done].argmax(axis=1)
+                done_games = games[done]
+                bid_values = state.bids[done_games, winners]
+                state.bidders[done_games] = winners
+                state.bid_values[done_games] = numpy.where(
+                    bid_values == 0, 50, bid_values
+                )
+                current[selected[done]] = -1
+
+        remaining = current != -1
+        active = active[remaining]
+        current = current[remaining]
+        minimum_bids = minimum_bids[remaining]
+
+
+def _round_numpy(state: BatchState, active: Any, query_cards: QueryCards) -> None:
+    masks = numpy.array(suit_masks, dtype=numpy.int64)
+    strengths = numpy.array(card_strengths, dtype=numpy.int64)
+    scores = numpy.array(card_scores, dtype=numpy.int64)
+
+    for step in range(len(cards)):
+        trick_size = step % 4
+        state.trick_size = trick_size
+        movers = (state.leaders[active] + trick_size) % 4
+
+        for player in range(4):
+            games = active[movers == player]
+
+            if not len(games):
+                continue
+
+            hands = state.hands[games, player]
+
+            if trick_size == 0:
+                playable = hands
+            else:
+                follow = hands & masks[state.tricks[games, 0] // len(ranks)]
+                playable = numpy.where(follow != 0, follow, hands)
+
+            chosen = numpy.asarray(query_cards(player, games, state), dtype=numpy.int64)
+            inside = (chosen >= 0) & (chosen < len(cards))
+            valid = inside & (playable >> numpy.where(inside, chosen, 0) & 1 == 1)
+
+            # Lowest playable card, as chosen by game.round() for invalid moves
+            lowest = numpy.log2(playable & -playable).astype(numpy.int64)
+            played = numpy.where(valid, chosen, lowest)
+            bits = numpy.left_shift(1, played)
+
+            state.hands[games, player] = hands ^ bits
+            state.played[games] |= bits
+            state.tricks[games, trick_size] = played
+
+            if step == 0:
+                state.trumps[games] = played // len(ranks)
+
+        if trick_size == 3:
+            tricks = state.tricks[active]
+            follows = tricks[:, 0] // len(ranks)
+            trumps = state.trumps[active]
+            winners = strengths[follows[:, None], trumps[:, None], tricks].argmax(
+                axis=1
+            )
+            winners = (state.leaders[active] + winners) % 4
+            state.round_scores[active, winners % 2] += scores[tricks].sum(axis=1)
+            state.leaders[active] = winners
+            state.tricks[active] = -1
+
+    state.trick_size = 0
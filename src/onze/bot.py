@@ -0,0 +1,316 @@
+import argparse
+import asyncio
+import importlib
+import importlib.util
+import sys
+from asyncio import Server, StreamReader, StreamWriter, start_unix_server
+from pathlib import Path
+from collections.abc import Callable, Sequence
+from typing import BinaryIO, Protocol, TextIO
+from .cards import Card
+from .shm import Channel
+from .protocol import (
+    Command,
+    EndCommand,
+    QueryBidCommand,
+    QueryCardCommand,
+    PlayerCommand,
+    ReplyBidCommand,
+    ReplyCardCommand,
+    binary_sizes,
+    binary_version,
+    pack_command,
+    read_binary_command,
+    unpack_command,
+    write_binary_command,
+    read_address,
+    read_command,
+    write_card,
+)
+
+
+class Bot(Protocol):
+    """
+    Strategy written in Python, driven by decoded protocol commands.
+
+    The same bot can either run in the judge process through an in-process
+    seat, or in its own process through :func:`serve`, and receives the
+    same commands in the same order in both cases.
+    """
+
+    def notify(self, command: Command) -> None:
+        """
+        Receive a command which needs no answer.
+
+        All commands except the `bid ?` and `card ?` queries are notified,
+        including the final `end` or `newgame` command.
+        """
+        ...
+
+    def bid(self) -> int:
+        """Answer a `bid ?` query with a bid value."""
+        ...
+
+    def play(self) -> Card:
+        """Answer a `card ?` query with a card from the bot’s hand."""
+        ...
+
+
+def load_bot(spec: str) -> Callable[[], Bot]:
+    """
+    Find a Python bot class.
+
+    :param spec: location of the class, either as `module:Class` for a module
+        that can be imported, or as `path/to/file.py:Class` for a source file
+    :returns: bot class, which is called without arguments to create a bot
+    """
+    location, separator, name = spec.rpartition(":")
+
+    if not separator or not location or not name:
+        raise ValueError(f"invalid bot class '{spec}', expected 'module:Class'")
+
+    if location.endswith(".py"):
+        module_spec = importlib.util.spec_from_file_location(
+            Path(location).stem, location
+        )
+
+        if module_spec is None or module_spec.loader is None:
+            raise ValueError(f"cannot load bot module from '{location}'")
+
+        module = importlib.util.module_from_spec(module_spec)
+        module_spec.loader.exec_module(module)
+    else:
+        module = importlib.import_module(location)
+
+    try:
+        return getattr(module, name)
+    except AttributeError:
+        raise ValueError(f"no bot class '{name}' in '{location}'") from None
+
+
+def respond(bot: Bot, command: Command) -> str | None:
+    """
+    Hand a command to a bot.
+
+    :param bot: bot receiving the command
+    :param command: decoded command
+    :returns: serialized answer to the command, or None if it needs none
+    """
+    match command:
+        case QueryBidCommand():
+            return str(bot.bid())
+
+        case QueryCardCommand():
+            return write_card(bot.play())
+
+        case _:
+            bot.notify(command)
+            return None
+
+
+def serve(bot: Bot, input: TextIO = sys.stdin, output: TextIO = sys.stdout) -> None:
+    """
+    Run a Python bot over the textual protocol, as a bot process would.
+
+    If the judge offers a shared memory channel or the binary protocol, which
+    it only does for bots listing the `shm` or `binary` extensions in their
+    features file, the rest of the game is served through that channel (see
+    :func:`serve_channel`) or protocol (see :func:`serve_binary`).
+
+    :param bot: bot receiving the commands
+    :param input: stream from which commands are read
+    :param output: stream to which answers are written
+    """
+    player = 0
+
+    for line in input:
+        data = line.removesuffix("\n")
+
+        if data.startswith("shm "):
+            channel = Channel.attach(data)
+
+            try:
+                serve_channel(bot, channel)
+            finally:
+                channel.close()
+
+            return
+
+        if data == f"binary {binary_version}":
+            # Nothing else is sent until the bot accepts, so the text stream
+            # cannot have buffered any binary data
+            print(data, file=output, flush=True)
+            serve_binary(bot, input.buffer, output.buffer, player)
+            return
+
+        command = read_command(data)
+        answer = respond(bot, command)
+
+        if answer is not None:
+            print(answer, file=output, flush=True)
+
+        if isinstance(command, PlayerCommand):
+            player = command.player
+
+        if isinstance(command, EndCommand):
+            return
+
+
+def serve_binary(bot: Bot, input: BinaryIO, output: BinaryIO, player: int = 0) -> None:
+    """
+    Run a Python bot over the binary protocol until the game ends.
+
+    :param bot: bot receiving the commands
+    :param input: stream from which commands are read
+    :param output: stream to which answers are written
+    :param player: current player number of the bot
+    """
+    while code := input.read(1):
+        payload = input.read(binary_sizes.get(code[0], 0))
+        command = read_binary_command(code[0], payload)
+
+        match command:
+            case QueryBidCommand():
+                output.write(write_binary_command(ReplyBidCommand(player, bot.bid())))
+                output.flush()
+
+            case QueryCardCommand():
+                output.write(write_binary_command(ReplyCardCommand(player, bot.play())))
+                output.flush()
+
+            case PlayerCommand(player=number):
+                player = number
+                bot.notify(command)
+
+            case EndCommand():
+                bot.notify(command)
+                return
+
+            case _:
+                bot.notify(command)
+
+
+def serve_channel(bot: Bot, channel: Channel) -> None:
+    """
+    Run a Python bot over a shared memory channel until the game ends.
+
+    :param bot: bot receiving the commands
+    :param channel: bot’s end of the channel
+    """
+    player = 0
+
+    while True:
+        command = unpack_command(channel.receive())
+
+        match command:
+            case QueryBidCommand():
+                channel.outgoing.put(pack_command(ReplyBidCommand(player, bot.bid())))
+                channel.signal()
+
+            case QueryCardCommand():
+                channel.outgoing.put(pack_command(ReplyCardCommand(player, bot.play())))
+                channel.signal()
+
+            case PlayerCommand(player=number):
+                player = number
+                bot.notify(command)
+
+            case EndCommand():
+                bot.notify(command)
+                return
+
+            case _:
+                bot.notify(command)
+
+
+async def serve_connection(
+    factory: Callable[[], Bot], reader: StreamReader, writer: StreamWriter
+) -> None:
+    """
+    Run a fresh Python bot over a connection from the judge.
+
+    :param factory: function creating the bot
+    :param reader: stream from which commands are read
+    :param writer: stream to which answers are written
+    """
+    bot = factory()
+
+    try:
+        while line := await reader.readline():
+            command = read_command(line.decode().removesuffix("\n"))
+            answer = respond(bot, command)
+
+            if answer is not None:
+                writer.write(f"{answer}\n".encode())
+                await writer.drain()
+
+            if isinstance(command, EndCommand):
+                break
+    finally:
+        writer.close()
+
+
+async def start_server(factory: Callable[[], Bot], address: str) -> Server:
+    """
+    Start serving Python bots to judges connecting to a socket.
+
+    Each connection is a seat in a game and gets its own bot from the
+    factory, while all connections share the server process, so that
+    expensive state such as precomputed tables can be loaded once at the
+    class or module level and used by any number of concurrent games.
+    Bots run one at a time on the server’s event loop.
+
+    :param factory: function creating a bot for each connection
+    :param address: address on which to listen (see
+        :func:`protocol.read_address`)
+    :returns: running server
+    """
+
+    async def handle(reader: StreamReader, writer: StreamWriter) -> None:
+        await serve_connection(factory, reader, writer)
+
+    match read_address(address):
+        case ("unix", path):
+            return await start_unix_server(handle, path)
+
+        case ("tcp", host, port):
+            return await asyncio.start_server(handle, host, port)
+
+    raise ValueError(f"invalid address '{address}'")
+
+
+def parse_args(argv: Sequence[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="onze serve",
+        description=(
+            "Serve a Python bot class on a socket, to which judges connect "
+            "with “--seat unix:PATH” or “--seat tcp:HOST:PORT”."
+        ),
+    )
+    parser.add_argument(
+        "bot",
+        help="location of the bot class, as module:Class or path/to/file.py:Class",
+    )
+    parser.add_argument(
+        "address",
+        help="address on which to listen, as unix:PATH or tcp:HOST:PORT",
+    )
+    return parser.parse_args(argv)
+
+
+def run_server(argv: Sequence[str] | None = None) -> None:
+    """Serve a Python bot following command line arguments, until interrupted."""
+    args = parse_args(argv)
+    factory = load_bot(args.bot)
+
+    async def run() -> None:
+        server = await start_server(factory, args.address)
+        print(f"[serve] {args.bot} listening on {args.address}", file=sys.stderr)
+
+        async with server:
+            await server.serve_forever()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
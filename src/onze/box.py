@@ -4,7 +4,13 @@ import io
 from pathlib import Path
 import signal
 import select
+import socket
+import json
+import traceback
 import asyncio
+import threading
+from collections.abc import Callable
+from functools import partial
 from typing import Self
 from dataclasses import dataclass, field
 from . import linux
@@ -35,6 +41,77 @@ class Box:
     # Maximum swap usage in bytes (or -1 for no limit)
     swap_limit: int = -1
 
+    # Whether to fork the subprocess from a long-lived zygote process which
+    # is already isolated under the same root with the same mounts, instead
+    # of setting up namespaces and mounts for each subprocess
+    zygote: bool = False
+
+
+# Namespaces in which each process forked from a zygote is further isolated,
+# so that processes sharing a zygote cannot see or signal each other
+_zygote_child_flags = linux.Clone.NEWIPC | linux.Clone.NEWNET | linux.Clone.NEWPID
+
+# Namespaces in which boxed processes are isolated
+_namespace_flags = (
+    linux.Clone.NEWCGROUP
+    | linux.Clone.NEWIPC
+    | linux.Clone.NEWNET
+    | linux.Clone.NEWNS
+    | linux.Clone.NEWPID
+    | linux.Clone.NEWUSER
+    | linux.Clone.NEWUTS
+)
+
+
+def _enter_root(box: Box) -> None:
+    """Set up the mounts of a box and change the root of the current process."""
+    # The new root needs to appear as a mount point for the
+    # pivot_root call, so we start by bind-mounting it onto itself
+    mounts = [
+        Mount(
+            source=Path(box.root),
+            destination=Path("/"),
+            type="none",
+            options=["rbind", "ro"],
+        ),
+    ] + box.mounts
+
+    for mount in mounts:
+        source = mount.source if mount.source is not None else Path(mount.type)
+        destination = box.root / mount.destination.relative_to("/")
+        options = linux.Mount(0)
+
+        for option in mount.options:
+            match option:
+                case "bind":
+                    options |= linux.Mount.BIND
+
+                case "rbind":
+                    options |= linux.Mount.BIND
+                    options |= linux.Mount.REC
+
+                case "ro":
+                    options |= linux.Mount.RDONLY
+
+                case _:
+                    raise ValueError(f"unknown mount option '{option}'")
+
+        try:
+            linux.mount(source, destination, mount.type, options)
+
+            # A second syscall is needed to apply options to a bind mount
+            if "ro" in mount.options and (
+                "bind" in mount.options or "rbind" in mount.options
+            ):
+                options |= linux.Mount.REMOUNT
+                linux.mount(b"none", destination, "none", options)
+        except OSError as err:
+            raise RuntimeError(f"Failed to mount {mount}: {err.strerror}")
+
+    # Change the root to the new root and unmount the old one
+    linux.pivot_root(box.root, box.root)
+    linux.umount(Path("/"), linux.Umount.DETACH)
+
 
 class BoxedProcess:
     """Run and communicate with a subprocess running in a contained environment."""
@@ -45,6 +122,9 @@ class BoxedProcess:
     returncode: int | None
     _cgroup: Path | None
     _pidfd: int | None
+
+    # Zygote from which the process was forked, if any
+    _zygote: "Zygote | None"
     stdin: io.BufferedWriter | None
     stdout: io.BufferedReader | None
     stderr: io.BufferedReader | None
@@ -129,127 +209,114 @@ class BoxedProcess:
             case _:
                 stderr_write = stderr.fileno()
 
-        # Replace current standard streams for child process
-        old_stdin = -1
-        old_stdout = -1
-        old_stderr = -1
-
-        if stdin_read != -1:
-            old_stdin = os.dup(0)
-            os.dup2(stdin_read, 0)
-
-        if stdout_write != -1:
-            old_stdout = os.dup(1)
-            os.dup2(stdout_write, 1)
-
-        if stderr_write != -1:
-            old_stderr = os.dup(2)
-            os.dup2(stderr_write, 2)
+        self._cgroup = None
+        self._pidfd = None
+        self._zygote = None
 
         try:
-            cgroup = self._setup_cgroup()
-            pid = linux.clone(
-                flags=(
-                    linux.Clone.NEWCGROUP
-                    | linux.Clone.NEWIPC
-                    | linux.Clone.NEWNET
-                    | linux.Clone.NEWNS
-                    | linux.Clone.NEWPID
-                    | linux.Clone.NEWUSER
-                    | linux.Clone.NEWUTS
-                ),
-                cgroup=cgroup,
-            )
-            os.close(cgroup)
-
-            if pid == 0:
-                self._exec_child(cwd)
+            if box.zygote:
+                self._spawn_from_zygote(cwd, stdin_read, stdout_write, stderr_write)
             else:
-                self.pid = pid
-                self.returncode = None
-                self._pidfd = os.pidfd_open(pid)
+                self._spawn_directly(cwd, stdin_read, stdout_write, stderr_write)
 
-                # Initialize communication streams
-                if stdin_write != -1:
-                    self.stdin = open(stdin_write, "wb")
+            # Initialize communication streams
+            if stdin_write != -1:
+                self.stdin = open(stdin_write, "wb")
 
-                if stdout_read != -1:
-                    self.stdout = open(stdout_read, "rb")
+            if stdout_read != -1:
+                self.stdout = open(stdout_read, "rb")
 
-                if stderr_read != -1:
-                    self.stderr = open(stderr_read, "rb")
+            if stderr_read != -1:
+                self.stderr = open(stderr_read, "rb")
         finally:
-            # Restore original streams and close unused pipe ends
-            if old_stdin != -1:
-                os.dup2(old_stdin, 0)
-
-            if old_stdout != -1:
-                os.dup2(old_stdout, 1)
-
-            if old_stderr != -1:
-                os.dup2(old_stderr, 2)
+            # Close unused pipe ends
+            for fd in (stdin_read, stdout_write, stderr_write):
+                if fd not in (-1, devnull):
+                    os.close(fd)
+
+            os.close(devnull)
+
+    def _spawn_directly(
+        self, cwd: Path | str | None, stdin: int, stdout: int, stderr: int
+    ) -> None:
+        cgroup = self._setup_cgroup()
+        pid = linux.clone(flags=_namespace_flags, cgroup=cgroup)
+
+        if pid == 0:
+            # The child gets its own copy of the file table, in which it
+            # sets up its standard streams without affecting the judge
+            try:
+                self._exec_child(cwd, stdin, stdout, stderr)
+            except OSError:
+                traceback.print_exc()
+            finally:
+                os._exit(127)
 
-            if stdin_read != -1:
-                os.close(stdin_read)
+        os.close(cgroup)
+        self.pid = pid
+        self.returncode = None
+        self._pidfd = os.pidfd_open(pid)
 
-            if stdout_write != -1:
-                os.close(stdout_write)
+    def _exec_child(
+        self, cwd: Path | str | None, stdin: int, stdout: int, stderr: int
+    ) -> None:
+        if stdin != -1:
+            os.dup2(stdin, 0)
 
-            if stderr_write != -1:
-                os.close(stderr_write)
+        if stdout != -1:
+            os.dup2(stdout, 1)
 
-    def _exec_child(self, cwd: Path | str | None) -> None:
-        # The new root needs to appear as a mount point for the
-        # pivot_root call, so we start by bind-mounting it onto itself
-        mounts = [
-            Mount(
-                source=Path(self.box.root),
-                destination=Path("/"),
-                type="none",
-                options=["rbind", "ro"],
-            ),
-        ] + self.box.mounts
+        if stderr != -1:
+            os.dup2(stderr, 2)
 
-        for mount in mounts:
-            source = mount.source if mount.source is not None else Path(mount.type)
-            destination = self.box.root / mount.destination.relative_to("/")
-            options = linux.Mount(0)
+        _enter_root(self.box)
 
-            for option in mount.options:
-                match option:
-                    case "bind":
-                        options |= linux.Mount.BIND
+        if cwd is not None:
+            os.chdir(cwd)
 
-                    case "rbind":
-                        options |= linux.Mount.BIND
-                        options |= linux.Mount.REC
+        os.execvpe(self.args[0], self.args, {})
 
-                    case "ro":
-                        options |= linux.Mount.RDONLY
+    def _spawn_from_zygote(
+        self, cwd: Path | str | None, stdin: int, stdout: int, stderr: int
+    ) -> None:
+        zygote = get_zygote(self.box)
+        devnull = os.open(os.devnull, os.O_RDWR)
+        release_read, release_write = os.pipe()
 
-                    case _:
-                        raise ValueError(f"unknown mount option '{option}'")
+        try:
+            pid, pidfd = zygote.spawn(
+                self.args,
+                cwd,
+                [
+                    fd if fd != -1 else devnull
+                    for fd in (stdin, stdout, stderr, release_read)
+                ],
+            )
+            self._zygote = zygote
+            self._pidfd = pidfd
+            self.pid = pid
+            self.returncode = None
 
             try:
-                linux.mount(source, destination, mount.type, options)
-
-                # A second syscall is needed to apply options to a bind mount
-                if "ro" in mount.options and (
-                    "bind" in mount.options or "rbind" in mount.options
-                ):
-                    options |= linux.Mount.REMOUNT
-                    linux.mount(b"none", destination, "none", options)
-            except OSError as err:
-                raise RuntimeError(f"Failed to mount {mount}: {err.strerror}")
-
-        # Change the root to the new root and unmount the old one
-        linux.pivot_root(self.box.root, self.box.root)
-        linux.umount(Path("/"), linux.Umount.DETACH)
-
-        if cwd is not None:
-            os.chdir(cwd)
-
-        os.execvpe(self.args[0], self.args, {})
+                # The child waits for the release pipe before executing the
+                # program, so that it never runs outside of its cgroup
+                cgroup = self._setup_cgroup()
+                os.close(cgroup)
+
+                assert self._cgroup is not None
+                with open(self._cgroup / "cgroup.procs", "w") as file:
+                    print(_pidfd_pid(pidfd), file=file)
+            except OSError:
+                # The child also exits by itself once the release pipe is
+                # closed without being written to
+                self.kill()
+                raise
+
+            os.write(release_write, b"\0")
+        finally:
+            os.close(devnull)
+            os.close(release_read)
+            os.close(release_write)
 
     def _setup_cgroup(self) -> int:
         cgroup_id = str(uuid4())
@@ -293,12 +360,30 @@ class BoxedProcess:
         assert self._pidfd is not None
         waiter = select.poll()
         waiter.register(self._pidfd, select.POLLIN)
-        waiter.poll(timeout)
+
+        if waiter.poll(timeout) and self._zygote is not None:
+            # The zygote reports the exit status right after the process exits
+            assert self.pid is not None
+            self._set_exited(self._zygote.exit_status(self.pid))
+            return self.returncode
 
         return self._check_exited()
 
     def _check_exited(self) -> int | None:
         assert self._pidfd is not None
+
+        if self._zygote is not None:
+            # Processes forked from a zygote are not children of this process,
+            # so their exit status is reported by the zygote
+            assert self.pid is not None
+            self._zygote.read_exits()
+
+            if self.pid not in self._zygote.exits:
+                return None
+
+            self._set_exited(self._zygote.exits.pop(self.pid))
+            return self.returncode
+
         res = os.waitid(os.P_PIDFD, self._pidfd, os.WEXITED | os.WNOHANG)
 
         if res is not None:
@@ -312,6 +397,10 @@ class BoxedProcess:
 
         return None
 
+    def _set_exited(self, returncode: int) -> None:
+        self.returncode = returncode
+        self._cleanup()
+
     def _cleanup(self) -> None:
         if self._pidfd is not None:
             os.close(self._pidfd)
@@ -329,7 +418,9 @@ class BoxedProcess:
             signal.pidfd_send_signal(self._pidfd, type)
 
     def terminate(self) -> None:
-        self.send_signal(signal.SIGTERM)
+        # Boxed processes are the first process of their process namespace,
+        # which ignores SIGTERM unless the program handles it
+        self.send_signal(signal.SIGKILL)
 
     def kill(self) -> None:
         self.send_signal(signal.SIGKILL)
@@ -353,9 +444,311 @@ class BoxedProcess:
         self.wait()
 
 
+def _pidfd_pid(pidfd: int) -> int:
+    """Get the number of the process referred to by a pidfd in our namespace."""
+    with open(f"/proc/self/fdinfo/{pidfd}") as file:
+        for line in file:
+            if line.startswith("Pid:"):
+                return int(line.split()[1])
+
+    raise RuntimeError(f"cannot find the process of pidfd {pidfd}")
+
+
+def _serve_zygote(channel: socket.socket) -> None:
+    """
+    Fork new processes on request until the channel is closed.
+
+    Each request is a JSON object with the arguments and working directory
+    of the program to run, along with the file descriptors to use as its
+    standard streams and a pipe from which it must read a byte before
+    running. The zygote answers with the process number of the new process
+    in its namespace and a pidfd referring to it, and later reports its exit
+    status once it terminates.
+
+    New processes share the root and mounts of the zygote, but get their own
+    process, network and IPC namespaces. Each of them is the first process of
+    its process namespace: it cannot see nor signal any other process, and it
+    only receives the signals for which it installs a handler, apart from
+    SIGKILL and SIGSTOP.
+    """
+    children: dict[int, int] = {}
+    waiter = select.poll()
+    waiter.register(channel, select.POLLIN)
+
+    while True:
+        for fd, _ in waiter.poll():
+            if fd in children:
+                pid = children.pop(fd)
+                waiter.unregister(fd)
+                result = os.waitid(os.P_PIDFD, fd, os.WEXITED)
+                os.close(fd)
+                assert result is not None
+                status = (
+                    result.si_status
+                    if result.si_code == os.CLD_EXITED
+                    else -result.si_status
+                )
+                channel.send(json.dumps({"exit": pid, "status": status}).encode())
+                continue
+
+            message, fds, _, _ = socket.recv_fds(channel, 1 << 16, 4)
+
+            if not message:
+                # The judge is gone, and the whole namespace with us
+                os._exit(0)
+
+            request = json.loads(message)
+            pid = linux.clone(flags=_zygote_child_flags)
+
+            if pid == 0:
+                channel.close()
+                stdin, stdout, stderr, release = fds
+                os.dup2(stdin, 0)
+                os.dup2(stdout, 1)
+                os.dup2(stderr, 2)
+
+                # The judge closes the pipe without writing if it gives up
+                if not os.read(release, 1):
+                    os._exit(1)
+
+                os.closerange(3, os.sysconf("SC_OPEN_MAX"))
+
+                try:
+                    if request["cwd"] is not None:
+                        os.chdir(request["cwd"])
+
+                    os.execvpe(request["args"][0], request["args"], {})
+                finally:
+                    os._exit(127)
+
+            for fd in fds:
+                os.close(fd)
+
+            pidfd = os.pidfd_open(pid)
+            children[pidfd] = pid
+            waiter.register(pidfd, select.POLLIN)
+            socket.send_fds(channel, [json.dumps({"pid": pid}).encode()], [pidfd])
+
+
+class Zygote:
+    """
+    Long-lived process isolated in a box, forking new boxed processes.
+
+    The zygote sets up namespaces and mounts once, after which starting a new
+    process in the same box only costs a fork and an exec. Processes forked
+    from the zygote share its root and mounts (see :func:`_serve_zygote`) and
+    are not children of the judge: the zygote hands back a pidfd for
+    signalling each of them, and reports their exit status on its channel.
+    Exit reports can be waited for by blocking (see :meth:`exit_status`), or
+    delivered to callbacks when the channel is readable (see :meth:`watch`).
+
+    All methods can be called from any thread. Requests and replies share a
+    single channel, which is only used by one thread at a time, so that a
+    thread never reads the reply to a request of another thread.
+    """
+
+    # Box in which the zygote and its processes are isolated
+    box: Box
+
+    # Process number and pidfd of the zygote
+    pid: int
+    pidfd: int
+
+    # Connection to the zygote
+    channel: socket.socket
+
+    # Reported exit status of processes forked from the zygote, by their
+    # process number in the zygote namespace
+    exits: dict[int, int]
+
+    # Functions waiting for the exit status of processes forked from the
+    # zygote, by their process number in the zygote namespace
+    watchers: dict[int, Callable[[int], None]]
+
+    # Held while using the channel or the exit reports
+    lock: threading.RLock
+
+    def __init__(self, box: Box):
+        self.box = box
+        self.exits = {}
+        self.watchers = {}
+        self.lock = threading.RLock()
+        self.channel, child = socket.socketpair(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+        pid = linux.clone(flags=_namespace_flags)
+
+        if pid == 0:
+            try:
+                # Keep none of the files of the judge open in the zygote,
+                # apart from its standard streams while the box is set up so
+                # that errors get reported
+                os.dup2(child.detach(), 3)
+                os.dup2(os.open(os.devnull, os.O_RDWR), 4)
+                os.closerange(5, os.sysconf("SC_OPEN_MAX"))
+                _enter_root(box)
+                os.chdir("/")
+
+                for fd in (0, 1, 2):
+                    os.dup2(4, fd)
+
+                os.close(4)
+                _serve_zygote(socket.socket(fileno=3))
+            except OSError:
+                traceback.print_exc()
+            finally:
+                os._exit(1)
+
+        child.close()
+        self.pid = pid
+        self.pidfd = os.pidfd_open(pid)
+
+    def spawn(
+        self, args: list[str], cwd: Path | str | None, fds: list[int]
+    ) -> tuple[int, int]:
+        """
+        Fork a new process from the zygote.
+
+        :param args: program to run and its arguments
+        :param cwd: working directory of the process, inside the box
+        :param fds: standard input, output and error of the process, and
+            a pipe from which a byte must be read before the program starts
+        :returns: process number in the zygote namespace, and pidfd
+        """
+        request = {"args": args, "cwd": None if cwd is None else str(cwd)}
+
+        with self.lock:
+            socket.send_fds(self.channel, [json.dumps(request).encode()], fds)
+
+            while True:
+                message, received, _, _ = socket.recv_fds(self.channel, 1 << 16, 1)
+
+                if not message:
+                    raise RuntimeError("zygote exited unexpectedly")
+
+                reply = json.loads(message)
+
+                if "pid" in reply:
+                    return reply["pid"], received[0]
+
+                self._report_exit(reply["exit"], reply["status"])
+
+    def exit_status(self, pid: int) -> int:
+        """
+        Wait for the exit status of a process forked from the zygote.
+
+        :param pid: process number in the zygote namespace, of a process
+            which is not watched
+        :returns: exit code of the process, or the opposite of the signal
+            number which terminated it
+        """
+        with self.lock:
+            while pid not in self.exits:
+                message = self.channel.recv(1 << 16)
+
+                if not message:
+                    raise RuntimeError("zygote exited unexpectedly")
+
+                reply = json.loads(message)
+                self._report_exit(reply["exit"], reply["status"])
+
+            return self.exits.pop(pid)
+
+    def watch(self, pid: int, callback: Callable[[int], None]) -> None:
+        """
+        Get notified of the exit status of a process forked from the zygote.
+
+        The callback is called right away if the process has already exited,
+        or else by the first thread reading its exit report from the channel.
+
+        :param pid: process number in the zygote namespace
+        :param callback: called with the exit status (see :meth:`exit_status`)
+        """
+        with self.lock:
+            if pid in self.exits:
+                callback(self.exits.pop(pid))
+            else:
+                self.watchers[pid] = callback
+
+    def read_exits(self) -> None:
+        """
+        Read the exit reports available on the channel without blocking.
+
+        If the zygote is gone, all processes forked from it are gone with it,
+        and are reported as killed.
+        """
+        with self.lock:
+            while True:
+                try:
+                    message = self.channel.recv(1 << 16, socket.MSG_DONTWAIT)
+                except BlockingIOError:
+                    return
+
+                if not message:
+                    for pid in list(self.watchers):
+                        self._report_exit(pid, -signal.SIGKILL)
+
+                    return
+
+                reply = json.loads(message)
+                self._report_exit(reply["exit"], reply["status"])
+
+    def _report_exit(self, pid: int, status: int) -> None:
+        callback = self.watchers.pop(pid, None)
+
+        if callback is not None:
+            callback(status)
+        else:
+            self.exits[pid] = status
+
+    def close(self) -> None:
+        """Terminate the zygote along with all the processes it forked."""
+        self.channel.close()
+        os.waitid(os.P_PIDFD, self.pidfd, os.WEXITED)
+        os.close(self.pidfd)
+
+
+# Running zygotes, by box root and mounts
+_zygotes: dict[tuple, Zygote] = {}
+
+# Held while starting or stopping zygotes
+_zygotes_lock = threading.Lock()
+
+
+def get_zygote(box: Box) -> Zygote:
+    """Get a running zygote isolated under the root and mounts of a box."""
+    key = (
+        str(box.root),
+        tuple(
+            (
+                str(mount.destination),
+                str(mount.source),
+                tuple(mount.options),
+                mount.type,
+            )
+            for mount in box.mounts
+        ),
+    )
+    with _zygotes_lock:
+        zygote = _zygotes.get(key)
+
+        if zygote is None:
+            zygote = _zygotes[key] = Zygote(box)
+
+        return zygote
+
+
+def close_zygotes() -> None:
+    """Terminate all running zygotes."""
+    with _zygotes_lock:
+        for zygote in _zygotes.values():
+            zygote.close()
+
+        _zygotes.clear()
+
+
 class BoxedSubprocessTransport(asyncio.base_subprocess.BaseSubprocessTransport):  # type: ignore
-    def _start(self, args, shell, stdin, stdout, stderr, bufsize, box, cwd, **kwargs):
-        self._proc = BoxedProcess(args, box, cwd, stdin, stdout, stderr)
+    def _start(self, args, shell, stdin, stdout, stderr, bufsize, process, **kwargs):
+        # The process is started beforehand, see create_boxed_subprocess_exec
+        self._proc = process
         return self
 
     def _process_exited(self, returncode):
@@ -374,6 +767,28 @@ async def create_boxed_subprocess_exec(
     **kwargs,
 ):
     loop = asyncio.get_running_loop()
+
+    # Starting a boxed process blocks on system calls and on the zygote, so it
+    # is done in a thread, which lets several processes start at the same time
+    starting = loop.run_in_executor(
+        None,
+        partial(
+            BoxedProcess,
+            [program, *args],
+            box,
+            kwargs.pop("cwd", None),
+            stdin,
+            stdout,
+            stderr,
+        ),
+    )
+
+    try:
+        boxed = await asyncio.shield(starting)
+    except asyncio.CancelledError:
+        starting.add_done_callback(partial(_discard_started, loop))
+        raise
+
     protocol = asyncio.subprocess.SubprocessStreamProtocol(limit=limit, loop=loop)
     watcher = asyncio.get_child_watcher()
 
@@ -389,17 +804,50 @@ async def create_boxed_subprocess_exec(
             stderr=stderr,
             bufsize=0,
             waiter=waiter,
-            box=box,
+            process=boxed,
             **kwargs,
         )
-        watcher.add_child_handler(
-            transport.get_pid(),
-            lambda pid, returncode: loop.call_soon_threadsafe(
-                loop.call_soon,
-                transport._process_exited,
-                returncode,
-            ),
-        )
+        process = transport.get_extra_info("subprocess")
+
+        zygote = process._zygote
+
+        if zygote is not None:
+            # Processes forked from a zygote are not our children, and their
+            # exit status is read from the zygote channel once it arrives
+            def exited(returncode: int) -> None:
+                if not zygote.watchers:
+                    loop.remove_reader(zygote.channel)
+
+                process._set_exited(returncode)
+                transport._process_exited(returncode)
+
+            zygote.watch(
+                transport.get_pid(),
+                lambda returncode: loop.call_soon_threadsafe(exited, returncode),
+            )
+            loop.add_reader(zygote.channel, zygote.read_exits)
+        else:
+            watcher.add_child_handler(
+                transport.get_pid(),
+                lambda pid, returncode: loop.call_soon_threadsafe(
+                    loop.call_soon,
+                    transport._process_exited,
+                    returncode,
+                ),
+            )
+
         await waiter
 
     return asyncio.subprocess.Process(transport, protocol, loop)
+
+
+def _discard_started(
+    loop: asyncio.AbstractEventLoop, starting: asyncio.Future[BoxedProcess]
+) -> None:
+    """Stop a process whose start was awaited by a cancelled task."""
+    if starting.cancelled() or starting.exception() is not None:
+        return
+
+    process = starting.result()
+    process.kill()
+    loop.run_in_executor(None, process.__exit__, None, None, None)
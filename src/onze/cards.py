@@ -1,7 +1,7 @@
 from random import Random
 from itertools import product, starmap
 from collections import namedtuple
-from collections.abc import Callable, Sequence
+from collections.abc import Callable, Iterable, Sequence
 
 
 Card = namedtuple("Card", ["suit", "rank"])
@@ -15,29 +15,69 @@ scores = (5, 0, 0, 0, 0, 10, 0, 0, 0, 10)
 
 cards = list(starmap(Card, product(suits, ranks)))
 
+# Compact representation where each card is identified by its index in the
+# `cards` list and a set of cards is an integer with one bit per card index
+Mask = int
+
+card_indices = {card: index for index, card in enumerate(cards)}
+suit_masks = tuple(
+    ((1 << len(ranks)) - 1) << (len(ranks) * index) for index in range(len(suits))
+)
+full_mask = (1 << len(cards)) - 1
+
+
+def _card_strength(index: int, follow: int, trump: int) -> int:
+    suit, rank = divmod(index, len(ranks))
+
+    if suit == trump:
+        order = 5
+    elif suit == follow:
+        order = 4
+    else:
+        order = suit
+
+    return len(ranks) * order + rank
+
+
+# Strength of each card index when a given suit is followed and a given suit is
+# trump, indexed as [follow][trump][index] with len(suits) standing for no suit
+card_strengths = tuple(
+    tuple(
+        tuple(_card_strength(index, follow, trump) for index in range(len(cards)))
+        for trump in range(len(suits) + 1)
+    )
+    for follow in range(len(suits) + 1)
+)
+
+# Score of each card index
+card_scores = tuple(scores[index % len(ranks)] for index in range(len(cards)))
+
+_suit_indices: dict[str | None, int] = {suit: index for index, suit in enumerate(suits)}
+_suit_indices[None] = len(suits)
+
+_card_keys = {
+    (follow, trump): {
+        card: card_strengths[_suit_indices[follow]][_suit_indices[trump]][index]
+        for card, index in card_indices.items()
+    }.__getitem__
+    for follow in _suit_indices
+    for trump in _suit_indices
+}
+
+_card_scores = {card: card_scores[index] for card, index in card_indices.items()}
+
 
 def make_card_key(
     follow: str | None = None, trump: str | None = None
 ) -> Callable[[Card], int]:
     """
-    Create a function for ranking cards by increasing force.
+    Get a function for ranking cards by increasing force.
 
     :param follow: suit to follow, if any
     :param trump: trump suit, if any
     :returns: card ranking function, to be used in min(), max(), sorted(), etc
     """
-
-    def card_key(card):
-        if card.suit == trump:
-            order = 5
-        elif card.suit == follow:
-            order = 4
-        else:
-            order = suits.index(card.suit)
-
-        return len(ranks) * order + ranks.index(card.rank)
-
-    return card_key
+    return _card_keys[follow, trump]
 
 
 def deal_random_hands(random: Random, other_hands: Hands = ()) -> Hands:
@@ -60,7 +100,7 @@ def deal_random_hands(random: Random, other_hands: Hands = ()) -> Hands:
 
 def score_card(card: Card) -> int:
     """Compute the score of a single card."""
-    return scores[ranks.index(card.rank)]
+    return _card_scores[card]
 
 
 def score_trick(trick: Trick, trump: str | None = None) -> tuple[int, int]:
@@ -71,7 +111,7 @@ def score_trick(trick: Trick, trump: str | None = None) -> tuple[int, int]:
     :param trump: current trump suit, if any
     :returns: total trick score and index of the winning player
     """
-    total = sum(map(score_card, trick))
+    total = sum(map(_card_scores.__getitem__, trick))
     follow = trick[0].suit
     max_card = max(trick, key=make_card_key(follow, trump))
     return total, trick.index(max_card)
@@ -94,3 +134,166 @@ def playable_cards(trick: Trick, hand: Hand) -> Hand:
         return follow_suit
 
     return hand
+
+
+def hand_to_mask(hand: Iterable[Card]) -> Mask:
+    """Convert a set of cards to its bitmask representation."""
+    mask = 0
+
+    for card in hand:
+        mask |= 1 << card_indices[card]
+
+    return mask
+
+
+def mask_to_hand(mask: Mask) -> Hand:
+    """Convert a bitmask back to a set of cards."""
+    return {cards[index] for index in mask_indices(mask)}
+
+
+def mask_indices(mask: Mask) -> list[int]:
+    """List the indices of the cards in a bitmask, in increasing order."""
+    indices = []
+
+    while mask:
+        low = mask & -mask
+        indices.append(low.bit_length() - 1)
+        mask ^= low
+
+    return indices
+
+
+def deal_random_masks(
+    random: Random, other_masks: Sequence[Mask] = ()
+) -> tuple[Mask, ...]:
+    """
+    Randomly deal cards into four bitmask hands.
+
+    For the same randomness state, this deals the same cards as
+    :func:`deal_random_hands`.
+
+    :param random: randomness source
+    :param other_masks: already-dealt hands
+    :returns: complete set of hands
+    """
+    dealt = 0
+
+    for mask in other_masks:
+        dealt |= mask
+
+    available_cards = [index for index in range(len(cards)) if not dealt >> index & 1]
+    random.shuffle(available_cards)
+    hands = tuple(other_masks)
+
+    for start in range(0, len(available_cards), 10):
+        mask = 0
+
+        for index in available_cards[start : start + 10]:
+            mask |= 1 << index
+
+        hands += (mask,)
+
+    return hands
+
+
+def score_trick_indices(
+    trick: Sequence[int], trump: int | None = None
+) -> tuple[int, int]:
+    """
+    Compute the score and winner of a trick of card indices.
+
+    :param trick: list of played card indices
+    :param trump: index of the current trump suit, if any
+    :returns: total trick score and index of the winning player
+    """
+    strengths = card_strengths[trick[0] // len(ranks)][
+        len(suits) if trump is None else trump
+    ]
+    total = 0
+    winner = 0
+    max_strength = -1
+
+    for player, index in enumerate(trick):
+        total += card_scores[index]
+        strength = strengths[index]
+
+        if strength > max_strength:
+            max_strength = strength
+            winner = player
+
+    return total, winner
+
+
+def playable_mask(trick: Sequence[int], hand: Mask) -> Mask:
+    """
+    Compute the set of cards which can be played to complete a trick.
+
+    :param trick: list of already-played card indices
+    :param hand: bitmask of available cards in hand
+    :returns: bitmask of legal cards
+    """
+    if not trick:
+        return hand
+
+    return hand & suit_masks[trick[0] // len(ranks)] or hand
+
+
+def permute_index(index: int, permutation: Sequence[int]) -> int:
+    """
+    Move a card index to another suit.
+
+    :param index: card index
+    :param permutation: new suit index for each suit index
+    :returns: index of the card with the same rank in the new suit
+    """
+    suit, rank = divmod(index, len(ranks))
+    return permutation[suit] * len(ranks) + rank
+
+
+def permute_mask(mask: Mask, permutation: Sequence[int]) -> Mask:
+    """
+    Move the cards of a bitmask to other suits.
+
+    :param mask: bitmask of cards
+    :param permutation: new suit index for each suit index
+    :returns: bitmask with the cards of each suit moved to its new suit
+    """
+    result = 0
+
+    for suit, target in enumerate(permutation):
+        result |= (mask >> (len(ranks) * suit) & suit_masks[0]) << (len(ranks) * target)
+
+    return result
+
+
+def canonicalize(
+    hands: Sequence[Mask], fixed: Iterable[int] = ()
+) -> tuple[tuple[Mask, ...], tuple[int, ...]]:
+    """
+    Find a canonical form of a set of hands up to a permutation of suits.
+
+    Hands that only differ by a renaming of their suits have the same
+    canonical form, which allows sharing results between them. Suits that
+    cannot be exchanged, such as the trump suit once it is decided or the
+    suit of a trick in progress, can be kept in place.
+
+    :param hands: bitmask of the cards in each player’s hand
+    :param fixed: indices of the suits to leave in place
+    :returns: canonical hands and new suit index for each suit index
+    """
+    kept = set(fixed)
+    free = [suit for suit in range(len(suits)) if suit not in kept]
+
+    def suit_key(suit: int) -> tuple[int, ...]:
+        shift = len(ranks) * suit
+        return tuple(hand >> shift & suit_masks[0] for hand in hands)
+
+    permutation = list(range(len(suits)))
+
+    for target, suit in zip(free, sorted(free, key=suit_key, reverse=True)):
+        permutation[suit] = target
+
+    return (
+        tuple(permute_mask(hand, permutation) for hand in hands),
+        tuple(permutation),
+    )
@@ -1,5 +1,18 @@
-from .cards import Hands, Card, score_trick, playable_cards, make_card_key
-from collections.abc import Callable, Awaitable
+from .cards import (
+    Hands,
+    Card,
+    Mask,
+    hand_to_mask,
+    mask_indices,
+    ranks,
+    score_trick,
+    score_trick_indices,
+    playable_cards,
+    playable_mask,
+    make_card_key,
+)
+from collections.abc import Callable, Awaitable, Sequence
+from typing import Self
 
 
 Scores = dict[int, int]
@@ -83,7 +96,7 @@ async def round(
         card = await query_card(player)
 
         if card not in playable:
-            card = sorted(playable, key=make_card_key())[0]
+            card = min(playable, key=make_card_key())
 
         await reply_card(player, card)
 
@@ -131,35 +144,282 @@ async def play(
     :returns: final scores of the two teams
     """
     total_scores = {0: 0, 1: 0}
-    starter = 0
     round_index = 0
 
-    while (max_rounds is None or round_index <= max_rounds) and (
-        winning_score is None
-        or not any(score >= winning_score for score in total_scores.values())
-    ):
+    while not _is_over(total_scores, round_index, max_rounds, winning_score):
         hands = await deal_hands()
         winner, bid_value = await bid(starter, query_bid, reply_bid)
         scores = await round(winner, hands, query_card, reply_card)
+        _add_round_scores(total_scores, winner, bid_value, scores)
 
-        bidding_team = winner % 2
-        other_team = (winner + 1) % 2
+        starter = (starter + 1) % 4
+        round_index += 1
+
+    return total_scores
+
+
+def _is_over(
+    total_scores: Scores,
+    round_index: int,
+    max_rounds: int | None,
+    winning_score: int | None,
+) -> bool:
+    return (max_rounds is not None and round_index > max_rounds) or (
+        winning_score is not None
+        and any(score >= winning_score for score in total_scores.values())
+    )
+
+
+def _add_round_scores(
+    total_scores: Scores, winner: int, bid_value: int, scores: Scores
+) -> None:
+    bidding_team = winner % 2
+    other_team = (winner + 1) % 2
+
+    if bid_value == 105:
+        if scores[bidding_team] < 100:
+            total_scores[other_team] += 500
+        else:
+            total_scores[bidding_team] += 500
+    else:
+        if scores[bidding_team] < bid_value:
+            total_scores[bidding_team] -= bid_value
+        else:
+            total_scores[bidding_team] += scores[bidding_team]
+
+        if total_scores[other_team] < 400:
+            total_scores[other_team] += scores[other_team]
+
+
+def bid_sync(
+    starter: int,
+    query_bid: Callable[[int], int],
+    reply_bid: Callable[[int, int], None],
+) -> tuple[int, int]:
+    """
+    Run a bidding round with synchronous callbacks.
+
+    Follows the same rules as :func:`game.bid()` without using the event loop.
+    """
+    bidder = starter
+    pending_bids = {player: 0 for player in range(4)}
 
-        if bid_value == 105:
-            if scores[bidding_team] < 100:
-                total_scores[other_team] += 500
-            else:
-                total_scores[bidding_team] += 500
+    default_bid = 50
+    minimum_bid = default_bid
+    maximum_bid = 105
+
+    while len(pending_bids) > 1:
+        bid_value = query_bid(bidder)
+
+        if bid_value % 5 == 0 and minimum_bid <= bid_value <= maximum_bid:
+            pending_bids[bidder] = bid_value
+            minimum_bid = bid_value + 5
         else:
-            if scores[bidding_team] < bid_value:
-                total_scores[bidding_team] -= bid_value
-            else:
-                total_scores[bidding_team] += scores[bidding_team]
+            bid_value = 0
+            del pending_bids[bidder]
+
+        reply_bid(bidder, bid_value)
+        bidder = (bidder + 1) % 4
+
+        while bidder not in pending_bids:
+            bidder = (bidder + 1) % 4
+
+    winner, bid_value = next(iter(pending_bids.items()))
+
+    if bid_value == 0:
+        # Default bid if everyone else passes
+        bid_value = default_bid
+        reply_bid(winner, bid_value)
+
+    return winner, bid_value
+
+
+def round_sync(
+    starter: int,
+    hands: Hands,
+    query_card: Callable[[int], Card | None],
+    reply_card: Callable[[int, Card], None],
+) -> Scores:
+    """
+    Run a game round with synchronous callbacks.
+
+    Follows the same rules as :func:`game.round()` without using the event loop.
+    """
+    player = starter
+    trick: tuple[Card, ...] = ()
+    trump = None
+    scores = {0: 0, 1: 0}
+    default_key = make_card_key()
+
+    while hands[player]:
+        hand = hands[player]
+        playable = playable_cards(trick, hand)
+        card = query_card(player)
+
+        if card not in playable:
+            card = min(playable, key=default_key)
+
+        reply_card(player, card)
+
+        if trump is None:
+            trump = card.suit
+
+        trick += (card,)
+        hand.remove(card)
+        player = (player + 1) % 4
+
+        if len(trick) == 4:
+            score, winner = score_trick(trick, trump)
+            winner = (player + winner) % 4
+            scores[winner % 2] += score
+
+            player = winner
+            trick = ()
+
+    return scores
 
-            if total_scores[other_team] < 400:
-                total_scores[other_team] += scores[other_team]
+
+def play_sync(
+    starter: int,
+    deal_hands: Callable[[], Hands],
+    query_bid: Callable[[int], int],
+    reply_bid: Callable[[int, int], None],
+    query_card: Callable[[int], Card | None],
+    reply_card: Callable[[int, Card], None],
+    max_rounds: int | None = None,
+    winning_score: int | None = None,
+) -> Scores:
+    """
+    Run a complete game with synchronous callbacks and return total scores.
+
+    Follows the same rules as :func:`game.play()` without using the event
+    loop, which avoids scheduling a coroutine for each move when all players
+    are in-process strategies.
+    """
+    total_scores = {0: 0, 1: 0}
+    round_index = 0
+
+    while not _is_over(total_scores, round_index, max_rounds, winning_score):
+        hands = deal_hands()
+        winner, bid_value = bid_sync(starter, query_bid, reply_bid)
+        scores = round_sync(winner, hands, query_card, reply_card)
+        _add_round_scores(total_scores, winner, bid_value, scores)
 
         starter = (starter + 1) % 4
         round_index += 1
 
     return total_scores
+
+
+class GameState:
+    """
+    Mutable state of a round, supporting making and unmaking moves in place.
+
+    Follows the same rules as :func:`game.round()`, with cards identified by
+    their index in :data:`cards.cards` and hands represented as bitmasks (see
+    :func:`cards.hand_to_mask()`).
+    """
+
+    __slots__ = ("_history", "hands", "leader", "player", "scores", "trick", "trump")
+
+    # Cards remaining in each player’s hand
+    hands: list[Mask]
+
+    # Player who needs to play the next card
+    player: int
+
+    # Player who played the first card of the current trick
+    leader: int
+
+    # Cards of the current trick in play order
+    trick: list[int]
+
+    # Index of the trump suit, or None if no card was played yet
+    trump: int | None
+
+    # Points collected by each team
+    scores: list[int]
+
+    # Information needed to undo each move
+    _history: list[tuple[int, int | None, int, list[int] | None, int, int]]
+
+    def __init__(self, starter: int, hands: Sequence[Mask], trump: int | None = None):
+        """
+        Initialize a round state at the start of a trick.
+
+        :param starter: player who plays the first card of the trick
+        :param hands: bitmask of the cards in each player’s hand
+        :param trump: index of the trump suit, or None at the start of a round
+        """
+        self.hands = list(hands)
+        self.player = starter
+        self.leader = starter
+        self.trick = []
+        self.trump = trump
+        self.scores = [0, 0]
+        self._history = []
+
+    @classmethod
+    def from_hands(cls, starter: int, hands: Hands) -> Self:
+        """Initialize a round state at the start of a round from sets of cards."""
+        return cls(starter, [hand_to_mask(hand) for hand in hands])
+
+    @property
+    def is_over(self) -> bool:
+        """Whether all the cards of the round have been played."""
+        return not self.hands[self.player]
+
+    def legal_mask(self) -> Mask:
+        """Compute the bitmask of cards that can be played by the current player."""
+        return playable_mask(self.trick, self.hands[self.player])
+
+    def legal_moves(self) -> list[int]:
+        """List the cards that can be played by the current player."""
+        return mask_indices(self.legal_mask())
+
+    def play(self, card: int) -> bool:
+        """
+        Play a card for the current player.
+
+        :param card: index of a legal card (see :meth:`legal_moves`)
+        :returns: True if the card completed a trick
+        """
+        player = self.player
+        trump = self.trump
+        leader = self.leader
+        trick = self.trick
+
+        trick.append(card)
+        self.hands[player] ^= 1 << card
+
+        if trump is None:
+            self.trump = card // len(ranks)
+
+        if len(trick) == 4:
+            score, winner = score_trick_indices(trick, self.trump)
+            winner = (leader + winner) % 4
+            self.scores[winner % 2] += score
+            self._history.append((player, trump, leader, trick, winner % 2, score))
+
+            self.trick = []
+            self.leader = winner
+            self.player = winner
+            return True
+
+        self._history.append((player, trump, leader, None, 0, 0))
+        self.player = (player + 1) % 4
+        return False
+
+    def undo(self) -> None:
+        """Take back the last played card."""
+        player, trump, leader, trick, team, score = self._history.pop()
+
+        if trick is not None:
+            self.scores[team] -= score
+            self.trick = trick
+
+        card = self.trick.pop()
+        self.hands[player] |= 1 << card
+        self.player = player
+        self.leader = leader
+        self.trump = trump
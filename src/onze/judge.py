@@ -1,10 +1,12 @@
 import argparse
+from dataclasses import replace
+from collections.abc import Awaitable, Callable, Sequence
 from random import Random
 import sys
 import os
 import asyncio
 from pathlib import Path
-from . import game
+from . import game, shm
 from .cards import Hands, Card, deal_random_hands
 from .protocol import (
     PlayerCommand,
@@ -13,20 +15,29 @@ from .protocol import (
     ReplyBidCommand,
     QueryCardCommand,
     ReplyCardCommand,
-    EndCommand,
     read_card,
     write_card,
     write_hand,
 )
-from .seats import Seat, TerminalSeat, SubprocessSeat, Table
-from .box import Box, Mount
+from .record import GameRecorder, RecordWriter
+from .results import ResultsStore
+from .seats import (
+    Clock,
+    InProcessSeat,
+    Seat,
+    SeatPool,
+    SharedMemorySeat,
+    SocketSeat,
+    TerminalSeat,
+    SubprocessSeat,
+    Table,
+    read_features,
+)
+from .box import Box, Mount, close_zygotes
 
 
-def parse_args() -> argparse.Namespace:
-    parser = argparse.ArgumentParser(
-        prog="onze",
-        description="Run games of Dix opposing computer programs and/or humans.",
-    )
+def add_game_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add the options controlling how games are played to a parser."""
     parser.add_argument(
         "-g",
         "--seed",
@@ -56,16 +67,40 @@ def parse_args() -> argparse.Namespace:
         ),
     )
     parser.add_argument(
-        "-s",
-        "--seat",
-        action="append",
-        default=[],
+        "--move-time",
+        type=float,
         help=(
-            "configure a player seat: specify either “terminal” to play interactively "
-            "with a human on the terminal, or a path to a bot folder containing a 'run' "
-            "script (default: all terminal players)"
+            "time in seconds allowed to bots for each bid or card before "
+            "drawing from their time bank (default: no limit)"
         ),
     )
+    parser.add_argument(
+        "--time-bank",
+        type=float,
+        help=(
+            "extra time in seconds that each bot can use over a whole game "
+            "when answering slower than the move time; a bot that runs out of "
+            "time passes or plays a default card (default: no limit)"
+        ),
+    )
+    parser.add_argument(
+        "--results-db",
+        help=(
+            "path to a SQLite database in which the games, rounds, bids and "
+            "cards are stored, created if needed (default: do not store results)"
+        ),
+    )
+    parser.add_argument(
+        "--record-file",
+        help=(
+            "path to a file to which a compact binary record of each game is "
+            "appended, created if needed (default: do not record games)"
+        ),
+    )
+
+
+def add_box_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add the options controlling the isolation of bots to a parser."""
     parser.add_argument(
         "-b",
         "--box",
@@ -102,19 +137,35 @@ def parse_args() -> argparse.Namespace:
             "(default: no limit)"
         ),
     )
+    parser.add_argument(
+        "--box-zygote",
+        action="store_true",
+        help=(
+            "start isolated seats from a long-lived process which is already "
+            "isolated with the same bot folder, instead of isolating each "
+            "seat from scratch"
+        ),
+    )
 
-    args = parser.parse_args()
 
+def check_args(parser: argparse.ArgumentParser, args: argparse.Namespace) -> None:
+    """Validate and complete the options added by the functions above."""
     if args.seed == -1:
         args.seed = int.from_bytes(os.urandom(8), byteorder="big")
 
-    if not args.seat:
-        args.seat = ["terminal"]
+    if not 0 <= args.seed < 1 << 64:
+        parser.print_usage()
+        print(
+            f"{parser.prog}: error: seed must be between 0 and 2⁶⁴ - 1",
+            file=sys.stderr,
+        )
+        sys.exit(1)
 
     if args.box is None and (
         args.box_tasks_limit != -1
         or args.box_ram_limit != -1
         or args.box_swap_limit != -1
+        or args.box_zygote
     ):
         parser.print_usage()
         print(
@@ -124,96 +175,316 @@ def parse_args() -> argparse.Namespace:
         )
         sys.exit(1)
 
+
+def parse_limit(value: str) -> int | None:
+    """Parse a limit which can be set to inf to disable it."""
+    return int(value) if value != "inf" else None
+
+
+def parse_args(argv: Sequence[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="onze",
+        description="Run games of Dix opposing computer programs and/or humans.",
+        epilog=(
+            "Run “onze tournament --help” for running many games between bots, "
+            "“onze match --help” for comparing two bots, “onze replay --help” "
+            "for checking recorded games, or “onze serve --help” for serving a "
+            "Python bot on a socket."
+        ),
+    )
+    add_game_arguments(parser)
+    parser.add_argument(
+        "-s",
+        "--seat",
+        action="append",
+        default=[],
+        help=(
+            "configure a player seat: specify either “terminal” to play interactively "
+            "with a human on the terminal, a path to a bot folder containing a 'run' "
+            "script, “python:module:Class” to run a Python bot class within the "
+            "server, or “unix:PATH” or “tcp:HOST:PORT” to connect to a bot server "
+            "(default: all terminal players)"
+        ),
+    )
+    add_box_arguments(parser)
+
+    args = parser.parse_args(argv)
+    check_args(parser, args)
+
+    if not args.seat:
+        args.seat = ["terminal"]
+
     return args
 
 
-async def setup_table(args) -> Table:
-    seats: dict[int, Seat] = {}
+def make_spawn(args) -> Callable[[int, str], Awaitable[Seat]]:
+    """Get a function for starting bot seats following the command line options."""
+
+    async def spawn(player: int, path: str) -> Seat:
+        if args.box:
+            box = Box(
+                root=Path(args.box),
+                mounts=[
+                    Mount(
+                        destination=Path("/bot"),
+                        source=Path(path),
+                        options=["rbind", "ro"],
+                    ),
+                ],
+                tasks_limit=args.box_tasks_limit,
+                ram_limit=args.box_ram_limit,
+                swap_limit=args.box_swap_limit,
+                zygote=args.box_zygote,
+            )
+            cwd = "/bot"
+        else:
+            box = None
+            cwd = path
+
+        features = read_features(path)
+
+        if box is None and "shm" in features and shm.supported:
+            return await SharedMemorySeat.create(player, "./run", cwd=cwd)
+
+        return await SubprocessSeat.create(
+            player, "./run", cwd=cwd, box=box, binary="binary" in features
+        )
+
+    return spawn
 
-    for player in range(4):
-        path = args.seat[player % len(args.seat)]
+
+async def setup_table(
+    paths: Sequence[str],
+    pool: SeatPool,
+    log: Callable[[str], None] = print,
+    clock: Clock | None = None,
+) -> Table:
+    """
+    Create a table of seats and send them their player number.
+
+    :param paths: seat configurations, repeated to fill the four seats
+    :param pool: pool from which bot seats are obtained
+    :param log: function receiving a message for each created seat
+    :param clock: if given, initial time allowed to each bot seat
+    :returns: table of ready seats
+    """
+
+    async def create(player: int) -> Seat:
+        path = paths[player % len(paths)]
 
         if path == "terminal":
-            seats[player] = await TerminalSeat.create(player)
+            seat: Seat = await TerminalSeat.create(player)
+        elif path.startswith("python:"):
+            seat = await InProcessSeat.create(player, path.removeprefix("python:"))
+        elif path.startswith(("unix:", "tcp:")):
+            seat = await SocketSeat.create(player, path)
         else:
-            if args.box:
-                box = Box(
-                    root=Path(args.box),
-                    mounts=[
-                        Mount(
-                            destination=Path("/bot"),
-                            source=Path(path),
-                            options=["rbind", "ro"],
-                        ),
-                    ],
-                    tasks_limit=args.box_tasks_limit,
-                    ram_limit=args.box_ram_limit,
-                    swap_limit=args.box_swap_limit,
-                )
-                cwd = "/bot"
-            else:
-                box = None
-                cwd = path
-
-            seats[player] = await SubprocessSeat.create(
-                player, "./run", cwd=cwd, box=box
-            )
+            seat = await pool.acquire(player, path)
 
-        print(f"[server] seat {player} is {seats[player]}")
-        await seats[player].send(PlayerCommand(player))
+        try:
+            await seat.send(PlayerCommand(player))
+        except BaseException:
+            await pool.release(seat, reuse=False)
+            raise
 
-    return Table(seats)
+        return seat
 
+    # Seats are independent from each other and can be started concurrently;
+    # if any of them fails, the others are handed back before giving up
+    created = await asyncio.gather(*map(create, range(4)), return_exceptions=True)
+    seats: dict[int, Seat] = {}
+    errors = []
 
-async def play() -> None:
-    args = parse_args()
-    table = await setup_table(args)
-    random = Random(args.seed)
+    for player, result in enumerate(created):
+        if isinstance(result, BaseException):
+            errors.append(result)
+        else:
+            seats[player] = result
 
-    print(f"[server] seed={args.seed}")
+    if errors:
+        await asyncio.gather(
+            *(pool.release(seat, reuse=False) for seat in seats.values()),
+            return_exceptions=True,
+        )
+        raise errors[0]
+
+    clocks: dict[int, Clock] = {}
+
+    for player, seat in seats.items():
+        log(f"[server] seat {player} is {seat}")
+
+        if clock is not None and not isinstance(seat, TerminalSeat):
+            clocks[player] = replace(clock)
+
+    return Table(seats, clocks)
+
+
+def make_clock(args: argparse.Namespace) -> Clock | None:
+    """Get the time allowed to bots following the command line options."""
+    if args.move_time is None and args.time_bank is None:
+        return None
+
+    return Clock(args.move_time, args.time_bank)
+
+
+async def release_table(table: Table, pool: SeatPool, reuse: bool = True) -> None:
+    """
+    Hand back the seats of a table after a game ends.
+
+    Seats which still owe a late answer are not kept, since that answer would
+    otherwise be read as the answer to the first query of their next game.
+
+    :param table: table of seats
+    :param pool: pool from which the seats were obtained
+    :param reuse: whether the seats can be kept for later games
+    """
+    await asyncio.gather(
+        *(
+            pool.release(seat, reuse and not table.stale[player])
+            for player, seat in table.seats.items()
+        )
+    )
+
+
+async def play_game(
+    table: Table,
+    random: Random,
+    max_rounds: int | None = None,
+    winning_score: int | None = None,
+    log: Callable[[str], None] = print,
+    recorder: GameRecorder | None = None,
+) -> game.Scores:
+    """
+    Play a full game between the seats of a table.
+
+    :param table: table of seats which have received their player number
+    :param random: randomness source used for dealing cards
+    :param max_rounds: maximum number of rounds to play
+    :param winning_score: score above which a team wins the game
+    :param log: function receiving a message for each event of the game
+    :param recorder: if given, receives the events of the game
+    :returns: final scores of each team
+    """
+    # Time taken by the last queried player to answer
+    elapsed = 0.0
 
     async def deal_hands() -> Hands:
         hands = deal_random_hands(random)
 
+        if recorder is not None:
+            recorder.deal(hands)
+
         for player, hand in enumerate(hands):
             await table.send(player, HandCommand(hand))
-            print(f"[server] player {player} - hand={write_hand(hand)}")
+            log(f"[server] player {player} - hand={write_hand(hand)}")
 
         return hands
 
     async def query_bid(bidder: int) -> int:
+        nonlocal elapsed
+        response = await table.communicate(bidder, QueryBidCommand())
+        elapsed = table.last_latency
+
         try:
-            return int(await table.communicate(bidder, QueryBidCommand()))
+            return int(response)
         except ValueError:
             return 0
 
     async def reply_bid(bidder: int, bid: int) -> None:
+        nonlocal elapsed
+
+        if recorder is not None:
+            recorder.bid(bidder, bid, elapsed)
+
+        elapsed = 0
         await table.broadcast(ReplyBidCommand(bidder, bid))
-        print(f"[server] player {bidder} bids {bid}")
+        log(f"[server] player {bidder} bids {bid}")
 
     async def query_card(player: int) -> Card | None:
-        return read_card(await table.communicate(player, QueryCardCommand()))
+        nonlocal elapsed
+        response = await table.communicate(player, QueryCardCommand())
+        elapsed = table.last_latency
+        return read_card(response)
 
     async def reply_card(player: int, card: Card) -> None:
+        nonlocal elapsed
+
+        if recorder is not None:
+            recorder.card(player, card, elapsed)
+
+        elapsed = 0
         await table.broadcast(ReplyCardCommand(player, card))
-        print(f"[server] player {player} plays {write_card(card)}")
+        log(f"[server] player {player} plays {write_card(card)}")
 
-    results = await game.play(
+    scores = await game.play(
         starter=0,
         deal_hands=deal_hands,
         query_bid=query_bid,
         reply_bid=reply_bid,
         query_card=query_card,
         reply_card=reply_card,
-        max_rounds=int(args.max_rounds) if args.max_rounds != "inf" else None,
-        winning_score=int(args.winning_score) if args.winning_score != "inf" else None,
+        max_rounds=max_rounds,
+        winning_score=winning_score,
+    )
+
+    if recorder is not None:
+        recorder.finish(scores)
+
+    return scores
+
+
+async def play() -> None:
+    args = parse_args()
+    pool = SeatPool(make_spawn(args))
+    table = await setup_table(args.seat, pool, clock=make_clock(args))
+
+    print(f"[server] seed={args.seed}")
+
+    seats = [args.seat[player % len(args.seat)] for player in range(4)]
+    recorder = GameRecorder(seats, args.seed)
+    results = await play_game(
+        table,
+        Random(args.seed),
+        max_rounds=parse_limit(args.max_rounds),
+        winning_score=parse_limit(args.winning_score),
+        recorder=recorder,
     )
 
     print(f"[server] results={results}")
 
-    await table.broadcast(EndCommand())
-    await table.close()
+    for line in table.summary():
+        print(f"[server] {line}")
+
+    if args.results_db is not None:
+        store = ResultsStore(args.results_db)
+        store.add(recorder.record)
+        store.close()
+
+    if args.record_file is not None:
+        with RecordWriter(args.record_file) as writer:
+            writer.write(recorder.record)
+
+    await release_table(table, pool)
+    await pool.close()
+    close_zygotes()
 
 
 def run():
-    asyncio.run(play())
+    if sys.argv[1:2] == ["tournament"]:
+        from .tournament import run_tournament
+
+        run_tournament(sys.argv[2:])
+    elif sys.argv[1:2] == ["match"]:
+        from .tournament import run_match
+
+        run_match(sys.argv[2:])
+    elif sys.argv[1:2] == ["serve"]:
+        from .bot import run_server
+
+        run_server(sys.argv[2:])
+    elif sys.argv[1:2] == ["replay"]:
+        from .replay import run_replay
+
+        sys.exit(1 if run_replay(sys.argv[2:]) else 0)
+    else:
+        asyncio.run(play())
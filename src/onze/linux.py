@@ -7,6 +7,9 @@ import signal
 
 libc = ctypes.CDLL(None, use_errno=True)
 
+# Same library, called without releasing the global interpreter lock
+pylibc = ctypes.PyDLL(None, use_errno=True)
+
 
 # Clone options (from linux/sched.h)
 class Clone(IntFlag):
@@ -115,13 +118,16 @@ def raise_errno(func):
 
 @raise_errno
 def clone(flags: Clone, cgroup: int | None = None):
+    # The interpreter lock is kept during the call, as in os.fork(): if
+    # another thread held it while the process is copied, the child would
+    # wait forever for a thread that does not exist in it
     if cgroup is not None:
         flags |= Clone.INTO_CGROUP
     else:
         cgroup = 0
 
     args = CloneArgs(flags=flags, exit_signal=signal.SIGCHLD, cgroup=cgroup)
-    return libc.syscall(NR_clone3, ctypes.byref(args), ctypes.sizeof(args))
+    return pylibc.syscall(NR_clone3, ctypes.byref(args), ctypes.sizeof(args))
 
 
 @raise_errno
@@ -1,5 +1,21 @@
+import struct
 from dataclasses import dataclass
-from .cards import Card, Hand, Trick, make_card_key, suits, ranks
+from collections.abc import Callable, Sequence
+from typing import Any
+from .cards import (
+    Card,
+    Hand,
+    Mask,
+    Trick,
+    card_indices,
+    cards,
+    hand_to_mask,
+    make_card_key,
+    mask_indices,
+    mask_to_hand,
+    suits,
+    ranks,
+)
 
 
 def write_card(card: Card) -> str:
@@ -41,6 +57,70 @@ def read_hand(data: str) -> Hand:
     return Hand(read_trick(data))
 
 
+card_names = tuple(map(write_card, cards))
+card_name_indices = {name: index for index, name in enumerate(card_names)}
+
+
+def write_card_index(index: int) -> str:
+    """Serialize a card given by its index."""
+    return card_names[index]
+
+
+def read_card_index(data: str) -> int | None:
+    """Read back the index of a card from its serialized form."""
+    return card_name_indices.get(data)
+
+
+def write_trick_indices(trick: Sequence[int]) -> str:
+    """Serialize a trick of card indices, preserving its order."""
+    return " ".join(card_names[index] for index in trick)
+
+
+def read_trick_indices(data: str) -> list[int]:
+    """Read back a trick of card indices from its serialized form."""
+    return [
+        index
+        for item in data.split()
+        if (index := card_name_indices.get(item)) is not None
+    ]
+
+
+def write_hand_mask(mask: Mask) -> str:
+    """Serialize a bitmask hand in the same canonical order as :func:`write_hand`."""
+    return write_trick_indices(mask_indices(mask))
+
+
+def read_hand_mask(data: str) -> Mask:
+    """Read back a bitmask hand from its serialized form."""
+    mask = 0
+
+    for index in read_trick_indices(data):
+        mask |= 1 << index
+
+    return mask
+
+
+def read_address(data: str) -> tuple[str, str] | tuple[str, str, int]:
+    """
+    Read the address of a bot server.
+
+    :param data: either `unix:PATH` for a Unix domain socket, or
+        `tcp:HOST:PORT` for a TCP socket
+    :returns: either ("unix", path) or ("tcp", host, port)
+    """
+    match data.split(":", 1):
+        case ["unix", path] if path:
+            return ("unix", path)
+
+        case ["tcp", location]:
+            host, separator, port = location.rpartition(":")
+
+            if separator and port.isdigit():
+                return ("tcp", host.removeprefix("[").removesuffix("]"), int(port))
+
+    raise ValueError(f"invalid address '{data}', expected unix:PATH or tcp:HOST:PORT")
+
+
 @dataclass
 class Command:
     pass
@@ -83,6 +163,11 @@ class EndCommand(Command):
     pass
 
 
+@dataclass
+class NewGameCommand(Command):
+    pass
+
+
 def write_command(command: Command) -> str:
     """Serialize a command to a string."""
     match command:
@@ -107,10 +192,67 @@ def write_command(command: Command) -> str:
         case EndCommand():
             return "end"
 
+        case NewGameCommand():
+            return "newgame"
+
         case _:
             raise ValueError(f"unknown command type '{type(command)}'")
 
 
+# Serialized form of the commands without arguments
+_fixed_lines = {
+    QueryBidCommand: b"bid ?\n",
+    QueryCardCommand: b"card ?\n",
+    EndCommand: b"end\n",
+    NewGameCommand: b"newgame\n",
+}
+
+# Serialized form of each possible card played by each player, by player
+# number and card index
+_card_lines = tuple(
+    tuple(f"card {player} {name}\n".encode() for name in card_names)
+    for player in range(4)
+)
+
+# Serialized form of each possible bid made by each player
+_bid_lines = {
+    (player, bid): f"bid {player} {bid}\n".encode()
+    for player in range(4)
+    for bid in (0, *range(50, 110, 5))
+}
+
+
+def encode_command(command: Command) -> bytes:
+    """
+    Serialize a command to a line of bytes, ready to be written to a bot.
+
+    Commands without arguments and valid bids and played cards are looked up
+    in tables built in advance, which allocates nothing; other commands go
+    through :func:`write_command`.
+
+    :param command: command to serialize
+    :returns: serialized command, including the final newline
+    """
+    line = _fixed_lines.get(type(command))
+
+    if line is not None:
+        return line
+
+    if type(command) is ReplyCardCommand:
+        player = command.player
+        index = card_indices.get(command.card)
+
+        if index is not None and 0 <= player < 4:
+            return _card_lines[player][index]
+    elif type(command) is ReplyBidCommand:
+        line = _bid_lines.get((command.player, command.bid))
+
+        if line is not None:
+            return line
+
+    return f"{write_command(command)}\n".encode()
+
+
 def read_command(data: str) -> Command:
     """Read back and decode a command."""
     match data.split(" "):
@@ -140,5 +282,197 @@ def read_command(data: str) -> Command:
         case ["end"]:
             return EndCommand()
 
+        case ["newgame"]:
+            return NewGameCommand()
+
         case _:
             raise ValueError(f"invalid command '{data}'")
+
+
+# Code identifying each kind of command in its binary form
+_command_codes: dict[type[Command], int] = {
+    PlayerCommand: 1,
+    HandCommand: 2,
+    QueryBidCommand: 3,
+    ReplyBidCommand: 4,
+    QueryCardCommand: 5,
+    ReplyCardCommand: 6,
+    EndCommand: 7,
+    NewGameCommand: 8,
+}
+_code_commands = {code: kind for kind, code in _command_codes.items()}
+
+
+def _check_byte(name: str, value: int) -> int:
+    """Ensure that a command field can be stored in a single byte."""
+    if not 0 <= value < 256:
+        raise ValueError(f"{name} {value} does not fit in a byte")
+
+    return value
+
+
+def pack_command(command: Command) -> int:
+    """
+    Serialize a command to its fixed-size binary form.
+
+    Commands are packed in a 64-bit integer holding the command code in the
+    lowest byte, the player number in the next byte, the bid value or card
+    index in the next byte, and the bitmask of a hand in the 40 highest bits.
+
+    :param command: command to serialize
+    :returns: packed command
+    :raises ValueError: if a player number or bid value does not fit in a byte
+    """
+    code = _command_codes.get(type(command))
+
+    if code is None:
+        raise ValueError(f"unknown command type '{type(command)}'")
+
+    match command:
+        case PlayerCommand(player=player):
+            return code | _check_byte("player", player) << 8
+
+        case HandCommand(hand=hand):
+            return code | hand_to_mask(hand) << 24
+
+        case ReplyBidCommand(player=player, bid=bid):
+            player = _check_byte("player", player)
+            return code | player << 8 | _check_byte("bid", bid) << 16
+
+        case ReplyCardCommand(player=player, card=card):
+            player = _check_byte("player", player)
+            return code | player << 8 | card_indices[card] << 16
+
+        case _:
+            return code
+
+
+def unpack_command(value: int) -> Command:
+    """Read back a command from its fixed-size binary form."""
+    kind = _code_commands.get(value & 0xFF)
+    player = value >> 8 & 0xFF
+    argument = value >> 16 & 0xFF
+
+    if kind is None:
+        raise ValueError(f"invalid command code {value & 0xFF}")
+
+    if kind is PlayerCommand:
+        return PlayerCommand(player)
+
+    if kind is HandCommand:
+        return HandCommand(mask_to_hand(value >> 24))
+
+    if kind is ReplyBidCommand:
+        return ReplyBidCommand(player, argument)
+
+    if kind is ReplyCardCommand:
+        if argument >= len(cards):
+            raise ValueError(f"invalid card index {argument}")
+
+        return ReplyCardCommand(player, cards[argument])
+
+    return kind()
+
+
+# Version of the binary protocol offered to bots
+binary_version = 1
+
+
+def _build_hand(low: int, high: int) -> Command:
+    return HandCommand(mask_to_hand(low | high << 32))
+
+
+def _build_reply_card(player: int, index: int) -> Command:
+    if index >= len(cards):
+        raise ValueError(f"invalid card index {index}")
+
+    return ReplyCardCommand(player, cards[index])
+
+
+# Layout of the payload following the opcode of each command in the binary
+# protocol, function giving the payload fields of a command, and function
+# building a command back from its payload fields
+_binary_layouts: dict[
+    type[Command],
+    tuple[str, Callable[[Any], tuple[int, ...]], Callable[..., Command]],
+] = {
+    PlayerCommand: ("B", lambda command: (command.player,), PlayerCommand),
+    HandCommand: (
+        "IB",
+        lambda command: divmod(hand_to_mask(command.hand), 1 << 32)[::-1],
+        _build_hand,
+    ),
+    QueryBidCommand: ("", lambda command: (), QueryBidCommand),
+    ReplyBidCommand: (
+        "BB",
+        lambda command: (command.player, command.bid),
+        ReplyBidCommand,
+    ),
+    QueryCardCommand: ("", lambda command: (), QueryCardCommand),
+    ReplyCardCommand: (
+        "BB",
+        lambda command: (command.player, card_indices[command.card]),
+        _build_reply_card,
+    ),
+    EndCommand: ("", lambda command: (), EndCommand),
+    NewGameCommand: ("", lambda command: (), NewGameCommand),
+}
+
+# Structure and payload conversion of each command type, for encoding
+_binary_encoders = {
+    kind: (struct.Struct(f"<B{layout}"), _command_codes[kind], fields)
+    for kind, (layout, fields, _) in _binary_layouts.items()
+}
+
+# Payload structure and builder of each opcode, for decoding
+_binary_decoders = {
+    _command_codes[kind]: (struct.Struct(f"<{layout}"), build)
+    for kind, (layout, _, build) in _binary_layouts.items()
+}
+
+# Size of the payload following each opcode
+binary_sizes = {code: layout.size for code, (layout, _) in _binary_decoders.items()}
+
+
+def write_binary_command(command: Command) -> bytes:
+    """
+    Serialize a command to its binary form.
+
+    Commands start with a one-byte opcode (the same code as in
+    :func:`pack_command`), followed by a payload whose size only depends on
+    the opcode: one byte for a player number, a bid value or a card index,
+    and five little-endian bytes for the bitmask of a hand.
+
+    :param command: command to serialize
+    :returns: serialized command
+    :raises ValueError: if a player number or bid value does not fit in a byte
+    """
+    encoder = _binary_encoders.get(type(command))
+
+    if encoder is None:
+        raise ValueError(f"unknown command type '{type(command)}'")
+
+    layout, code, fields = encoder
+
+    try:
+        return layout.pack(code, *fields(command))
+    except struct.error:
+        raise ValueError(f"fields of {command} do not fit in bytes") from None
+
+
+def read_binary_command(code: int, payload: bytes) -> Command:
+    """
+    Read back a command from its binary form.
+
+    :param code: opcode of the command
+    :param payload: payload following the opcode, of the size given in
+        :data:`binary_sizes`
+    :returns: decoded command
+    """
+    decoder = _binary_decoders.get(code)
+
+    if decoder is None:
+        raise ValueError(f"invalid command code {code}")
+
+    layout, build = decoder
+    return build(*layout.unpack(payload))
@@ -0,0 +1,155 @@
+import json
+import os
+from collections.abc import Iterable, Sequence
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Self
+from .game import Scores
+
+
+@dataclass
+class Rating:
+    """Current rating of a single bot."""
+
+    # Elo rating of the bot
+    value: float
+
+    # Number of games taken into account in the rating
+    games: int = 0
+
+
+@dataclass
+class Ratings:
+    """
+    Elo ratings of bots playing in teams, updated after each game.
+
+    The rating of a team is the mean rating of its distinct members, and the
+    expected outcome of a game is computed from the difference between the
+    ratings of both teams as in the usual Elo system. After each game, all
+    members of a team gain or lose the same amount, proportional to the
+    difference between the actual and the expected outcome. Updates only
+    depend on the current ratings, so that results can be added as they
+    arrive without going back through past games.
+    """
+
+    # Rating given to bots playing their first game
+    initial: float = 1500
+
+    # Maximum rating change after a single game
+    k: float = 16
+
+    # Current rating of each known bot
+    bots: dict[str, Rating] = field(default_factory=dict)
+
+    # Total number of games taken into account
+    games: int = 0
+
+    def get(self, bot: str) -> Rating:
+        """Get the rating of a bot, creating it if needed."""
+        rating = self.bots.get(bot)
+
+        if rating is None:
+            rating = self.bots[bot] = Rating(self.initial)
+
+        return rating
+
+    def expected(self, team: Iterable[str], other: Iterable[str]) -> float:
+        """
+        Compute the expected outcome of a game for a team.
+
+        :param team: bots in the team
+        :param other: bots in the opposing team
+        :returns: expected outcome between 0 (sure loss) and 1 (sure win)
+        """
+        own_rating = self._team_rating(team)
+        other_rating = self._team_rating(other)
+        return 1 / (1 + 10 ** ((other_rating - own_rating) / 400))
+
+    def update(self, teams: Sequence[Iterable[str]], scores: Scores) -> None:
+        """
+        Take a game result into account.
+
+        :param teams: bots in team 0 (players 0 and 2) and team 1 (players 1
+            and 3), in any order and possibly repeated
+        :param scores: final scores of each team
+        """
+        team0, team1 = (set(team) for team in teams)
+        expected = self.expected(team0, team1)
+
+        if scores[0] > scores[1]:
+            outcome = 1.0
+        elif scores[0] < scores[1]:
+            outcome = 0.0
+        else:
+            outcome = 0.5
+
+        change = self.k * (outcome - expected)
+
+        for bot in team0:
+            rating = self.get(bot)
+            rating.value += change
+            rating.games += 1
+
+        for bot in team1:
+            rating = self.get(bot)
+            rating.value -= change
+            rating.games += 1
+
+        self.games += 1
+
+    def leaderboard(self) -> list[tuple[str, Rating]]:
+        """List bots by decreasing rating."""
+        return sorted(self.bots.items(), key=lambda item: -item[1].value)
+
+    def save(self, path: Path | str) -> None:
+        """
+        Write the ratings to a JSON file.
+
+        The previous contents of the file are atomically replaced, so that an
+        interruption while saving never leaves a partially-written file.
+
+        :param path: path to the file
+        """
+        data = {
+            "initial": self.initial,
+            "k": self.k,
+            "games": self.games,
+            "bots": {
+                bot: {"value": rating.value, "games": rating.games}
+                for bot, rating in self.bots.items()
+            },
+        }
+        temporary = Path(f"{path}.tmp")
+
+        with open(temporary, "w") as file:
+            json.dump(data, file, indent=2)
+            file.flush()
+            os.fsync(file.fileno())
+
+        os.replace(temporary, path)
+
+    @classmethod
+    def load(cls, path: Path | str) -> Self:
+        """
+        Read back ratings saved with :meth:`save`.
+
+        :param path: path to the file
+        :returns: loaded ratings
+        """
+        with open(path) as file:
+            data = json.load(file)
+
+        return cls(
+            initial=data["initial"],
+            k=data["k"],
+            games=data["games"],
+            bots={
+                bot: Rating(rating["value"], rating["games"])
+                for bot, rating in data["bots"].items()
+            },
+        )
+
+    def _team_rating(self, team: Iterable[str]) -> float:
+        """Compute the mean rating of the distinct members of a team."""
+        members = set(team)
+        return sum(self.get(bot).value for bot in members) / len(members)
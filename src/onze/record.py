@@ -0,0 +1,527 @@
+import mmap
+import os
+import struct
+import time
+from collections.abc import Callable, Iterator, Sequence
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Self
+from .cards import (
+    Card,
+    Hands,
+    Mask,
+    card_indices,
+    card_scores,
+    card_strengths,
+    full_mask,
+    hand_to_mask,
+    ranks,
+    score_trick_indices,
+)
+from .game import GameState, Scores, _add_round_scores
+
+
+@dataclass
+class RoundRecord:
+    """Events of a single round of a recorded game."""
+
+    # Hands dealt to each player, as bitmasks
+    hands: list[Mask]
+
+    # Confirmed bids in order, as (player, bid, seconds taken to answer)
+    # triples, including the final default bid if everyone passed
+    bids: list[tuple[int, int, float]] = field(default_factory=list)
+
+    # Played cards in order, as (player, card index, seconds taken to answer)
+    # triples
+    cards: list[tuple[int, int, float]] = field(default_factory=list)
+
+    # Winner of the bidding and value of the winning bid
+    bidder: int = -1
+    bid: int = 0
+
+    # Points collected by each team during the round
+    points: Scores = field(default_factory=lambda: {0: 0, 1: 0})
+
+    # Total scores of each team at the end of the round
+    scores: Scores = field(default_factory=lambda: {0: 0, 1: 0})
+
+
+@dataclass
+class GameRecord:
+    """Complete record of a game."""
+
+    # Description of the seat of each player, such as the path to its bot
+    seats: list[str]
+
+    # Seed used for dealing cards
+    seed: int
+
+    # Rounds in the order they were played
+    rounds: list[RoundRecord] = field(default_factory=list)
+
+    # Final scores of each team
+    scores: Scores = field(default_factory=lambda: {0: 0, 1: 0})
+
+    # Time at which the game started, in seconds since the epoch
+    started: float = 0
+
+    # Duration of the game in seconds
+    duration: float = 0
+
+
+class GameRecorder:
+    """
+    Build the record of a game from the events reported by the judge.
+
+    Recording only appends to lists during the game; derived information
+    such as the winning bid and the points of each round is computed once
+    each round is complete.
+    """
+
+    record: GameRecord
+    _start: float
+
+    def __init__(self, seats: Sequence[str], seed: int):
+        self.record = GameRecord(list(seats), seed, started=time.time())
+        self._start = time.perf_counter()
+
+    def deal(self, hands: Hands) -> None:
+        """Start a new round with the given hands."""
+        self.record.rounds.append(RoundRecord(list(map(hand_to_mask, hands))))
+
+    def bid(self, player: int, bid: int, elapsed: float = 0) -> None:
+        """Record a confirmed bid and the time taken to make it."""
+        self.record.rounds[-1].bids.append((player, bid, elapsed))
+
+    def card(self, player: int, card: Card, elapsed: float = 0) -> None:
+        """Record a played card and the time taken to play it."""
+        current = self.record.rounds[-1]
+        current.cards.append((player, card_indices[card], elapsed))
+
+        if len(current.cards) == sum(hand.bit_count() for hand in current.hands):
+            self._finish_round(current)
+
+    def finish(self, scores: Scores) -> GameRecord:
+        """
+        Complete the record at the end of the game.
+
+        :param scores: final scores of each team
+        :returns: game record
+        """
+        self.record.scores = dict(scores)
+        self.record.duration = time.perf_counter() - self._start
+        return self.record
+
+    def _finish_round(self, current: RoundRecord) -> None:
+        rounds = self.record.rounds
+        _complete_round(current, rounds[-2].scores if len(rounds) > 1 else None)
+
+
+def _complete_round(entry: RoundRecord, previous: Scores | None) -> None:
+    """Compute the derived information of a round once all cards are played."""
+    # Bids strictly increase, so the last non-zero bid is the winning one
+    entry.bidder, entry.bid = next(
+        (player, bid) for player, bid, _ in reversed(entry.bids) if bid != 0
+    )
+    entry.points = {0: 0, 1: 0}
+    trump = entry.cards[0][1] // len(ranks)
+
+    for start in range(0, len(entry.cards), 4):
+        trick = entry.cards[start : start + 4]
+        points, winner = score_trick_indices([card for _, card, _ in trick], trump)
+        entry.points[trick[winner][0] % 2] += points
+
+    entry.scores = {0: 0, 1: 0} if previous is None else dict(previous)
+    _add_round_scores(entry.scores, entry.bidder, entry.bid, entry.points)
+
+
+# Binary record files start with this signature, followed by records which
+# each start with their length in bytes
+_file_signature = b"ONZE\x03"
+_length = struct.Struct("<I")
+
+# Seed, final scores of both teams and number of rounds of a record
+_header = struct.Struct("<QiiH")
+
+# Number of cards in the deck and dealt to each player
+_deck_size = full_mask.bit_count()
+_hand_size = _deck_size // 4
+
+# Bytes taken by the hands of the first three players of a round
+_hands_size = 3 * _deck_size // 8
+
+# Bits taken by each played card
+_card_bits = 6
+
+# Range of bids accepted by the bidding rules, which are multiples of 5
+_minimum_bid = 50
+_maximum_bid = 105
+_bid_unit = 5
+
+
+def write_record(record: GameRecord) -> bytes:
+    """
+    Serialize a game record to its compact binary form.
+
+    Each round is stored as a fixed-width byte-aligned block, which can be
+    decoded without replaying the game: the hands of the first three players
+    as 40-bit masks, the number of bids followed by one byte for each bid
+    holding its player and value, then the number of played cards followed by
+    a 6-bit code for each card. A round takes about 52 bytes. Answer times,
+    seats and derived information such as round points are not stored.
+
+    :param record: game record, with a seed between 0 and 2⁶⁴ - 1
+    :returns: serialized record, without the length prefix
+    :raises ValueError: if the seed is out of range, or if the record
+        contains moves which do not follow the game rules
+    """
+    if not 0 <= record.seed < 1 << 64:
+        raise ValueError(f"seed {record.seed} is not between 0 and 2⁶⁴ - 1")
+
+    chunks = [
+        _header.pack(
+            record.seed, record.scores[0], record.scores[1], len(record.rounds)
+        )
+    ]
+
+    for number, entry in enumerate(record.rounds):
+        try:
+            chunks.append(_pack_round(entry))
+        except ValueError as error:
+            raise ValueError(f"cannot pack round {number}: {error}") from None
+
+    return b"".join(chunks)
+
+
+def _pack_round(entry: RoundRecord) -> bytes:
+    """Encode a round, after checking that it follows the game rules."""
+    available = full_mask
+
+    for hand in entry.hands[:3]:
+        if hand & ~available or hand.bit_count() != _hand_size:
+            raise ValueError("hands are not a full deal")
+
+        available &= ~hand
+
+    if entry.hands[3] != available:
+        raise ValueError("hands are not a full deal")
+
+    if not entry.bids:
+        raise ValueError("no bids")
+
+    replies = iter(entry.bids)
+
+    def choose_bid(player: int, minimum: int) -> int:
+        other, bid, _ = next(replies, (player, 0, 0))
+
+        if (
+            other != player
+            or bid != 0
+            and not (minimum <= bid <= _maximum_bid and bid % _bid_unit == 0)
+        ):
+            raise ValueError(f"unexpected bid {bid} from player {other}")
+
+        return bid
+
+    bids = _run_bidding(entry.bids[0][0], choose_bid)
+
+    if [bid[:2] for bid in bids] != [bid[:2] for bid in entry.bids]:
+        raise ValueError("bids do not follow the bidding rules")
+
+    state = GameState(entry.bidder, entry.hands)
+    codes = 0
+
+    for position, (player, card, _) in enumerate(entry.cards):
+        if player != state.player or not state.legal_mask() >> card & 1:
+            raise ValueError(f"illegal card {card} from player {player}")
+
+        codes |= card << position * _card_bits
+        state.play(card)
+
+    hands = (
+        entry.hands[0]
+        | entry.hands[1] << _deck_size
+        | entry.hands[2] << (2 * _deck_size)
+    )
+    return b"".join(
+        (
+            hands.to_bytes(_hands_size, "little"),
+            bytes([len(bids)]),
+            bytes(player | bid // _bid_unit << 2 for player, bid, _ in bids),
+            bytes([len(entry.cards)]),
+            codes.to_bytes(_codes_size(len(entry.cards)), "little"),
+        )
+    )
+
+
+def _codes_size(count: int) -> int:
+    """Count the bytes taken by the codes of a given number of cards."""
+    return (count * _card_bits + 7) // 8
+
+
+def _run_bidding(
+    starter: int, choose_bid: Callable[[int, int], int]
+) -> list[tuple[int, int, float]]:
+    """
+    Replay a bidding round following the same rules as :func:`game.bid()`.
+
+    :param starter: initial bidder
+    :param choose_bid: called with each bidder and the minimum bid they can
+        make, returns the bid or 0 to pass
+    :returns: confirmed bids, including the default bid if everyone passed
+    """
+    pending_bids = {player: 0 for player in range(4)}
+    minimum_bid = _minimum_bid
+    bidder = starter
+    bids = []
+
+    while len(pending_bids) > 1:
+        bid_value = choose_bid(bidder, minimum_bid)
+
+        if bid_value != 0:
+            pending_bids[bidder] = bid_value
+            minimum_bid = bid_value + _bid_unit
+        else:
+            del pending_bids[bidder]
+
+        bids.append((bidder, bid_value, 0.0))
+        bidder = (bidder + 1) % 4
+
+        while bidder not in pending_bids:
+            bidder = (bidder + 1) % 4
+
+    winner, bid_value = next(iter(pending_bids.items()))
+
+    if bid_value == 0:
+        bids.append((winner, _minimum_bid, 0.0))
+
+    return bids
+
+
+def read_record(data: bytes | memoryview) -> GameRecord:
+    """
+    Read back a game record from its compact binary form.
+
+    Moves are decoded without replaying the game, the players of each card
+    being recomputed from the winners of the previous tricks; use
+    :func:`replay()` to check that they follow the game rules. Answer times
+    are set to zero and seats are left empty.
+
+    :param data: serialized record, without the length prefix
+    :returns: game record
+    :raises ValueError: if the record is truncated or corrupt
+    """
+    if len(data) < _header.size:
+        raise ValueError("truncated record")
+
+    seed, score0, score1, count = _header.unpack_from(data)
+    record = GameRecord([], seed)
+    offset = _header.size
+    previous = None
+
+    for number in range(count):
+        try:
+            entry, offset = _unpack_round(data, offset, previous)
+        except ValueError as error:
+            raise ValueError(f"round {number}: {error}") from None
+
+        if entry.cards:
+            previous = entry.scores
+
+        record.rounds.append(entry)
+
+    if offset != len(data):
+        raise ValueError("trailing data after the last round")
+
+    record.scores = {0: score0, 1: score1}
+    return record
+
+
+def _unpack_round(
+    data: bytes | memoryview, offset: int, previous: Scores | None
+) -> tuple[RoundRecord, int]:
+    """
+    Decode a round starting at a given offset.
+
+    The derived information of the round is computed along with the players
+    of each card, as :func:`_complete_round()` does from recorded players.
+
+    :param data: serialized record
+    :param offset: offset of the round in the record
+    :param previous: total scores at the end of the previous round, if any
+    :returns: decoded round and offset of the next round
+    :raises ValueError: if the round is truncated or corrupt
+    """
+    end = offset + _hands_size + 1
+
+    if end > len(data):
+        raise ValueError("truncated record")
+
+    hands = int.from_bytes(data[offset : end - 1], "little")
+    first = hands & full_mask
+    second = hands >> _deck_size & full_mask
+    third = hands >> (2 * _deck_size)
+    dealt = [first, second, third, full_mask & ~(first | second | third)]
+
+    if any(hand.bit_count() != _hand_size for hand in dealt):
+        raise ValueError("hands are not a full deal")
+
+    offset = end
+    end = offset + data[offset - 1] + 1
+
+    if end > len(data):
+        raise ValueError("truncated record")
+
+    bids = [(byte & 3, (byte >> 2) * _bid_unit, 0.0) for byte in data[offset : end - 1]]
+    # Bids strictly increase, so the last non-zero bid is the winning one
+    bidder, bid = next(
+        ((player, bid) for player, bid, _ in reversed(bids) if bid), (-1, 0)
+    )
+
+    if bidder == -1:
+        raise ValueError("no winning bid")
+
+    count = data[end - 1]
+    offset = end
+    end = offset + _codes_size(count)
+
+    if count > _deck_size or end > len(data):
+        raise ValueError("truncated record")
+
+    codes = int.from_bytes(data[offset:end], "little")
+    mask = (1 << _card_bits) - 1
+    played = [
+        codes >> shift & mask for shift in range(0, count * _card_bits, _card_bits)
+    ]
+
+    if played and max(played) >= _deck_size:
+        raise ValueError("unknown card")
+
+    entry = RoundRecord(dealt, bids)
+
+    if not played:
+        return entry, end
+
+    entry.bidder = leader = bidder
+    entry.bid = bid
+    trump = played[0] // len(ranks)
+
+    for start in range(0, count, 4):
+        trick = played[start : start + 4]
+        entry.cards.extend(zip(_trick_players[leader], trick, _no_times))
+        strengths = card_strengths[trick[0] // len(ranks)][trump]
+        leader = (leader + trick.index(max(trick, key=strengths.__getitem__))) % 4
+        entry.points[leader % 2] += sum(map(card_scores.__getitem__, trick))
+
+    entry.scores = {0: 0, 1: 0} if previous is None else dict(previous)
+    _add_round_scores(entry.scores, entry.bidder, entry.bid, entry.points)
+    return entry, end
+
+
+# Players of each card of a trick led by each player, and answer times of
+# decoded cards
+_trick_players = [
+    tuple((leader + index) % 4 for index in range(4)) for leader in range(4)
+]
+_no_times = (0.0,) * 4
+
+
+class RecordWriter:
+    """Append game records to a binary record file."""
+
+    def __init__(self, path: Path | str):
+        self.file = open(path, "ab")
+
+        if self.file.tell() == 0:
+            self.file.write(_file_signature)
+
+    def write(self, record: GameRecord) -> None:
+        """Append a record to the file."""
+        data = write_record(record)
+        self.file.write(_length.pack(len(data)) + data)
+
+    def close(self) -> None:
+        """Flush all written records and close the file."""
+        self.file.close()
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, exc_type, value, traceback) -> None:
+        self.close()
+
+
+def iter_records(path: Path | str) -> Iterator[memoryview]:
+    """
+    Iterate over the serialized records of a binary record file.
+
+    The file is memory-mapped and records are not decoded, which makes
+    iterating over many records fast; use :func:`read_record` to decode them.
+    The file must not be truncated while views of it are in use.
+
+    :param path: path to the file
+    :returns: serialized records, as views of the mapped file
+    :raises ValueError: if the file is not a record file or is truncated
+    """
+    with open(path, "rb") as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            return
+
+        # The mapping stays alive as long as views of it are referenced
+        view = memoryview(mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ))
+
+    if view[: len(_file_signature)] != _file_signature:
+        raise ValueError(f"'{path}' is not a game record file")
+
+    offset = len(_file_signature)
+    end = len(view)
+
+    while offset < end:
+        if offset + _length.size > end:
+            raise ValueError(f"'{path}' is truncated at byte {offset}")
+
+        (size,) = _length.unpack_from(view, offset)
+        offset += _length.size
+
+        if offset + size > end:
+            raise ValueError(f"'{path}' is truncated at byte {offset}")
+
+        yield view[offset : offset + size]
+        offset += size
+
+
+def read_records(path: Path | str) -> Iterator[GameRecord]:
+    """Iterate over the decoded records of a binary record file."""
+    for data in iter_records(path):
+        yield read_record(data)
+
+
+def replay(record: GameRecord) -> Scores:
+    """
+    Replay the cards of a record and compute the final scores.
+
+    Rounds are replayed from their recorded hands using :class:`GameState`,
+    without dealing cards again.
+
+    :param record: game record
+    :returns: final scores of each team
+    :raises ValueError: if a recorded card is not a legal move
+    """
+    scores = {0: 0, 1: 0}
+
+    for number, entry in enumerate(record.rounds):
+        state = GameState(entry.bidder, entry.hands)
+
+        for player, card, _ in entry.cards:
+            if player != state.player or not state.legal_mask() >> card & 1:
+                raise ValueError(
+                    f"illegal card {card} from player {player} in round {number}"
+                )
+
+            state.play(card)
+
+        points = {0: state.scores[0], 1: state.scores[1]}
+        _add_round_scores(scores, entry.bidder, entry.bid, points)
+
+    return scores
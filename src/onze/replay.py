@@ -0,0 +1,231 @@
+import argparse
+import asyncio
+import sys
+from collections.abc import Sequence
+from random import Random
+from . import game
+from .cards import Card, Hands, cards, deal_random_hands, hand_to_mask
+from .judge import parse_limit
+from .record import GameRecord, RoundRecord, iter_records, read_record
+
+
+class _RecordedSeats:
+    """Stub seats answering queries with the moves of a recorded game."""
+
+    def __init__(self, record: GameRecord):
+        self.record = record
+        self.random = Random(record.seed)
+        self.rounds = 0
+        self.bid_queries = 0
+        self.bid_replies = 0
+        self.card_queries = 0
+        self.card_replies = 0
+
+    @property
+    def current(self) -> RoundRecord:
+        return self.record.rounds[self.rounds - 1]
+
+    def deal_hands(self) -> Hands:
+        hands = deal_random_hands(self.random)
+        expected = self.record.rounds[self.rounds].hands
+
+        if [hand_to_mask(hand) for hand in hands] != expected:
+            raise ValueError(f"hands of round {self.rounds} do not match the seed")
+
+        self.rounds += 1
+        self.bid_queries = self.bid_replies = 0
+        self.card_queries = self.card_replies = 0
+        return hands
+
+    def query_bid(self, player: int) -> int:
+        bids = self.current.bids
+
+        if self.bid_queries >= len(bids) or bids[self.bid_queries][0] != player:
+            raise ValueError(f"unexpected bid from player {player}")
+
+        self.bid_queries += 1
+        return bids[self.bid_queries - 1][1]
+
+    def reply_bid(self, player: int, bid: int) -> None:
+        bids = self.current.bids
+
+        expected = bids[self.bid_replies][:2] if self.bid_replies < len(bids) else None
+
+        if expected != (player, bid):
+            raise ValueError(f"unexpected bid {bid} from player {player}")
+
+        self.bid_replies += 1
+
+        # The default bid is confirmed without being queried
+        self.bid_queries = max(self.bid_queries, self.bid_replies)
+
+    def query_card(self, player: int) -> Card:
+        played = self.current.cards
+
+        if self.card_queries >= len(played) or played[self.card_queries][0] != player:
+            raise ValueError(f"unexpected card from player {player}")
+
+        self.card_queries += 1
+        return cards[played[self.card_queries - 1][1]]
+
+    def reply_card(self, player: int, card: Card) -> None:
+        played = self.current.cards
+
+        if cards[played[self.card_replies][1]] != card:
+            raise ValueError(f"illegal card from player {player}")
+
+        self.card_replies += 1
+
+
+def verify_record(
+    record: GameRecord,
+    winning_score: int | None = 500,
+    use_sync: bool = False,
+) -> game.Scores:
+    """
+    Replay a recorded game through the game engine and check its outcome.
+
+    Cards are dealt again from the recorded seed, and players are replaced
+    with stubs answering with the recorded moves. The game must deal the
+    recorded hands, accept every recorded move as is, end after the recorded
+    number of rounds, and give the recorded scores.
+
+    :param record: game record
+    :param winning_score: score with which the recorded game was played
+    :param use_sync: use :func:`game.play_sync` instead of :func:`game.play`
+    :returns: final scores of the replayed game
+    :raises ValueError: if the replay does not match the record
+    """
+    seats = _RecordedSeats(record)
+    max_rounds = len(record.rounds) - 1
+
+    if use_sync:
+        scores = game.play_sync(
+            starter=0,
+            deal_hands=seats.deal_hands,
+            query_bid=seats.query_bid,
+            reply_bid=seats.reply_bid,
+            query_card=seats.query_card,
+            reply_card=seats.reply_card,
+            max_rounds=max_rounds,
+            winning_score=winning_score,
+        )
+    else:
+
+        async def deal_hands() -> Hands:
+            return seats.deal_hands()
+
+        async def query_bid(player: int) -> int:
+            return seats.query_bid(player)
+
+        async def reply_bid(player: int, bid: int) -> None:
+            seats.reply_bid(player, bid)
+
+        async def query_card(player: int) -> Card | None:
+            return seats.query_card(player)
+
+        async def reply_card(player: int, card: Card) -> None:
+            seats.reply_card(player, card)
+
+        scores = asyncio.run(
+            game.play(
+                starter=0,
+                deal_hands=deal_hands,
+                query_bid=query_bid,
+                reply_bid=reply_bid,
+                query_card=query_card,
+                reply_card=reply_card,
+                max_rounds=max_rounds,
+                winning_score=winning_score,
+            )
+        )
+
+    if seats.rounds != len(record.rounds):
+        raise ValueError(
+            f"game ends after {seats.rounds} of {len(record.rounds)} recorded rounds"
+        )
+
+    if scores != record.scores:
+        raise ValueError(f"scores {scores} do not match recorded {record.scores}")
+
+    return scores
+
+
+def parse_args(argv: Sequence[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="onze replay",
+        description=(
+            "Replay recorded games through the game engine without running "
+            "any bot, and check that they give the recorded results."
+        ),
+    )
+    parser.add_argument("records", nargs="+", help="paths to game record files")
+    parser.add_argument(
+        "-w",
+        "--winning-score",
+        default="500",
+        help=(
+            "score with which the games were played, or inf if the games "
+            "were only limited in rounds (default: %(default)s)"
+        ),
+    )
+    parser.add_argument(
+        "--sync",
+        action="store_true",
+        help="use the synchronous game engine instead of the asynchronous one",
+    )
+    parser.add_argument(
+        "-q",
+        "--quiet",
+        action="store_true",
+        help="only report games which do not match their record",
+    )
+    return parser.parse_args(argv)
+
+
+def run_replay(argv: Sequence[str] | None = None) -> int:
+    """
+    Replay recorded games following command line arguments.
+
+    :param argv: command line arguments, excluding the program name
+    :returns: number of games which do not match their record
+    """
+    args = parse_args(argv)
+    winning_score = parse_limit(args.winning_score)
+    total = 0
+    failed = 0
+
+    for path in args.records:
+        index = -1
+
+        try:
+            for index, data in enumerate(iter_records(path)):
+                total += 1
+
+                try:
+                    record = read_record(data)
+                except ValueError as error:
+                    failed += 1
+                    print(f"[replay] {path}:{index} corrupt: {error}", file=sys.stderr)
+                    continue
+
+                try:
+                    scores = verify_record(record, winning_score, args.sync)
+
+                    if not args.quiet:
+                        print(f"[replay] {path}:{index} seed={record.seed} {scores=}")
+                except ValueError as error:
+                    failed += 1
+                    print(
+                        f"[replay] {path}:{index} seed={record.seed} "
+                        f"mismatch: {error}",
+                        file=sys.stderr,
+                    )
+        except (OSError, ValueError) as error:
+            # Records after a truncated or unreadable part cannot be found
+            total += 1
+            failed += 1
+            print(f"[replay] {path}:{index + 1} unreadable: {error}", file=sys.stderr)
+
+    print(f"[replay] {total - failed}/{total} games match their record")
+    return failed
@@ -0,0 +1,203 @@
+import queue
+import sqlite3
+import threading
+from pathlib import Path
+from .record import GameRecord
+
+_schema = """
+create table if not exists games (
+    id integer primary key,
+    seed integer not null,
+    team0 text not null,
+    team1 text not null,
+    score0 integer not null,
+    score1 integer not null,
+    started real not null,
+    duration real not null
+);
+
+create table if not exists seats (
+    game integer not null references games (id),
+    player integer not null,
+    bot text not null,
+    primary key (game, player)
+);
+
+create table if not exists rounds (
+    game integer not null references games (id),
+    round integer not null,
+    hand0 integer not null,
+    hand1 integer not null,
+    hand2 integer not null,
+    hand3 integer not null,
+    bidder integer not null,
+    bidder_bot text not null,
+    bid integer not null,
+    points0 integer not null,
+    points1 integer not null,
+    score0 integer not null,
+    score1 integer not null,
+    primary key (game, round)
+);
+
+create table if not exists bids (
+    game integer not null references games (id),
+    round integer not null,
+    position integer not null,
+    player integer not null,
+    bid integer not null,
+    time real not null,
+    primary key (game, round, position)
+);
+
+create table if not exists cards (
+    game integer not null references games (id),
+    round integer not null,
+    position integer not null,
+    player integer not null,
+    card integer not null,
+    time real not null,
+    primary key (game, round, position)
+);
+
+create index if not exists games_seed on games (seed);
+create index if not exists games_team0 on games (team0, team1);
+create index if not exists games_team1 on games (team1, team0);
+create index if not exists seats_bot on seats (bot, game);
+create index if not exists rounds_bidder_bot on rounds (bidder_bot, bid);
+"""
+
+
+def insert_game(connection: sqlite3.Connection, record: GameRecord) -> int:
+    """
+    Insert a game record into a results database.
+
+    Teams are identified by the seats of players 0 and 1, and rounds store
+    the bot of the winning bidder so that common queries need no joins. Card
+    indices and hands follow the representation of :mod:`cards`.
+
+    :param connection: connection to a database with the results schema
+    :param record: game record
+    :returns: identifier of the inserted game
+    """
+    cursor = connection.execute(
+        "insert into games (seed, team0, team1, score0, score1, started, duration) "
+        "values (?, ?, ?, ?, ?, ?, ?)",
+        (
+            # SQLite integers are signed 64-bit values
+            record.seed - (1 << 64) if record.seed >= 1 << 63 else record.seed,
+            record.seats[0],
+            record.seats[1],
+            record.scores[0],
+            record.scores[1],
+            record.started,
+            record.duration,
+        ),
+    )
+    game = cursor.lastrowid
+    assert game is not None
+
+    connection.executemany(
+        "insert into seats values (?, ?, ?)",
+        [(game, player, bot) for player, bot in enumerate(record.seats)],
+    )
+    connection.executemany(
+        "insert into rounds values (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        [
+            (
+                game,
+                index,
+                *entry.hands,
+                entry.bidder,
+                record.seats[entry.bidder],
+                entry.bid,
+                entry.points[0],
+                entry.points[1],
+                entry.scores[0],
+                entry.scores[1],
+            )
+            for index, entry in enumerate(record.rounds)
+        ],
+    )
+    connection.executemany(
+        "insert into bids values (?, ?, ?, ?, ?, ?)",
+        [
+            (game, index, position, player, bid, elapsed)
+            for index, entry in enumerate(record.rounds)
+            for position, (player, bid, elapsed) in enumerate(entry.bids)
+        ],
+    )
+    connection.executemany(
+        "insert into cards values (?, ?, ?, ?, ?, ?)",
+        [
+            (game, index, position, player, card, elapsed)
+            for index, entry in enumerate(record.rounds)
+            for position, (player, card, elapsed) in enumerate(entry.cards)
+        ],
+    )
+    return game
+
+
+class ResultsStore:
+    """
+    Store game records in a SQLite database from a background thread.
+
+    Records are queued without blocking the caller, and a writer thread
+    inserts all queued records in a single transaction, so that the game loop
+    never waits for the disk and many small games are written in batches.
+    """
+
+    # Path to the database file
+    path: Path
+
+    # Maximum number of games inserted in a single transaction
+    batch_size: int
+
+    _queue: queue.Queue[GameRecord | None]
+    _thread: threading.Thread
+
+    def __init__(self, path: Path | str, batch_size: int = 1000):
+        self.path = Path(path)
+        self.batch_size = batch_size
+        self._queue = queue.Queue()
+
+        # Create the schema upfront so that errors are reported to the caller
+        with sqlite3.connect(self.path) as connection:
+            connection.executescript(_schema)
+
+        connection.close()
+        self._thread = threading.Thread(target=self._write, daemon=True)
+        self._thread.start()
+
+    def add(self, record: GameRecord) -> None:
+        """Queue a game record for insertion."""
+        self._queue.put(record)
+
+    def close(self) -> None:
+        """Wait for all queued records to be written and stop the writer."""
+        self._queue.put(None)
+        self._thread.join()
+
+    def _write(self) -> None:
+        connection = sqlite3.connect(self.path)
+        connection.execute("pragma journal_mode = wal")
+        connection.execute("pragma synchronous = normal")
+        running = True
+
+        while running:
+            batch = [self._queue.get()]
+
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            with connection:
+                for record in batch:
+                    if record is None:
+                        running = False
+                    else:
+                        insert_game(connection, record)
+
+        connection.close()
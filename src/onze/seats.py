@@ -1,33 +1,96 @@
-from collections.abc import Sequence
+from collections.abc import Awaitable, Callable, Sequence
+from contextlib import suppress
+from dataclasses import dataclass
 from typing import Protocol
-from asyncio import gather, create_task, create_subprocess_exec, Task
+from asyncio import (
+    Event,
+    IncompleteReadError,
+    gather,
+    get_running_loop,
+    sleep,
+    create_task,
+    create_subprocess_exec,
+    open_connection,
+    open_unix_connection,
+    wait_for,
+    StreamReader,
+    StreamWriter,
+    Task,
+)
 from asyncio.subprocess import Process, PIPE
 from pathlib import Path
+import os
+import struct
+import time
 from .box import create_boxed_subprocess_exec, Box
-from .protocol import Command, write_command
+from .bot import Bot, load_bot, respond
+from .protocol import (
+    Command,
+    EndCommand,
+    HandCommand,
+    NewGameCommand,
+    PlayerCommand,
+    QueryBidCommand,
+    QueryCardCommand,
+    ReplyBidCommand,
+    ReplyCardCommand,
+    binary_sizes,
+    binary_version,
+    pack_command,
+    read_binary_command,
+    unpack_command,
+    encode_command,
+    write_binary_command,
+    write_card,
+    read_address,
+    read_command,
+    write_command,
+)
+from .shm import Channel
+from .stats import Histogram
 
 
 class Seat(Protocol):
+    # Player number of this seat in the current game
+    player: int
+
     def __str__(self) -> str:
         """Return a human-readable description of this seat’s configuration."""
         ...
 
+    @property
+    def alive(self) -> bool:
+        """Whether this seat can still take part in games."""
+        return True
+
     async def close(self) -> None:
         """Close all resources attached to this seat."""
         ...
 
     async def send(self, command: Command) -> None:
         """Send a command to this seat."""
+        await self.send_line(write_command(command))
+
+    async def send_line(self, line: str) -> None:
+        """
+        Send an already-serialized command to this seat.
+
+        The command may be buffered until the next call to :meth:`flush`.
+        """
         ...
 
+    async def flush(self) -> None:
+        """Deliver all buffered commands to this seat."""
+
     async def receive(self) -> str:
         """Wait for the next message from this seat."""
         ...
 
     async def communicate(self, command: Command) -> str:
         """Send a command to this seat and wait for a response."""
-        _, response = await gather(self.send(command), self.receive())
-        return response
+        await self.send(command)
+        await self.flush()
+        return await self.receive()
 
 
 class TerminalSeat(Seat):
@@ -48,17 +111,207 @@ class TerminalSeat(Seat):
     async def close(self) -> None:
         pass
 
-    async def send(self, command: Command) -> None:
-        print(f"[seat {self.player}] <- {write_command(command)}")
+    async def send_line(self, line: str) -> None:
+        print(f"[seat {self.player}] <- {line}")
 
     async def receive(self) -> str:
         return input(f"[seat {self.player}] -> ")
 
 
-class SubprocessSeat(Seat):
-    """Unattended seat controlled by a separate process."""
+class InProcessSeat(Seat):
+    """
+    Unattended seat controlled by a Python bot running in the judge process.
+
+    Commands are handed to the bot as objects and its answers are taken
+    directly, without going through pipes or parsing the textual protocol.
+    Answers are formatted as a bot process would print them, so that the
+    game goes on exactly as if the bot was served over the protocol. The bot
+    runs on the judge’s event loop and cannot be interrupted: time limits
+    are accounted for but a slow answer holds up the whole game.
+    """
+
+    player: int
+    spec: str
+    bot: Bot
+
+    # Answers to the queries sent to the bot, waiting to be received
+    answers: list[str]
+
+    def __str__(self) -> str:
+        player = self.player
+        spec = self.spec
+        return f"InProcessSeat({player=}, {spec=})"
+
+    @classmethod
+    async def create(cls, player: int, spec: str):
+        """
+        Create a seat running a Python bot.
+
+        :param player: player number of the seat
+        :param spec: location of the bot class (see :func:`bot.load_bot`)
+        """
+        self = cls()
+        self.player = player
+        self.spec = spec
+        self.bot = load_bot(spec)()
+        self.answers = []
+        return self
+
+    async def close(self) -> None:
+        pass
+
+    async def send(self, command: Command) -> None:
+        match command:
+            case HandCommand(hand=hand):
+                # The judge keeps removing played cards from its own copy
+                self.bot.notify(HandCommand(set(hand)))
+
+            case _:
+                answer = respond(self.bot, command)
+
+                if answer is not None:
+                    self.answers.append(answer)
+
+    async def send_line(self, line: str) -> None:
+        await self.send(read_command(line))
+
+    async def receive(self) -> str:
+        return self.answers.pop(0) if self.answers else ""
+
+
+def _answer_text(command: Command) -> str:
+    """Convert an answer received in binary form to its textual form."""
+    match command:
+        case ReplyBidCommand(bid=bid):
+            return str(bid)
+
+        case ReplyCardCommand(card=card):
+            return write_card(card)
+
+        case _:
+            return ""
+
+
+class StreamSeat(Seat):
+    """
+    Unattended seat speaking the game protocol over a pair of streams.
+
+    The textual protocol is used unless the seat was created for a bot
+    supporting the binary protocol, in which case the binary protocol is
+    offered right after the first `player` command and used from then on if
+    the bot accepts it. If the bot does not answer the offer in time, the
+    textual protocol is kept; a bot which accepts the offer after that point
+    can no longer be understood, and all its later answers are empty.
+    """
 
     player: int
+    reader: StreamReader
+    writer: StreamWriter
+
+    # Seconds to wait for the answer to the binary protocol offer
+    handshake_timeout: float = 5
+
+    # Serialized commands waiting to be written to the stream in a single write
+    buffer: list[bytes]
+
+    # Whether to offer the binary protocol after the next `player` command
+    offer_binary: bool
+
+    # Whether the binary protocol is in use
+    binary: bool
+
+    # Whether the bot accepted the binary protocol after the offer expired
+    lost: bool
+
+    # Operation code of a binary answer whose payload is not yet read, if the
+    # last call to :meth:`receive` was interrupted between the two reads
+    _code: int | None
+
+    # Whether the answer to an expired binary protocol offer is still to come
+    _late_handshake: bool
+
+    def _open(
+        self, reader: StreamReader, writer: StreamWriter, binary: bool = False
+    ) -> None:
+        self.reader = reader
+        self.writer = writer
+        self.buffer = []
+        self.offer_binary = binary
+        self.binary = False
+        self.lost = False
+        self._code = None
+        self._late_handshake = False
+
+    async def send(self, command: Command) -> None:
+        if self.binary:
+            self.buffer.append(write_binary_command(command))
+            return
+
+        self.buffer.append(encode_command(command))
+
+        if self.offer_binary and isinstance(command, PlayerCommand):
+            self.offer_binary = False
+            handshake = f"binary {binary_version}"
+            await self.send_line(handshake)
+            await self.flush()
+
+            try:
+                answer = await wait_for(self.receive(), self.handshake_timeout)
+            except TimeoutError:
+                self._late_handshake = True
+                return
+
+            self.binary = answer == handshake
+
+    async def send_line(self, line: str) -> None:
+        if self.binary:
+            await self.send(read_command(line))
+        else:
+            self.buffer.append(f"{line}\n".encode())
+
+    async def flush(self) -> None:
+        if not self.buffer:
+            return
+
+        self.writer.write(b"".join(self.buffer))
+        self.buffer.clear()
+        await self.writer.drain()
+
+    async def receive(self) -> str:
+        if self.lost:
+            return ""
+
+        if not self.binary:
+            line = (await self.reader.readline()).decode().removesuffix("\n")
+
+            if self._late_handshake:
+                self._late_handshake = False
+
+                if line == f"binary {binary_version}":
+                    self.lost = True
+                    return ""
+
+                line = (await self.reader.readline()).decode().removesuffix("\n")
+
+            return line
+
+        try:
+            if self._code is None:
+                self._code = (await self.reader.readexactly(1))[0]
+
+            payload = await self.reader.readexactly(binary_sizes.get(self._code, 0))
+            code, self._code = self._code, None
+            command = read_binary_command(code, payload)
+        except (IncompleteReadError, ValueError, struct.error):
+            self._code = None
+            return ""
+
+        return _answer_text(command)
+
+
+class SubprocessSeat(StreamSeat):
+    """Unattended seat controlled by a separate process."""
+
     args: Sequence[str]
     box: Box | None
     process: Process
@@ -77,7 +330,17 @@ class SubprocessSeat(Seat):
         *args: str,
         cwd: Path | str | None = None,
         box: Box | None = None,
+        binary: bool = False,
     ):
+        """
+        Start a bot process.
+
+        :param player: player number of the seat
+        :param args: program to run and its arguments
+        :param cwd: working directory of the process
+        :param box: if given, isolation settings of the process
+        :param binary: whether the bot supports the binary protocol
+        """
         self = cls()
         self.player = player
         self.args = args
@@ -101,10 +364,21 @@ class SubprocessSeat(Seat):
                 cwd=cwd,
             )
 
+        assert self.process.stdout is not None and self.process.stdin is not None
+        self._open(self.process.stdout, self.process.stdin, binary)
         self.log_stderr_task = create_task(self._log_stderr())
         return self
 
+    @property
+    def alive(self) -> bool:
+        """Whether the seat process is still running and can be understood."""
+        return self.process.returncode is None and not self.lost
+
     async def close(self) -> None:
+        # The process may already have exited
+        with suppress(ConnectionError):
+            await self.flush()
+
         await self.process.wait()
         await self.log_stderr_task
 
@@ -114,22 +388,261 @@ class SubprocessSeat(Seat):
         while line := await self.process.stderr.readline():
             print(f"[seat {self.player}] {line.decode()}", end="")
 
+
+class SharedMemorySeat(SubprocessSeat):
+    """
+    Unattended seat controlled by a separate process through shared memory.
+
+    The process is started as a regular bot, and is then sent a `shm` line
+    giving the file descriptors of a :class:`shm.Channel` which it inherited.
+    All further commands and answers are exchanged as fixed-size binary
+    messages (see :func:`protocol.pack_command`) through the channel, which
+    saves pipe writes, reads and text encoding on each move.
+    """
+
+    channel: Channel
+
+    # Signalled when the process sends messages or exits
+    wakeup: Event
+
+    # Packed commands waiting to be written to the channel
+    messages: list[int]
+
+    @classmethod
+    async def create(
+        cls,
+        player: int,
+        *args: str,
+        cwd: Path | str | None = None,
+        box: Box | None = None,
+        binary: bool = False,
+    ):
+        if box is not None:
+            raise ValueError("shared memory seats cannot be isolated in a box")
+
+        self = cls()
+        self.player = player
+        self.args = args
+        self.box = None
+        self.channel = Channel.create()
+        self.wakeup = Event()
+        self.messages = []
+        self.process = await create_subprocess_exec(
+            *args,
+            stdin=PIPE,
+            stdout=PIPE,
+            stderr=PIPE,
+            cwd=cwd,
+            pass_fds=self.channel.fds,
+        )
+
+        assert self.process.stdout is not None and self.process.stdin is not None
+        self._open(self.process.stdout, self.process.stdin)
+        self.log_stderr_task = create_task(self._log_stderr())
+        get_running_loop().add_reader(self.channel.bot_event, self._wake)
+        self.writer.write(f"{self.channel.announce()}\n".encode())
+        await self.writer.drain()
+        return self
+
+    def _wake(self) -> None:
+        try:
+            os.eventfd_read(self.channel.bot_event)
+        except BlockingIOError:
+            pass
+
+        self.wakeup.set()
+
+    async def _log_stderr(self) -> None:
+        await super()._log_stderr()
+
+        # The process is gone once its error stream is closed
+        self.wakeup.set()
+
+    async def close(self) -> None:
+        await self.flush()
+        await self.process.wait()
+        await self.log_stderr_task
+        get_running_loop().remove_reader(self.channel.bot_event)
+        self.channel.close()
+
     async def send(self, command: Command) -> None:
-        assert self.process.stdin is not None
-        self.process.stdin.write((write_command(command) + "\n").encode())
-        await self.process.stdin.drain()
+        self.messages.append(pack_command(command))
+
+    async def send_line(self, line: str) -> None:
+        await self.send(read_command(line))
+
+    async def flush(self) -> None:
+        if not self.messages:
+            return
+
+        while self.messages:
+            while not self.channel.outgoing.put(self.messages[0]):
+                # Give the process some time to catch up with the full ring
+                self.channel.signal()
+                await sleep(0.001)
+
+            # Messages are dropped as soon as they are sent, so that a flush
+            # interrupted while waiting does not send them again
+            self.messages.pop(0)
+
+        self.channel.signal()
 
     async def receive(self) -> str:
-        assert self.process.stdout is not None
-        return (await self.process.stdout.readline()).decode().removesuffix("\n")
+        while (message := self.channel.incoming.get()) is None:
+            if self.process.returncode is not None or self.log_stderr_task.done():
+                return ""
+
+            self.wakeup.clear()
+
+            if (message := self.channel.incoming.get()) is not None:
+                break
+
+            await self.wakeup.wait()
+
+        try:
+            return _answer_text(unpack_command(message))
+        except ValueError:
+            return ""
+
+
+class SocketSeat(StreamSeat):
+    """
+    Unattended seat controlled by a bot server reached through a socket.
+
+    Each seat opens its own connection, on which the bot server receives
+    the same commands as a bot process would on its standard input, so that
+    a single long-running server can play many games at once.
+    """
+
+    address: str
+
+    def __str__(self) -> str:
+        player = self.player
+        address = self.address
+        return f"SocketSeat({player=}, {address=})"
+
+    @classmethod
+    async def create(cls, player: int, address: str):
+        """
+        Connect to a bot server.
+
+        :param player: player number of the seat
+        :param address: address of the server (see :func:`protocol.read_address`)
+        """
+        self = cls()
+        self.player = player
+        self.address = address
+
+        match read_address(address):
+            case ("unix", path):
+                reader, writer = await open_unix_connection(path)
+
+            case ("tcp", host, port):
+                reader, writer = await open_connection(host, port)
+
+        self._open(reader, writer)
+        return self
+
+    @property
+    def alive(self) -> bool:
+        """Whether the connection to the server is still open."""
+        return not self.writer.is_closing() and not self.reader.at_eof()
+
+    async def close(self) -> None:
+        # The server may already have dropped the connection
+        with suppress(ConnectionError):
+            await self.flush()
+
+        self.writer.close()
+
+        with suppress(ConnectionError):
+            await self.writer.wait_closed()
+
+
+def _format_duration(nanoseconds: int) -> str:
+    if nanoseconds >= 1_000_000_000:
+        return f"{nanoseconds / 1e9:.2f}s"
+
+    if nanoseconds >= 1_000_000:
+        return f"{nanoseconds / 1e6:.2f}ms"
+
+    return f"{nanoseconds / 1e3:.0f}µs"
+
+
+# Names under which the latency of each kind of query is reported
+_query_kinds = {QueryBidCommand: "bid", QueryCardCommand: "card"}
+
+
+@dataclass
+class Clock:
+    """
+    Time allowed to a seat for answering queries, like a chess clock.
+
+    Each answer can take up to the move limit without cost. Time spent over
+    that limit is drawn from a bank shared by all the answers of a game, and
+    an answer is late once the bank is empty.
+    """
+
+    # Time allowed for each answer before drawing from the bank, in seconds,
+    # or None for no per-answer allowance
+    move_limit: float | None = None
+
+    # Remaining time in the bank, in seconds, or None for no bank
+    bank: float | None = None
+
+    def allowance(self) -> float | None:
+        """Get the time allowed for the next answer, or None if unlimited."""
+        if self.move_limit is None and self.bank is None:
+            return None
+
+        return (self.move_limit or 0) + (self.bank or 0)
+
+    def charge(self, duration: float) -> None:
+        """Draw the time spent over the move limit from the bank."""
+        if self.bank is not None:
+            self.bank = max(self.bank - max(duration - (self.move_limit or 0), 0), 0)
 
 
 class Table:
-    def __init__(self, seats: dict[int, Seat]):
+    # Seat of each player
+    seats: dict[int, Seat]
+
+    # Time allowed to each player with a time limit
+    clocks: dict[int, Clock]
+
+    # Number of queries that each player failed to answer in time
+    overruns: dict[int, int]
+
+    # Distribution of the time taken by each seat to answer each kind of query
+    latencies: dict[int, dict[str, Histogram]]
+
+    # Duration of the last query, in seconds
+    last_latency: float
+
+    # Total time spent waiting for answers, in nanoseconds
+    waiting: int
+
+    # Creation time of the table, in nanoseconds on the monotonic clock
+    _created: int
+
+    # Number of late answers that each player still has to send, which must
+    # be discarded before reading the answer to the next query; seats which
+    # still owe late answers at the end of the game cannot be reused
+    stale: dict[int, int]
+
+    def __init__(self, seats: dict[int, Seat], clocks: dict[int, Clock] | None = None):
         self.seats = seats
+        self.clocks = clocks or {}
+        self.overruns = {player: 0 for player in seats}
+        self.stale = {player: 0 for player in seats}
+        self.latencies = {player: {} for player in seats}
+        self.last_latency = 0
+        self.waiting = 0
+        self._created = time.perf_counter_ns()
 
     async def broadcast(self, command: Command) -> None:
-        await gather(*(seat.send(command) for seat in self.seats.values()))
+        for seat in self.seats.values():
+            await seat.send(command)
 
     async def close(self) -> None:
         await gather(*(seat.close() for seat in self.seats.values()))
@@ -141,4 +654,198 @@ class Table:
         return await self.seats[player].receive()
 
     async def communicate(self, player: int, command: Command) -> str:
-        return await self.seats[player].communicate(command)
+        """
+        Send a query to a seat and wait for its answer.
+
+        If the seat has a clock and does not answer in time, an empty answer
+        is returned instead, which the game rules replace by a default move.
+        The late answer is discarded when it arrives.
+        """
+        clock = self.clocks.get(player)
+        allowance = clock.allowance() if clock is not None else None
+        start = time.perf_counter_ns()
+
+        try:
+            response = await wait_for(self._exchange(player, command), allowance)
+        except TimeoutError:
+            self.overruns[player] += 1
+            self.stale[player] += 1
+            response = ""
+
+        duration = time.perf_counter_ns() - start
+
+        if clock is not None:
+            clock.charge(duration / 1e9)
+
+        kind = _query_kinds.get(type(command), type(command).__name__)
+        histograms = self.latencies[player]
+
+        if kind not in histograms:
+            histograms[kind] = Histogram()
+
+        histograms[kind].add(duration)
+        self.last_latency = duration / 1e9
+        self.waiting += duration
+        return response
+
+    async def _exchange(self, player: int, command: Command) -> str:
+        seat = self.seats[player]
+
+        if not self.stale[player]:
+            return await seat.communicate(command)
+
+        async def receive_fresh() -> str:
+            while self.stale[player]:
+                await seat.receive()
+                self.stale[player] -= 1
+
+            return await seat.receive()
+
+        await seat.send(command)
+        await seat.flush()
+        return await receive_fresh()
+
+    def summary(self) -> list[str]:
+        """
+        Summarize the time taken by each seat to answer queries.
+
+        Time which is not spent waiting for seats is spent by the judge
+        itself, for example in sending commands or applying the game rules.
+
+        :returns: lines of the summary
+        """
+        lines = []
+
+        for player, histograms in self.latencies.items():
+            for kind, histogram in histograms.items():
+                values = " ".join(
+                    f"{name}={_format_duration(value)}"
+                    for name, value in (
+                        ("p50", histogram.quantile(0.5)),
+                        ("p95", histogram.quantile(0.95)),
+                        ("p99", histogram.quantile(0.99)),
+                        ("max", histogram.maximum),
+                    )
+                )
+                lines.append(f"seat {player} {kind}: count={histogram.count} {values}")
+
+            if self.overruns[player]:
+                lines.append(f"seat {player} overruns: {self.overruns[player]}")
+
+        elapsed = time.perf_counter_ns() - self._created
+        share = self.waiting / elapsed if elapsed else 0
+        lines.append(
+            f"total: elapsed={_format_duration(elapsed)} "
+            f"waiting={_format_duration(self.waiting)} ({share:.0%}), "
+            f"judge={_format_duration(elapsed - self.waiting)}"
+        )
+        return lines
+
+
+def read_features(path: Path | str) -> set[str]:
+    """
+    Read the set of protocol extensions supported by a bot.
+
+    Extensions are listed one per line in an optional file called `features`
+    at the root of the bot folder.
+
+    :param path: path to the bot folder
+    :returns: names of the supported extensions
+    """
+    try:
+        with open(Path(path) / "features") as file:
+            return {line.strip() for line in file if line.strip()}
+    except FileNotFoundError:
+        return set()
+
+
+class SeatPool:
+    """
+    Keep bot processes alive from one game to the next.
+
+    Bots that list the `newgame` extension in their features file are sent
+    a `newgame` command at the end of each game instead of `end`, and are
+    reused for later games using the same bot. Other bots are terminated at
+    the end of each game and a fresh process is started for the next one.
+    """
+
+    # Function used to start a new seat for a player from a bot path
+    spawn: Callable[[int, str], Awaitable[Seat]]
+
+    # Seats from finished games which are waiting to be reused, by bot path
+    idle: dict[str, list[Seat]]
+
+    # Bot path of each seat which can be reused
+    _paths: dict[Seat, str]
+
+    # Cached set of extensions supported by each bot path
+    _features: dict[str, set[str]]
+
+    def __init__(self, spawn: Callable[[int, str], Awaitable[Seat]]):
+        self.spawn = spawn
+        self.idle = {}
+        self._paths = {}
+        self._features = {}
+
+    def supports(self, path: str, feature: str) -> bool:
+        """Check whether a bot supports a protocol extension."""
+        if path not in self._features:
+            self._features[path] = read_features(path)
+
+        return feature in self._features[path]
+
+    async def acquire(self, player: int, path: str) -> Seat:
+        """
+        Get a seat running a given bot, reusing an idle one if possible.
+
+        :param player: player number of the seat in the upcoming game
+        :param path: path to the bot folder
+        :returns: seat ready to receive the `player` command
+        """
+        idle = self.idle.get(path, [])
+
+        while idle:
+            seat = idle.pop()
+
+            if seat.alive:
+                seat.player = player
+                return seat
+
+            del self._paths[seat]
+            await seat.close()
+
+        seat = await self.spawn(player, path)
+
+        if self.supports(path, "newgame"):
+            self._paths[seat] = path
+
+        return seat
+
+    async def release(self, seat: Seat, reuse: bool = True) -> None:
+        """
+        Hand back a seat at the end of a game.
+
+        :param seat: seat obtained from :meth:`acquire` or created separately
+        :param reuse: whether the seat can be kept for later games, which is
+            not the case if its game was interrupted by an error
+        """
+        path = self._paths.get(seat)
+
+        if path is not None and seat.alive and reuse:
+            await seat.send(NewGameCommand())
+            self.idle.setdefault(path, []).append(seat)
+        else:
+            self._paths.pop(seat, None)
+            await seat.send(EndCommand())
+            await seat.close()
+
+    async def close(self) -> None:
+        """Terminate all idle seats."""
+        seats = [seat for idle in self.idle.values() for seat in idle]
+        self.idle.clear()
+        self._paths.clear()
+
+        for seat in seats:
+            await seat.send(EndCommand())
+
+        await gather(*(seat.close() for seat in seats))
@@ -0,0 +1,176 @@
+import mmap
+import os
+import platform
+from typing import Self
+
+# Number of messages that each ring can hold
+ring_slots = 256
+
+# Offset of the counters and of the slots of each ring in the shared memory,
+# counters being kept on their own cache line
+_counters_size = 64
+_ring_size = _counters_size + 8 * ring_slots
+memory_size = 2 * _ring_size
+
+# Whether rings can be used on this machine: Python offers no memory fences,
+# so they rely on x86 processors making stores visible in program order
+supported = platform.machine().lower() in ("x86_64", "amd64", "i386", "i686")
+
+
+class Ring:
+    """
+    Single-producer, single-consumer queue of 64-bit messages in shared memory.
+
+    The ring holds two 32-bit counters, the number of messages read and the
+    number of messages written so far, followed by the message slots. Each
+    side only ever writes its own counter, after filling or reading the slots,
+    and relies on aligned stores being seen in order by the other process.
+
+    No memory fence separates the slot and counter stores, which is only
+    correct under the total store order of x86 processors; on weakly-ordered
+    processors such as ARM, the reader could see an updated counter before
+    the message. Check :data:`supported` before using rings.
+    """
+
+    # Number of messages read and written, as a view of the shared memory
+    counters: memoryview
+
+    # Message slots, as a view of the shared memory
+    slots: memoryview
+
+    def __init__(self, memory: memoryview, offset: int):
+        self.counters = memory[offset : offset + 8].cast("I")
+        self.slots = memory[offset + _counters_size : offset + _ring_size].cast("Q")
+
+    def put(self, message: int) -> bool:
+        """
+        Append a message to the ring.
+
+        :param message: message to append, less than 2⁶⁴
+        :returns: False if the ring is full and the message was not appended
+        """
+        written = self.counters[1]
+
+        if (written - self.counters[0]) % (1 << 32) >= ring_slots:
+            return False
+
+        self.slots[written % ring_slots] = message
+        self.counters[1] = (written + 1) % (1 << 32)
+        return True
+
+    def get(self) -> int | None:
+        """Take the oldest message from the ring, or None if it is empty."""
+        read = self.counters[0]
+
+        if read == self.counters[1]:
+            return None
+
+        message = self.slots[read % ring_slots]
+        self.counters[0] = (read + 1) % (1 << 32)
+        return message
+
+    def release(self) -> None:
+        """Release the views of the shared memory."""
+        self.counters.release()
+        self.slots.release()
+
+
+class Channel:
+    """
+    Two-way message channel between the judge and a bot process.
+
+    Messages are exchanged through two rings in a shared memory file, one in
+    each direction. After filling a ring, the writer signals an event file
+    descriptor, on which the reader can wait while its incoming ring is empty.
+    """
+
+    # Shared memory file descriptor
+    memory_fd: int
+
+    # Event file descriptors signalled by the judge and by the bot
+    judge_event: int
+    bot_event: int
+
+    # Whether this is the judge’s or the bot’s end of the channel
+    judge: bool
+
+    # Rings of messages sent and received by this end
+    outgoing: Ring
+    incoming: Ring
+
+    _mapping: mmap.mmap
+    _memory: memoryview
+
+    def __init__(
+        self, memory_fd: int, judge_event: int, bot_event: int, judge: bool = True
+    ):
+        self.memory_fd = memory_fd
+        self.judge_event = judge_event
+        self.bot_event = bot_event
+        self.judge = judge
+        self._mapping = mmap.mmap(memory_fd, memory_size)
+        self._memory = memoryview(self._mapping)
+        first = Ring(self._memory, 0)
+        second = Ring(self._memory, _ring_size)
+        self.outgoing, self.incoming = (first, second) if judge else (second, first)
+
+    @classmethod
+    def create(cls) -> Self:
+        """Create the judge’s end of a new channel."""
+        memory_fd = os.memfd_create("onze", os.MFD_CLOEXEC)
+        os.ftruncate(memory_fd, memory_size)
+
+        # The judge waits for the bot on its event loop, and the bot blocks
+        judge_event = os.eventfd(0, os.EFD_CLOEXEC)
+        bot_event = os.eventfd(0, os.EFD_CLOEXEC | os.EFD_NONBLOCK)
+        return cls(memory_fd, judge_event, bot_event)
+
+    @classmethod
+    def attach(cls, data: str) -> Self:
+        """
+        Open the bot’s end of a channel.
+
+        :param data: announcement of the channel (see :meth:`announce`)
+        """
+        match data.split(" "):
+            case ["shm", memory_fd, judge_event, bot_event]:
+                return cls(int(memory_fd), int(judge_event), int(bot_event), False)
+
+        raise ValueError(f"invalid channel announcement '{data}'")
+
+    def announce(self) -> str:
+        """Describe the channel to the bot process, which inherited its files."""
+        return f"shm {self.memory_fd} {self.judge_event} {self.bot_event}"
+
+    @property
+    def fds(self) -> tuple[int, int, int]:
+        """File descriptors that the bot process needs to inherit."""
+        return (self.memory_fd, self.judge_event, self.bot_event)
+
+    def signal(self) -> None:
+        """Wake up the other end after sending messages."""
+        os.eventfd_write(self.judge_event if self.judge else self.bot_event, 1)
+
+    def receive(self) -> int:
+        """
+        Wait for the next message on the bot’s end, blocking the current thread.
+
+        The judge’s end is not blocking and instead waits for the bot’s event
+        file descriptor to be readable on its event loop.
+        """
+        event = self.bot_event if self.judge else self.judge_event
+
+        while (message := self.incoming.get()) is None:
+            os.eventfd_read(event)
+
+        return message
+
+    def close(self) -> None:
+        """Unmap the shared memory and close the file descriptors."""
+        self.outgoing.release()
+        self.incoming.release()
+        self._memory.release()
+        self._mapping.close()
+
+        for fd in self.fds:
+            os.close(fd)
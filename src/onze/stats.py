@@ -0,0 +1,151 @@
+import math
+from dataclasses import dataclass, field
+
+
+@dataclass
+class SPRT:
+    """
+    Sequential probability ratio test on the mean of a series of samples.
+
+    Decides between the hypothesis that the samples have mean `lower` and the
+    hypothesis that they have mean `upper`, assuming normally-distributed
+    samples whose variance is estimated from the samples seen so far. Samples
+    are added one at a time, and the test is decided as soon as the
+    log-likelihood ratio crosses one of the bounds derived from the allowed
+    error rates. Since the variance estimate is unreliable over a handful of
+    samples, no decision is taken before a minimum number of samples.
+    """
+
+    # Mean of the samples under the null and the alternative hypotheses
+    lower: float
+    upper: float
+
+    # Probability of accepting the alternative hypothesis when the null
+    # hypothesis is true, and conversely
+    alpha: float = 0.05
+    beta: float = 0.05
+
+    # Number of samples needed before the test can be decided
+    minimum: int = 10
+
+    # Number of samples, their sum and the sum of their squares
+    count: int = field(default=0, init=False)
+    total: float = field(default=0, init=False)
+    total_squares: float = field(default=0, init=False)
+
+    def add(self, value: float) -> None:
+        """Add a sample to the test."""
+        self.count += 1
+        self.total += value
+        self.total_squares += value * value
+
+    @property
+    def mean(self) -> float:
+        """Mean of the samples seen so far."""
+        return self.total / self.count if self.count else 0
+
+    @property
+    def variance(self) -> float:
+        """Unbiased estimate of the variance of the samples."""
+        if self.count < 2:
+            return 0
+
+        return max((self.total_squares - self.total * self.mean) / (self.count - 1), 0)
+
+    @property
+    def bounds(self) -> tuple[float, float]:
+        """Log-likelihood ratios at which each hypothesis is accepted."""
+        return (
+            math.log(self.beta / (1 - self.alpha)),
+            math.log((1 - self.beta) / self.alpha),
+        )
+
+    @property
+    def llr(self) -> float:
+        """Log-likelihood ratio of the alternative to the null hypothesis."""
+        variance = self.variance
+
+        if variance == 0:
+            return 0
+
+        return (
+            (self.upper - self.lower)
+            * (self.total - self.count * (self.lower + self.upper) / 2)
+            / variance
+        )
+
+    def decision(self) -> bool | None:
+        """
+        Get the outcome of the test.
+
+        :returns: True if the alternative hypothesis is accepted, False if
+            the null hypothesis is accepted, or None if more samples are needed
+        """
+        if self.count < self.minimum:
+            return None
+
+        lower, upper = self.bounds
+        llr = self.llr
+
+        if llr >= upper:
+            return True
+
+        if llr <= lower:
+            return False
+
+        return None
+
+
+# Number of histogram buckets per doubling of the measured value
+_bucket_resolution = 8
+
+
+@dataclass
+class Histogram:
+    """
+    Distribution of non-negative durations with logarithmic buckets.
+
+    Memory use only depends on the range of recorded values, and quantiles
+    are estimated within 1/8th of an octave (about 9%), which is enough for
+    reporting latencies over millions of samples.
+    """
+
+    # Number of values in each bucket, bucket i holding values in nanoseconds
+    # whose logarithm in base 2 multiplied by the resolution rounds up to i
+    buckets: list[int] = field(default_factory=list)
+
+    # Number of recorded values, their sum and their maximum, in nanoseconds
+    count: int = 0
+    total: int = 0
+    maximum: int = 0
+
+    def add(self, value: int) -> None:
+        """Record a duration in nanoseconds."""
+        index = math.ceil(math.log2(value) * _bucket_resolution) if value > 1 else 0
+
+        if index >= len(self.buckets):
+            self.buckets.extend([0] * (index + 1 - len(self.buckets)))
+
+        self.buckets[index] += 1
+        self.count += 1
+        self.total += value
+        self.maximum = max(self.maximum, value)
+
+    def quantile(self, fraction: float) -> int:
+        """
+        Estimate the value below which a given fraction of values fall.
+
+        :param fraction: fraction between 0 and 1
+        :returns: upper bound of the bucket containing the quantile, in
+            nanoseconds, no more than the maximum recorded value
+        """
+        rank = math.ceil(fraction * self.count)
+        seen = 0
+
+        for index, size in enumerate(self.buckets):
+            seen += size
+
+            if seen >= rank and seen > 0:
+                return min(round(2 ** (index / _bucket_resolution)), self.maximum)
+
+        return self.maximum
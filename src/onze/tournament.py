@@ -0,0 +1,717 @@
+import argparse
+import asyncio
+import math
+import multiprocessing
+import os
+import queue
+import statistics
+import sys
+from collections.abc import Iterable, Sequence
+from dataclasses import dataclass
+from itertools import combinations
+from random import Random
+from .box import close_zygotes
+from .game import Scores
+from .judge import (
+    add_box_arguments,
+    add_game_arguments,
+    check_args,
+    make_clock,
+    make_spawn,
+    parse_limit,
+    play_game,
+    release_table,
+    setup_table,
+)
+from .ratings import Ratings
+from .record import GameRecord, GameRecorder, RecordWriter
+from .results import ResultsStore
+from .seats import SeatPool
+from .stats import SPRT
+
+
+# Number of finished games after which the ratings file is updated
+_checkpoint_interval = 100
+
+# Time in seconds after which workers are checked while waiting for a result
+_poll_interval = 1.0
+
+# Number of times a failed game of a match is played again before its deal
+# is abandoned
+_match_retries = 2
+
+
+@dataclass(frozen=True)
+class Match:
+    """Single game scheduled as part of a tournament."""
+
+    # Position of the game in the tournament schedule
+    index: int
+
+    # Bot folders of team 0 (players 0 and 2) and team 1 (players 1 and 3)
+    teams: tuple[str, str]
+
+    # Seed used for dealing cards in this game
+    seed: int
+
+    # Identifier shared by games played on the same deals
+    deal: int
+
+
+@dataclass
+class Standing:
+    """Aggregated results of a bot over a tournament."""
+
+    bot: str
+    games: int = 0
+    wins: int = 0
+    draws: int = 0
+    losses: int = 0
+
+    # Total points scored by the bot’s team and by the opposing teams
+    points_for: int = 0
+    points_against: int = 0
+
+
+def add_run_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add the options controlling how games are run in parallel to a parser."""
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="number of games to run in parallel (default: number of CPUs)",
+    )
+    parser.add_argument(
+        "-v",
+        "--verbose",
+        action="store_true",
+        help="print the events of all games instead of only their results",
+    )
+    add_game_arguments(parser)
+    add_box_arguments(parser)
+
+
+def parse_args(argv: Sequence[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="onze tournament",
+        description=(
+            "Run a round-robin tournament between computer programs, "
+            "playing games in parallel."
+        ),
+    )
+    parser.add_argument(
+        "bots",
+        nargs="+",
+        help="paths to the bot folders taking part in the tournament",
+    )
+    parser.add_argument(
+        "-n",
+        "--games",
+        type=int,
+        default=10,
+        help=(
+            "number of games to play between each pair of bots, alternating "
+            "which team each bot plays in, or number of pairs of games in "
+            "duplicate mode (default: %(default)s)"
+        ),
+    )
+    parser.add_argument(
+        "-d",
+        "--duplicate",
+        action="store_true",
+        help=(
+            "play each game twice on the same deals with the teams swapped, "
+            "and report the paired score difference between bots"
+        ),
+    )
+    parser.add_argument(
+        "--ratings",
+        help=(
+            "path to a file in which the Elo ratings of the bots are kept; "
+            "ratings already present in the file are updated with the "
+            "results of the tournament (default: do not keep ratings)"
+        ),
+    )
+    add_run_arguments(parser)
+
+    args = parser.parse_args(argv)
+    check_args(parser, args)
+
+    if len(args.bots) < 2 or args.games < 1 or args.jobs < 1:
+        parser.print_usage()
+        print(
+            f"{parser.prog}: error: need at least two bots, one game and one job",
+            file=sys.stderr,
+        )
+        sys.exit(1)
+
+    return args
+
+
+def schedule(
+    bots: Sequence[str], games: int, seed: int, duplicate: bool = False
+) -> list[Match]:
+    """
+    List the games of a round-robin tournament.
+
+    In duplicate mode, each game is followed by a second game using the same
+    seed, and thus the same sequence of deals, with the teams swapped.
+
+    :param bots: paths to the competing bot folders
+    :param games: number of games (or of duplicated games) between each pair
+    :param seed: seed from which the seed of each game is derived
+    :param duplicate: whether to play each game twice with swapped teams
+    :returns: scheduled games
+    """
+    random = Random(seed)
+    matches: list[Match] = []
+    deal = 0
+
+    for first, second in combinations(bots, 2):
+        for number in range(games):
+            game_seed = random.getrandbits(64)
+
+            if duplicate:
+                matches.append(Match(len(matches), (first, second), game_seed, deal))
+                matches.append(Match(len(matches), (second, first), game_seed, deal))
+            else:
+                teams = (first, second) if number % 2 == 0 else (second, first)
+                matches.append(Match(len(matches), teams, game_seed, deal))
+
+            deal += 1
+
+    return matches
+
+
+def tally(results: Iterable[tuple[Match, Scores]]) -> dict[str, Standing]:
+    """
+    Aggregate game results into standings for each bot.
+
+    :param results: finished games along with their final scores
+    :returns: standing of each bot that played at least one game
+    """
+    standings: dict[str, Standing] = {}
+
+    for match, scores in results:
+        for team, bot in enumerate(match.teams):
+            standing = standings.setdefault(bot, Standing(bot))
+            own = scores[team]
+            other = scores[1 - team]
+            standing.games += 1
+            standing.points_for += own
+            standing.points_against += other
+
+            if own > other:
+                standing.wins += 1
+            elif own < other:
+                standing.losses += 1
+            else:
+                standing.draws += 1
+
+    return standings
+
+
+def pair_differences(
+    results: Iterable[tuple[Match, Scores]]
+) -> dict[tuple[str, str], list[int]]:
+    """
+    Compute the score differences between bots over duplicated games.
+
+    For each pair of games played on the same deals, the difference is the
+    total score of the first bot minus the total score of the second bot over
+    both games, so that the luck of the deals cancels out. Deals for which
+    only one game finished are ignored.
+
+    :param results: finished games along with their final scores
+    :returns: paired differences for each pairing, in the order of the teams
+        of the first game of each pair
+    """
+    by_deal: dict[int, list[tuple[Match, Scores]]] = {}
+
+    for match, scores in results:
+        by_deal.setdefault(match.deal, []).append((match, scores))
+
+    differences: dict[tuple[str, str], list[int]] = {}
+
+    for games in by_deal.values():
+        if len(games) != 2:
+            continue
+
+        games.sort(key=lambda game: game[0].index)
+        (first_match, first_scores), (second_match, second_scores) = games
+        first, second = first_match.teams
+        assert second_match.teams == (second, first)
+        difference = (
+            first_scores[0] - first_scores[1] + second_scores[1] - second_scores[0]
+        )
+        differences.setdefault((first, second), []).append(difference)
+
+    return differences
+
+
+def write_differences(differences: dict[tuple[str, str], list[int]]) -> str:
+    """Format paired differences with their mean and standard error."""
+    lines = []
+
+    for (first, second), values in differences.items():
+        mean = statistics.fmean(values)
+
+        if len(values) > 1:
+            error = statistics.stdev(values) / math.sqrt(len(values))
+            lines.append(
+                f"{first} vs {second}: {mean:+.1f} ± {error:.1f} "
+                f"over {len(values)} deals"
+            )
+        else:
+            lines.append(f"{first} vs {second}: {mean:+.1f} over 1 deal")
+
+    return "\n".join(lines)
+
+
+def write_standings(standings: dict[str, Standing]) -> str:
+    """Format standings as a table, best bots first."""
+    lines = [
+        f"{'bot':<30} {'games':>6} {'wins':>6} {'draws':>6} {'losses':>6} {'diff':>8}"
+    ]
+
+    for standing in sorted(
+        standings.values(),
+        key=lambda standing: (
+            -standing.wins,
+            standing.losses,
+            standing.points_against - standing.points_for,
+        ),
+    ):
+        diff = standing.points_for - standing.points_against
+        lines.append(
+            f"{standing.bot:<30} {standing.games:>6} {standing.wins:>6} "
+            f"{standing.draws:>6} {standing.losses:>6} {diff:>+8}"
+        )
+
+    return "\n".join(lines)
+
+
+async def _work(
+    args: argparse.Namespace,
+    tasks: multiprocessing.Queue,
+    results: multiprocessing.Queue,
+) -> None:
+    pool = SeatPool(make_spawn(args))
+    loop = asyncio.get_running_loop()
+
+    def log(message: str) -> None:
+        if args.verbose:
+            print(message)
+
+    while (match := await loop.run_in_executor(None, tasks.get)) is not None:
+        table = None
+        finished = False
+
+        try:
+            log(f"[tournament] game {match.index} seed={match.seed}")
+            table = await setup_table(match.teams, pool, log, make_clock(args))
+            recorder = GameRecorder(match.teams * 2, match.seed)
+            await play_game(
+                table,
+                Random(match.seed),
+                max_rounds=parse_limit(args.max_rounds),
+                winning_score=parse_limit(args.winning_score),
+                log=log,
+                recorder=recorder,
+            )
+
+            for line in table.summary():
+                log(f"[server] {line}")
+
+            finished = True
+            results.put((match, recorder.record))
+        except (EOFError, OSError, RuntimeError, ValueError) as error:
+            # Bots can crash, stop answering or break the protocol
+            message = f"[tournament] game {match.index} failed: {error!r}"
+            print(message, file=sys.stderr)
+            results.put((match, None))
+        finally:
+            # Seats of a failed game may be out of step with the protocol
+            if table is not None:
+                await release_table(table, pool, reuse=finished)
+
+    await pool.close()
+
+
+def _worker(
+    args: argparse.Namespace,
+    tasks: multiprocessing.Queue,
+    results: multiprocessing.Queue,
+) -> None:
+    """Play games received from a queue on a dedicated event loop."""
+    try:
+        asyncio.run(_work(args, tasks, results))
+    finally:
+        close_zygotes()
+
+
+def _start_workers(
+    args: argparse.Namespace, jobs: int
+) -> tuple[multiprocessing.Queue, multiprocessing.Queue, list[multiprocessing.Process]]:
+    """
+    Start worker processes playing games from a task queue.
+
+    Each worker stops after receiving None from the task queue.
+
+    :param args: command line arguments
+    :param jobs: number of workers to start
+    :returns: task queue, result queue, and worker processes
+    """
+    tasks: multiprocessing.Queue = multiprocessing.Queue()
+    results: multiprocessing.Queue = multiprocessing.Queue()
+    workers = [
+        multiprocessing.Process(target=_worker, args=(args, tasks, results))
+        for _ in range(jobs)
+    ]
+
+    for worker in workers:
+        worker.start()
+
+    return tasks, results, workers
+
+
+def _get_result(
+    results: multiprocessing.Queue, workers: list[multiprocessing.Process]
+) -> tuple[Match, GameRecord | None]:
+    """
+    Wait for the next finished game from worker processes.
+
+    :param results: result queue of the workers
+    :param workers: worker processes
+    :returns: finished game and its record, or None if it failed
+    :raises RuntimeError: if a worker exited before finishing its games, in
+        which case all workers are terminated
+    """
+    while True:
+        try:
+            return results.get(timeout=_poll_interval)
+        except queue.Empty:
+            pass
+
+        # Workers only exit normally after all games have been handed out,
+        # so that results are missing if they have all exited
+        crashed = [worker for worker in workers if worker.exitcode not in (None, 0)]
+
+        if crashed or all(worker.exitcode is not None for worker in workers):
+            try:
+                return results.get_nowait()
+            except queue.Empty:
+                pass
+
+            for worker in workers:
+                worker.terminate()
+
+            codes = ", ".join(str(worker.exitcode) for worker in workers)
+            raise RuntimeError(f"worker processes exited early (exit codes: {codes})")
+
+
+def run_tournament(argv: Sequence[str] | None = None) -> dict[str, Standing]:
+    """
+    Run a tournament following command line arguments.
+
+    Games are distributed to worker processes which each run their own event
+    loop and keep the bot processes alive between games when supported.
+
+    :param argv: command line arguments, excluding the program name
+    :returns: standing of each bot
+    """
+    args = parse_args(argv)
+    matches = schedule(args.bots, args.games, args.seed, args.duplicate)
+    jobs = min(args.jobs, len(matches))
+    tasks, results, workers = _start_workers(args, jobs)
+
+    print(f"[tournament] seed={args.seed} games={len(matches)} jobs={jobs}")
+
+    for match in matches:
+        tasks.put(match)
+
+    for _ in range(jobs):
+        tasks.put(None)
+
+    finished: list[tuple[Match, Scores]] = []
+
+    if args.ratings is not None and os.path.exists(args.ratings):
+        ratings = Ratings.load(args.ratings)
+    else:
+        ratings = Ratings()
+
+    store = ResultsStore(args.results_db) if args.results_db is not None else None
+    writer = RecordWriter(args.record_file) if args.record_file is not None else None
+
+    for count in range(1, len(matches) + 1):
+        match, record = _get_result(results, workers)
+
+        if record is not None:
+            scores = record.scores
+            finished.append((match, scores))
+
+            if store is not None:
+                store.add(record)
+
+            if writer is not None:
+                writer.write(record)
+
+            first, second = match.teams
+            ratings.update(([first], [second]), scores)
+            print(
+                f"[tournament] game {count}/{len(matches)}: "
+                f"{first} {scores[0]} - {scores[1]} {second}"
+            )
+
+            if args.ratings is not None and count % _checkpoint_interval == 0:
+                ratings.save(args.ratings)
+
+    for worker in workers:
+        worker.join()
+
+    if store is not None:
+        store.close()
+
+    if writer is not None:
+        writer.close()
+
+    standings = tally(finished)
+    print(write_standings(standings))
+
+    if args.ratings is not None:
+        ratings.save(args.ratings)
+
+        for bot, rating in ratings.leaderboard():
+            print(f"{bot:<30} {rating.value:>8.1f} {rating.games:>8}")
+
+    if args.duplicate:
+        print(write_differences(pair_differences(finished)))
+
+    return standings
+
+
+def parse_match_args(argv: Sequence[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="onze match",
+        description=(
+            "Compare two computer programs on duplicated games until a "
+            "sequential test decides which hypothesis holds."
+        ),
+    )
+    parser.add_argument("new", help="path to the folder of the bot under test")
+    parser.add_argument("old", help="path to the folder of the reference bot")
+    parser.add_argument(
+        "--lower",
+        type=float,
+        default=0,
+        help=(
+            "mean paired score difference of the new bot over the old one "
+            "under the null hypothesis (default: %(default)s)"
+        ),
+    )
+    parser.add_argument(
+        "--upper",
+        type=float,
+        default=50,
+        help=(
+            "mean paired score difference of the new bot over the old one "
+            "under the alternative hypothesis (default: %(default)s)"
+        ),
+    )
+    parser.add_argument(
+        "--alpha",
+        type=float,
+        default=0.05,
+        help="false positive rate of the test (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--beta",
+        type=float,
+        default=0.05,
+        help="false negative rate of the test (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--min-games",
+        type=int,
+        default=10,
+        help=(
+            "number of pairs of games to play before the test can be "
+            "decided (default: %(default)s)"
+        ),
+    )
+    parser.add_argument(
+        "-n",
+        "--max-games",
+        type=int,
+        default=10000,
+        help=(
+            "stop after this number of pairs of games even if the test is "
+            "undecided (default: %(default)s)"
+        ),
+    )
+    add_run_arguments(parser)
+
+    args = parser.parse_args(argv)
+    check_args(parser, args)
+
+    if (
+        args.lower >= args.upper
+        or not 0 < args.alpha < 1
+        or not 0 < args.beta < 1
+        or args.min_games < 2
+        or args.max_games < 1
+        or args.jobs < 1
+    ):
+        parser.print_usage()
+        print(
+            f"{parser.prog}: error: need lower < upper, error rates between "
+            "0 and 1, two minimum games, one game and one job",
+            file=sys.stderr,
+        )
+        sys.exit(1)
+
+    return args
+
+
+def run_match(argv: Sequence[str] | None = None) -> SPRT:
+    """
+    Run a head-to-head match with early stopping following command line arguments.
+
+    Each sample of the test is the paired score difference between the new
+    and the old bot over a pair of duplicated games. Samples are added in
+    the order of their deals, whatever the order in which games finish, so
+    that the outcome only depends on the seed. New games are scheduled as
+    long as the test is undecided; games that are already running when it
+    gets decided are finished but not counted.
+
+    A failed game is played again on the same deal, up to a few times, after
+    which its deal is abandoned and replaced with a new one.
+
+    :param argv: command line arguments, excluding the program name
+    :returns: sequential test, with the samples of all counted pairs of games
+    """
+    args = parse_match_args(argv)
+    test = SPRT(args.lower, args.upper, args.alpha, args.beta, args.min_games)
+    random = Random(args.seed)
+    tasks, results, workers = _start_workers(args, args.jobs)
+    games: dict[int, list[tuple[Match, Scores]]] = {}
+    deals = 0
+    running = 0
+
+    # Differences of finished pairs waiting for the pairs of earlier deals,
+    # or None for abandoned deals, and next deal to add to the test
+    differences: dict[int, int | None] = {}
+    next_deal = 0
+
+    # Number of times each game failed, and deals that were counted or
+    # abandoned
+    failures: dict[int, int] = {}
+    finished: set[int] = set()
+
+    print(
+        f"[match] seed={args.seed} lower={args.lower} upper={args.upper} "
+        f"alpha={args.alpha} beta={args.beta} jobs={args.jobs}"
+    )
+
+    def submit() -> None:
+        nonlocal deals, running
+        seed = random.getrandbits(64)
+        tasks.put(Match(2 * deals, (args.new, args.old), seed, deals))
+        tasks.put(Match(2 * deals + 1, (args.old, args.new), seed, deals))
+        deals += 1
+        running += 2
+
+    def finish_deal(deal: int, difference: int | None) -> None:
+        nonlocal next_deal
+        differences[deal] = difference
+        finished.add(deal)
+
+        while test.decision() is None and next_deal in differences:
+            difference = differences.pop(next_deal)
+            next_deal += 1
+
+            if difference is None:
+                continue
+
+            test.add(difference)
+            lower, upper = test.bounds
+            print(
+                f"[match] pair {test.count}: difference={difference:+} "
+                f"mean={test.mean:+.1f} llr={test.llr:.2f} "
+                f"({lower:.2f}, {upper:.2f})"
+            )
+
+        if test.decision() is None and deals < args.max_games:
+            submit()
+
+    # Keep enough games queued for all workers to stay busy
+    while deals < args.max_games and running < 2 * args.jobs:
+        submit()
+
+    store = ResultsStore(args.results_db) if args.results_db is not None else None
+    writer = RecordWriter(args.record_file) if args.record_file is not None else None
+
+    while running:
+        match, record = _get_result(results, workers)
+        running -= 1
+
+        if record is None:
+            if test.decision() is not None or match.deal in finished:
+                continue
+
+            failures[match.index] = failures.get(match.index, 0) + 1
+
+            if failures[match.index] <= _match_retries:
+                print(f"[match] game {match.index} failed, playing it again")
+                tasks.put(match)
+                running += 1
+            else:
+                print(
+                    f"[match] game {match.index} failed, abandoning deal {match.deal}"
+                )
+                games.pop(match.deal, None)
+                finish_deal(match.deal, None)
+
+            continue
+
+        if store is not None:
+            store.add(record)
+
+        if writer is not None:
+            writer.write(record)
+
+        if test.decision() is not None or match.deal in finished:
+            continue
+
+        pair = games.setdefault(match.deal, [])
+        pair.append((match, record.scores))
+
+        if len(pair) == 2:
+            del games[match.deal]
+            (difference,) = pair_differences(pair)[args.new, args.old]
+            finish_deal(match.deal, difference)
+
+    for _ in workers:
+        tasks.put(None)
+
+    for worker in workers:
+        worker.join()
+
+    if store is not None:
+        store.close()
+
+    if writer is not None:
+        writer.close()
+
+    match test.decision():
+        case True:
+            print(f"[match] {args.new} is better than {args.old}")
+
+        case False:
+            print(f"[match] {args.new} is not better than {args.old}")
+
+        case None:
+            print("[match] undecided")
+
+    return test
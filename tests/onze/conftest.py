@@ -0,0 +1,47 @@
+from onze.cards import Card, Hands, cards, deal_random_hands
+from onze.record import GameRecord, GameRecorder
+from onze import game
+from random import Random
+import pytest
+
+
+def _record_random_game(seed: int, max_rounds: int | None = 5) -> GameRecord:
+    """Play a game with random (sometimes invalid) moves and record it."""
+    deal_random = Random(seed)
+    move_random = Random(seed + 1)
+    recorder = GameRecorder(["a", "b", "c", "d"], seed)
+
+    def deal_hands() -> Hands:
+        hands = deal_random_hands(deal_random)
+        recorder.deal(hands)
+        return hands
+
+    def query_bid(player: int) -> int:
+        return move_random.choice((0, 0, 50, 55, 60, 65, 70, 80, 100, 105, 42))
+
+    def reply_bid(player: int, bid: int) -> None:
+        recorder.bid(player, bid, elapsed=player / 10)
+
+    def query_card(player: int) -> Card | None:
+        return move_random.choice(cards + [None])
+
+    def reply_card(player: int, card: Card) -> None:
+        recorder.card(player, card, elapsed=player / 100)
+
+    scores = game.play_sync(
+        starter=0,
+        deal_hands=deal_hands,
+        query_bid=query_bid,
+        reply_bid=reply_bid,
+        query_card=query_card,
+        reply_card=reply_card,
+        max_rounds=max_rounds,
+        winning_score=500,
+    )
+    return recorder.finish(scores)
+
+
+@pytest.fixture(name="record_random_game")
+def record_random_game_fixture():
+    """Provide a function to play and record games with random moves."""
+    return _record_random_game
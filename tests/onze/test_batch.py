@@ -0,0 +1,126 @@
+from onze.cards import Card, Hands, cards, deal_random_hands, hand_to_mask
+from onze.batch import BatchState, play_batch, play_batch_numpy
+from onze import game
+from random import Random
+import pytest
+
+
+def choose_bid(player: int, hand: int, minimum: int) -> int:
+    """Deterministic bidding strategy which sometimes makes invalid bids."""
+    return (hand * (player + 7) >> 5) % 17 * 5 + minimum - 20
+
+
+def choose_card(player: int, hand: int, trick_size: int) -> int:
+    """Deterministic playing strategy which often makes invalid moves."""
+    return ((hand >> trick_size) * (player + 3) >> 3) % (len(cards) + 1) - 1
+
+
+def play_single(seed: int, max_rounds: int | None) -> game.Scores:
+    random = Random(seed)
+    hands: Hands = ()
+    minimum = 50
+    trick_size = 0
+
+    def deal_hands() -> Hands:
+        nonlocal hands, minimum
+        hands = deal_random_hands(random)
+        minimum = 50
+        return hands
+
+    def query_bid(player: int) -> int:
+        return choose_bid(player, hand_to_mask(hands[player]), minimum)
+
+    def reply_bid(player: int, bid: int) -> None:
+        nonlocal minimum
+
+        if bid != 0:
+            minimum = bid + 5
+
+    def query_card(player: int) -> Card | None:
+        index = choose_card(player, hand_to_mask(hands[player]), trick_size)
+        return cards[index] if index >= 0 else None
+
+    def reply_card(player: int, card: Card) -> None:
+        nonlocal trick_size
+        trick_size = (trick_size + 1) % 4
+
+    return game.play_sync(
+        starter=2,
+        deal_hands=deal_hands,
+        query_bid=query_bid,
+        reply_bid=reply_bid,
+        query_card=query_card,
+        reply_card=reply_card,
+        max_rounds=max_rounds,
+        winning_score=500,
+    )
+
+
+def play_batched(
+    seeds: list[int], max_rounds: int | None, vectorize: bool
+) -> list[game.Scores]:
+    def query_bids(player: int, games, state: BatchState) -> list[int]:
+        results = []
+
+        for index in games:
+            bids = [state.bids[index][other] for other in range(4)]
+            minimum = max(max(bids) + 5, 50)
+            results.append(choose_bid(player, int(state.hands[index][player]), minimum))
+
+        return results
+
+    def query_cards(player: int, games, state: BatchState) -> list[int]:
+        return [
+            choose_card(player, int(state.hands[index][player]), state.trick_size)
+            for index in games
+        ]
+
+    return play_batch(
+        randoms=[Random(seed) for seed in seeds],
+        query_bids=query_bids,
+        query_cards=query_cards,
+        starter=2,
+        max_rounds=max_rounds,
+        winning_score=500,
+        vectorize=vectorize,
+    )
+
+
+@pytest.mark.parametrize("vectorize", [False, True])
+def test_play_batch_matches_play(vectorize):
+    if vectorize:
+        pytest.importorskip("numpy")
+
+    seeds = list(range(50))
+
+    for max_rounds in (0, 3, None):
+        expected = [play_single(seed, max_rounds) for seed in seeds]
+        assert play_batched(seeds, max_rounds, vectorize) == expected
+
+
+def test_play_batch_numpy_deal():
+    numpy = pytest.importorskip("numpy")
+    seen: list[list[int]] = []
+
+    def query_bids(player: int, games, state: BatchState) -> list[int]:
+        seen.extend(state.hands[games].tolist())
+        return [0] * len(games)
+
+    def query_cards(player: int, games, state: BatchState) -> list[int]:
+        return [-1] * len(games)
+
+    def play(seed: int) -> list[game.Scores]:
+        return play_batch_numpy(
+            generator=numpy.random.default_rng(seed),
+            size=100,
+            query_bids=query_bids,
+            query_cards=query_cards,
+            max_rounds=2,
+        )
+
+    assert play(42) == play(42)
+    assert len(play(42)) == 100
+
+    for hands in seen:
+        assert [hand.bit_count() for hand in hands] == [10] * 4
+        assert sum(hands) == (1 << len(cards)) - 1
@@ -0,0 +1,296 @@
+from onze.bot import load_bot, serve, serve_binary, start_server
+from onze.cards import Card
+from onze.judge import play_game, release_table, setup_table
+from onze.protocol import (
+    Command,
+    EndCommand,
+    HandCommand,
+    PlayerCommand,
+    QueryBidCommand,
+    QueryCardCommand,
+    ReplyCardCommand,
+)
+from onze.record import GameRecorder, write_record
+from onze.seats import InProcessSeat, SeatPool, SharedMemorySeat, SubprocessSeat
+from io import BytesIO, StringIO
+from pathlib import Path
+from random import Random
+import asyncio
+import pytest
+import sys
+
+bot_source = """\
+from onze.cards import make_card_key
+from onze.protocol import HandCommand, PlayerCommand, ReplyBidCommand, ReplyCardCommand
+
+
+class LowestBot:
+    def __init__(self):
+        self.player = -1
+        self.hand = set()
+        self.bids = []
+
+    def notify(self, command):
+        match command:
+            case PlayerCommand(player=player):
+                self.player = player
+
+            case HandCommand(hand=hand):
+                self.hand = hand
+                self.bids = []
+
+            case ReplyBidCommand(bid=bid):
+                self.bids.append(bid)
+
+            case ReplyCardCommand(player=player, card=card):
+                if player == self.player:
+                    self.hand.remove(card)
+
+    def bid(self):
+        return 0 if self.bids and max(self.bids) >= 60 else 50 + 5 * len(self.bids)
+
+    def play(self):
+        return min(self.hand, key=make_card_key())
+"""
+
+run_script = """\
+#!{executable}
+import sys
+sys.path[:0] = {path!r}
+from onze.bot import serve
+from lowest import LowestBot
+serve(LowestBot())
+"""
+
+
+def write_bot(path: Path) -> Path:
+    path.mkdir()
+    (path / "lowest.py").write_text(bot_source)
+    run = path / "run"
+    source = str(Path(__file__).parents[2] / "src")
+    run.write_text(
+        run_script.format(executable=sys.executable, path=[source, str(path)])
+    )
+    run.chmod(0o755)
+    return path
+
+
+class ListBot:
+    def __init__(self):
+        self.commands: list[Command] = []
+
+    def notify(self, command: Command) -> None:
+        self.commands.append(command)
+
+    def bid(self) -> int:
+        return 55
+
+    def play(self) -> Card:
+        return Card("S", "A")
+
+
+def test_load_bot(tmp_path):
+    path = write_bot(tmp_path / "lowest")
+    bot = load_bot(f"{path}/lowest.py:LowestBot")()
+    assert bot.bid() == 50
+    assert load_bot("test_bot:ListBot") is ListBot
+
+    with pytest.raises(ValueError, match="expected 'module:Class'"):
+        load_bot("test_bot")
+
+    with pytest.raises(ValueError, match="no bot class"):
+        load_bot("test_bot:Missing")
+
+
+def test_serve():
+    bot = ListBot()
+    output = StringIO()
+    serve(bot, StringIO("player 2\nbid ?\ncard 1 HJ\ncard ?\nend\nbid ?\n"), output)
+    assert output.getvalue() == "55\nSA\n"
+    assert bot.commands == [
+        PlayerCommand(2),
+        ReplyCardCommand(1, Card("H", "J")),
+        EndCommand(),
+    ]
+
+
+def test_serve_binary():
+    bot = ListBot()
+    output = BytesIO()
+    serve_binary(bot, BytesIO(b"\x01\x02\x03\x06\x01\x1a\x05\x07\x03"), output)
+    assert output.getvalue() == b"\x04\x02\x37\x06\x02\x27"
+    assert bot.commands == [
+        PlayerCommand(2),
+        ReplyCardCommand(1, Card("H", "J")),
+        EndCommand(),
+    ]
+
+
+def test_in_process_seat():
+    async def run() -> ListBot:
+        seat = await InProcessSeat.create(1, "test_bot:ListBot")
+        assert isinstance(seat.bot, ListBot)
+        hand = {Card("S", "A"), Card("H", "J")}
+        await seat.send(HandCommand(hand))
+        hand.clear()
+        await seat.send_line("card 3 HJ")
+        assert await seat.communicate(PlayerCommand(1)) == ""
+        assert await seat.communicate(QueryBidCommand()) == "55"
+        assert await seat.communicate(QueryCardCommand()) == "SA"
+        return seat.bot
+
+    assert asyncio.run(run()).commands == [
+        HandCommand({Card("S", "A"), Card("H", "J")}),
+        ReplyCardCommand(3, Card("H", "J")),
+        PlayerCommand(1),
+    ]
+
+
+def test_in_process_matches_subprocess(tmp_path):
+    path = write_bot(tmp_path / "lowest")
+
+    async def play(seat: str) -> tuple[bytes, list[type]]:
+        pool = SeatPool(
+            lambda player, path: SubprocessSeat.create(player, "./run", cwd=path)
+        )
+        table = await setup_table([seat], pool, log=lambda message: None)
+        recorder = GameRecorder([seat] * 4, 42)
+        await play_game(
+            table,
+            Random(42),
+            max_rounds=3,
+            log=lambda message: None,
+            recorder=recorder,
+        )
+        kinds = [type(seat) for seat in table.seats.values()]
+        await release_table(table, pool)
+        await pool.close()
+        return write_record(recorder.record), kinds
+
+    subprocess_record, subprocess_kinds = asyncio.run(play(str(path)))
+    in_process_record, in_process_kinds = asyncio.run(
+        play(f"python:{path}/lowest.py:LowestBot")
+    )
+    assert subprocess_kinds == [SubprocessSeat] * 4
+    assert in_process_kinds == [InProcessSeat] * 4
+    assert in_process_record == subprocess_record
+
+
+@pytest.mark.parametrize("transport", ["unix", "tcp"])
+def test_socket_seats(tmp_path, transport):
+    path = write_bot(tmp_path / "lowest")
+    factory = load_bot(f"{path}/lowest.py:LowestBot")
+
+    async def play(seats: list[str], seed: int) -> bytes:
+        pool = SeatPool(
+            lambda player, path: SubprocessSeat.create(player, "./run", cwd=path)
+        )
+        table = await setup_table(seats, pool, log=lambda message: None)
+        recorder = GameRecorder(seats, seed)
+        await play_game(
+            table,
+            Random(seed),
+            max_rounds=3,
+            log=lambda message: None,
+            recorder=recorder,
+        )
+        await release_table(table, pool)
+        return write_record(recorder.record)
+
+    async def run() -> tuple[list[bytes], list[bytes]]:
+        if transport == "unix":
+            address = f"unix:{tmp_path / 'socket'}"
+            server = await start_server(factory, address)
+        else:
+            server = await start_server(factory, "tcp:127.0.0.1:0")
+            port = server.sockets[0].getsockname()[1]
+            address = f"tcp:127.0.0.1:{port}"
+
+        async with server:
+            remote = await asyncio.gather(*(play([address], seed) for seed in range(3)))
+
+        local = [
+            await play([f"python:{path}/lowest.py:LowestBot"], seed)
+            for seed in range(3)
+        ]
+        return remote, local
+
+    remote, local = asyncio.run(run())
+    assert remote == local
+
+
+def test_shared_memory_seats(tmp_path):
+    path = write_bot(tmp_path / "lowest")
+
+    async def play(kind: type[SubprocessSeat]) -> tuple[bytes, list[type]]:
+        pool = SeatPool(lambda player, path: kind.create(player, "./run", cwd=path))
+        table = await setup_table([str(path)], pool, log=lambda message: None)
+        recorder = GameRecorder([str(path)] * 4, 42)
+        await play_game(
+            table,
+            Random(42),
+            max_rounds=3,
+            log=lambda message: None,
+            recorder=recorder,
+        )
+        kinds = [type(seat) for seat in table.seats.values()]
+        await release_table(table, pool)
+        return write_record(recorder.record), kinds
+
+    text_record, _ = asyncio.run(play(SubprocessSeat))
+    shm_record, kinds = asyncio.run(play(SharedMemorySeat))
+    assert kinds == [SharedMemorySeat] * 4
+    assert shm_record == text_record
+
+
+def test_binary_seats(tmp_path):
+    path = write_bot(tmp_path / "lowest")
+
+    async def play(binary: bool) -> tuple[bytes, list[bool]]:
+        pool = SeatPool(
+            lambda player, path: SubprocessSeat.create(
+                player, "./run", cwd=path, binary=binary
+            )
+        )
+        table = await setup_table([str(path)], pool, log=lambda message: None)
+        recorder = GameRecorder([str(path)] * 4, 42)
+        await play_game(
+            table,
+            Random(42),
+            max_rounds=3,
+            log=lambda message: None,
+            recorder=recorder,
+        )
+        modes = [seat.binary for seat in table.seats.values()]
+        await release_table(table, pool)
+        return write_record(recorder.record), modes
+
+    text_record, text_modes = asyncio.run(play(False))
+    binary_record, binary_modes = asyncio.run(play(True))
+    assert text_modes == [False] * 4
+    assert binary_modes == [True] * 4
+    assert binary_record == text_record
+
+
+def test_concurrent_setup(tmp_path):
+    path = write_bot(tmp_path / "lowest")
+    started: list[int] = []
+
+    async def spawn(player: int, path: str) -> SubprocessSeat:
+        started.append(player)
+        await asyncio.sleep(0.1)
+        assert len(started) == 4
+        return await SubprocessSeat.create(player, "./run", cwd=path)
+
+    async def run() -> list[int]:
+        pool = SeatPool(spawn)
+        log: list[str] = []
+        table = await setup_table([str(path)], pool, log=log.append)
+        assert log == [
+            f"[server] seat {player} is {table.seats[player]}" for player in range(4)
+        ]
+        players = [seat.player for seat in table.seats.values()]
+        await release_table(table, pool)
+        return players
+
+    assert asyncio.run(run()) == [0, 1, 2, 3]
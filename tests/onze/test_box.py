@@ -0,0 +1,262 @@
+from onze.box import (
+    Box,
+    BoxedProcess,
+    Mount,
+    Zygote,
+    close_zygotes,
+    create_boxed_subprocess_exec,
+    get_zygote,
+)
+from onze.judge import release_table, setup_table
+from onze.seats import Seat, SeatPool, SubprocessSeat
+from asyncio.subprocess import PIPE
+from pathlib import Path
+import asyncio
+import os
+import pytest
+import select
+import signal
+import threading
+
+
+def make_box(root: Path) -> Box:
+    """Create a minimal environment sharing the programs of the host."""
+    for name in ("usr", "tmp"):
+        (root / name).mkdir(parents=True)
+
+    for name in ("bin", "lib", "lib64", "sbin"):
+        (root / name).symlink_to(f"usr/{name}")
+
+    return Box(
+        root=root,
+        mounts=[
+            Mount(
+                destination=Path("/usr"), source=Path("/usr"), options=["rbind", "ro"]
+            )
+        ],
+        zygote=True,
+    )
+
+
+def start_zygote(box: Box) -> Zygote:
+    zygote = Zygote(box)
+
+    # Namespaces are not available everywhere, in which case the zygote exits
+    try:
+        run(zygote, ["true"])
+    except (OSError, RuntimeError):
+        zygote.close()
+        pytest.skip("cannot isolate processes on this system")
+
+    return zygote
+
+
+def start(
+    zygote: Zygote, args: list[str], cwd: str | None = None
+) -> tuple[int, int, int]:
+    """Start a process from a zygote and get its number, pidfd and output."""
+    output_read, output_write = os.pipe()
+    release_read, release_write = os.pipe()
+    devnull = os.open(os.devnull, os.O_RDWR)
+    pid, pidfd = zygote.spawn(
+        args, cwd, [devnull, output_write, output_write, release_read]
+    )
+
+    for fd in (devnull, output_write, release_read):
+        os.close(fd)
+
+    os.write(release_write, b"\0")
+    os.close(release_write)
+    return pid, pidfd, output_read
+
+
+def run(zygote: Zygote, args: list[str], cwd: str | None = None) -> tuple[int, bytes]:
+    pid, pidfd, output_read = start(zygote, args, cwd)
+
+    with open(output_read, "rb") as output:
+        data = output.read()
+
+    status = zygote.exit_status(pid)
+    os.close(pidfd)
+    return status, data
+
+
+def test_zygote(tmp_path):
+    zygote = start_zygote(make_box(tmp_path))
+
+    # Processes see the box root and are alone in their process namespace
+    assert run(zygote, ["sh", "-c", "ls /; echo $$; exit 3"], "/usr") == (
+        3,
+        b"bin\nlib\nlib64\nsbin\ntmp\nusr\n1\n",
+    )
+
+    for _ in range(3):
+        assert run(zygote, ["sh", "-c", "pwd"], "/tmp") == (0, b"/tmp\n")
+
+    assert run(zygote, ["/nonexistent"])[0] == 127
+
+    # The zygote keeps none of the standard streams of the judge
+    for fd in (0, 1, 2):
+        stat = os.stat(f"/proc/{zygote.pid}/fd/{fd}")
+        assert stat.st_rdev == os.stat(os.devnull).st_rdev
+
+    zygote.close()
+
+
+def test_zygote_isolation(tmp_path):
+    zygote = start_zygote(make_box(tmp_path))
+    pid, pidfd, output = start(zygote, ["sleep", "10"])
+
+    # Another process from the same zygote cannot reach the first one
+    assert run(zygote, ["sh", "-c", "kill -9 -1; exit 5"])[0] == 5
+    waiter = select.poll()
+    waiter.register(pidfd, select.POLLIN)
+    assert not waiter.poll(100)
+
+    signal.pidfd_send_signal(pidfd, signal.SIGKILL)
+    assert zygote.exit_status(pid) == -signal.SIGKILL
+    os.close(pidfd)
+    os.close(output)
+    zygote.close()
+
+
+def test_get_zygote(tmp_path):
+    box = make_box(tmp_path)
+    zygote = start_zygote(box)
+    zygote.close()
+
+    first = get_zygote(box)
+    assert get_zygote(Box(root=box.root, mounts=list(box.mounts))) is first
+    assert get_zygote(Box(root=box.root)) is not first
+    close_zygotes()
+
+
+@pytest.fixture
+def fake_cgroups(tmp_path, monkeypatch) -> list[Path]:
+    """Create cgroups as plain directories, which cannot be removed."""
+    cgroups: list[Path] = []
+    lock = threading.Lock()
+
+    def setup_cgroup(self: BoxedProcess) -> int:
+        # Processes can be started from several threads at once
+        with lock:
+            self._cgroup = tmp_path / f"cgroup-{len(cgroups)}"
+            self._cgroup.mkdir()
+            cgroups.append(self._cgroup)
+
+        return os.open(self._cgroup, os.O_PATH)
+
+    def rmdir(path: Path) -> None:
+        (Path(path) / "removed").touch()
+
+    monkeypatch.setattr(BoxedProcess, "_setup_cgroup", setup_cgroup)
+    monkeypatch.setattr(os, "rmdir", rmdir)
+    return cgroups
+
+
+def cgroup_pids(cgroup: Path) -> list[int]:
+    """Get the numbers in all namespaces of the process moved into a cgroup."""
+    pid = int((cgroup / "cgroup.procs").read_text())
+
+    with open(f"/proc/{pid}/status") as status:
+        for line in status:
+            if line.startswith("NSpid:"):
+                return list(map(int, line.split()[1:]))
+
+    return []
+
+
+def test_boxed_process_zygote(tmp_path, fake_cgroups):
+    box = make_box(tmp_path / "root")
+    start_zygote(box).close()
+
+    with BoxedProcess(["sh", "-c", "exit 4"], box) as process:
+        assert process.wait() == 4
+
+    # Processes are moved into their cgroup before they are released
+    process = BoxedProcess(["sleep", "10"], box)
+    assert cgroup_pids(fake_cgroups[1])[-2:] == [process.pid, 1]
+    assert process.poll() is None
+    process.kill()
+    assert process.wait() == -signal.SIGKILL
+    assert process.poll() == -signal.SIGKILL
+    assert all((cgroup / "removed").exists() for cgroup in fake_cgroups)
+    close_zygotes()
+
+
+def test_boxed_subprocess_zygote(tmp_path, fake_cgroups):
+    box = make_box(tmp_path / "root")
+    start_zygote(box).close()
+
+    async def play() -> tuple[bytes, int, int]:
+        process = await create_boxed_subprocess_exec(
+            "cat", box=box, cwd=None, stdin=PIPE, stdout=PIPE, stderr=PIPE
+        )
+        sleeper = await create_boxed_subprocess_exec("sleep", "10", box=box, cwd=None)
+        assert cgroup_pids(fake_cgroups[1])[-2:] == [sleeper.pid, 1]
+
+        assert process.stdin is not None and process.stdout is not None
+        process.stdin.write(b"hello\n")
+        line = await process.stdout.readline()
+        process.stdin.close()
+
+        # Exit statuses are read from the zygote without blocking the loop
+        sleeper.kill()
+        killed = await asyncio.wait_for(sleeper.wait(), 5)
+        status = await asyncio.wait_for(process.wait(), 5)
+        assert not get_zygote(box).watchers
+        return line, killed, status
+
+    assert asyncio.run(play()) == (b"hello\n", -signal.SIGKILL, 0)
+    assert all((cgroup / "removed").exists() for cgroup in fake_cgroups)
+    close_zygotes()
+
+
+def test_boxed_subprocess_terminate(tmp_path, fake_cgroups):
+    box = make_box(tmp_path / "root")
+    start_zygote(box).close()
+    (tmp_path / "root" / "tmp" / "bot").write_text("while read line; do :; done\n")
+
+    async def play() -> int:
+        # The bot has no handler for SIGTERM, which it would otherwise ignore
+        # as the first process of its namespace
+        bot = await create_boxed_subprocess_exec(
+            "sh", "/tmp/bot", box=box, cwd=None, stdin=PIPE
+        )
+        bot.terminate()
+        return await asyncio.wait_for(bot.wait(), 5)
+
+    assert asyncio.run(play()) == -signal.SIGKILL
+    assert all((cgroup / "removed").exists() for cgroup in fake_cgroups)
+    close_zygotes()
+
+
+def test_boxed_seats_concurrent(tmp_path, fake_cgroups, monkeypatch):
+    box = make_box(tmp_path / "root")
+    start_zygote(box).close()
+    (tmp_path / "root" / "tmp" / "bot").write_text(
+        'while read line; do [ "$line" = end ] && exit 3; done\n'
+    )
+    setup_cgroup = BoxedProcess._setup_cgroup
+    barrier = threading.Barrier(4, timeout=5)
+
+    def meet(self: BoxedProcess) -> int:
+        # Only passes once the four seats are being started at the same time
+        barrier.wait()
+        return setup_cgroup(self)
+
+    monkeypatch.setattr(BoxedProcess, "_setup_cgroup", meet)
+
+    async def spawn(player: int, path: str) -> Seat:
+        return await SubprocessSeat.create(player, "sh", path, box=box)
+
+    async def play() -> list[int | None]:
+        pool = SeatPool(spawn)
+        table = await setup_table(["/tmp/bot"], pool, log=lambda _: None)
+        seats = list(table.seats.values())
+        await release_table(table, pool, reuse=False)
+        return [seat.process.returncode for seat in seats]  # type: ignore
+
+    assert asyncio.run(play()) == [3] * 4
+    assert all((cgroup / "removed").exists() for cgroup in fake_cgroups)
+    close_zygotes()
@@ -1,9 +1,21 @@
 from onze.cards import (
     Card,
+    cards,
+    card_indices,
     make_card_key,
     deal_random_hands,
+    deal_random_masks,
     score_trick,
+    score_trick_indices,
     playable_cards,
+    playable_mask,
+    hand_to_mask,
+    mask_to_hand,
+    mask_indices,
+    canonicalize,
+    permute_index,
+    permute_mask,
+    suits,
 )
 from collections import Counter
 from random import Random
@@ -205,3 +217,107 @@ def test_playable_cards():
         Card("S", "J"),
     }
     assert playable_cards((Card("S", "J"),), hand2) == hand2
+
+
+def test_hand_mask():
+    hand = {Card("C", "5"), Card("C", "6"), Card("D", "5"), Card("S", "A")}
+    mask = hand_to_mask(hand)
+
+    assert mask == 0b1 | 0b10 | 1 << 10 | 1 << 39
+    assert mask_indices(mask) == [0, 1, 10, 39]
+    assert mask_to_hand(mask) == hand
+    assert hand_to_mask(set()) == 0
+    assert mask_to_hand(0) == set()
+    assert [cards[index] for index in mask_indices(mask)] == sorted(
+        hand, key=make_card_key()
+    )
+
+
+def test_deal_random_masks():
+    for seed in range(20):
+        hands = deal_random_hands(Random(seed))
+        masks = deal_random_masks(Random(seed))
+        assert masks == tuple(map(hand_to_mask, hands))
+
+    first = hand_to_mask({Card("C", "5"), Card("D", "5"), Card("S", "A")})
+    assert deal_random_masks(NotRandom(), (first,)) == (
+        first,
+        hand_to_mask({Card("C", rank) for rank in "6789TJQKA"} | {Card("D", "6")}),
+        hand_to_mask(
+            {Card("D", rank) for rank in "789TJQKA"} | {Card("H", "5"), Card("H", "6")}
+        ),
+        hand_to_mask(
+            {Card("H", rank) for rank in "789TJQKA"} | {Card("S", "5"), Card("S", "6")}
+        ),
+        hand_to_mask({Card("S", rank) for rank in "789TJQK"}),
+    )
+
+
+def test_score_trick_indices():
+    random = Random(42)
+
+    for _ in range(1000):
+        trick = random.sample(cards, 4)
+        trump = random.choice((None,) + suits)
+        indices = [card_indices[card] for card in trick]
+        trump_index = suits.index(trump) if trump is not None else None
+        assert score_trick_indices(indices, trump_index) == score_trick(trick, trump)
+
+
+def test_playable_mask():
+    random = Random(42)
+
+    for _ in range(1000):
+        hand = set(random.sample(cards, 10))
+        trick = random.sample([card for card in cards if card not in hand], 2)
+        mask = hand_to_mask(hand)
+        indices = [card_indices[card] for card in trick]
+
+        assert playable_mask(indices, mask) == hand_to_mask(playable_cards(trick, hand))
+        assert playable_mask(indices[:1], mask) == hand_to_mask(
+            playable_cards(trick[:1], hand)
+        )
+        assert playable_mask((), mask) == mask
+
+
+def test_permute_mask():
+    random = Random(42)
+
+    for _ in range(100):
+        permutation = random.sample(range(len(suits)), len(suits))
+        mask = hand_to_mask(random.sample(cards, 10))
+        permuted = permute_mask(mask, permutation)
+
+        assert permuted.bit_count() == 10
+        assert mask_indices(permuted) == sorted(
+            permute_index(index, permutation) for index in mask_indices(mask)
+        )
+
+
+def test_canonicalize():
+    random = Random(42)
+
+    for _ in range(100):
+        hands = deal_random_masks(random)
+        permutation = random.sample(range(len(suits)), len(suits))
+        permuted = [permute_mask(hand, permutation) for hand in hands]
+
+        canonical, found = canonicalize(hands)
+        assert canonicalize(permuted)[0] == canonical
+        assert canonical == tuple(permute_mask(hand, found) for hand in hands)
+        assert sorted(found) == list(range(len(suits)))
+
+        # Suits that are kept in place are not exchanged with others
+        trump = random.randrange(len(suits))
+        canonical, found = canonicalize(hands, (trump,))
+        assert found[trump] == trump
+
+        swap = [suit for suit in range(len(suits)) if suit != trump]
+        shuffled = random.sample(swap, len(swap))
+        permutation = list(range(len(suits)))
+
+        for suit, target in zip(swap, shuffled):
+            permutation[suit] = target
+
+        permuted = [permute_mask(hand, permutation) for hand in hands]
+        assert canonicalize(permuted, (trump,))[0] == canonical
@@ -1,7 +1,17 @@
-from onze.cards import Hands, Card
+from onze.cards import (
+    Hands,
+    Card,
+    cards,
+    card_indices,
+    deal_random_hands,
+    hand_to_mask,
+    suits,
+)
 from onze import game
 from onze.protocol import read_hand, read_card
 import asyncio
+from copy import deepcopy
+from random import Random
 from dataclasses import dataclass
 from typing import Sequence
 
@@ -20,17 +30,28 @@ def check_bid_sequence(
 ) -> None:
     next_bid = 0
 
-    async def query_bid(player: int) -> Card:
+    def query_bid(player: int) -> int:
         assert player == bids[next_bid].player
         return bids[next_bid].query
 
-    async def reply_bid(player: int, bid: int) -> None:
+    def reply_bid(player: int, bid: int) -> None:
         nonlocal next_bid
         assert player == bids[next_bid].player
         assert bid == bids[next_bid].reply
         next_bid += 1
 
-    assert asyncio.run(game.bid(starter, query_bid, reply_bid)) == winner
+    async def query_bid_async(player: int) -> int:
+        return query_bid(player)
+
+    async def reply_bid_async(player: int, bid: int) -> None:
+        reply_bid(player, bid)
+
+    assert asyncio.run(game.bid(starter, query_bid_async, reply_bid_async)) == winner
+    assert next_bid == len(bids)
+
+    next_bid = 0
+    assert game.bid_sync(starter, query_bid, reply_bid) == winner
+    assert next_bid == len(bids)
 
 
 def test_bid():
@@ -156,17 +177,33 @@ def check_round_sequence(
 ) -> None:
     next_move = 0
 
-    async def query_card(player: int) -> Card:
+    def query_card(player: int) -> Card | None:
         assert player == moves[next_move].player
         return read_card(moves[next_move].query)
 
-    async def reply_card(player: int, card: Card) -> None:
+    def reply_card(player: int, card: Card) -> None:
         nonlocal next_move
         assert player == moves[next_move].player
         assert card == read_card(moves[next_move].reply)
         next_move += 1
 
-    assert asyncio.run(game.round(starter, hands, query_card, reply_card)) == scores
+    async def query_card_async(player: int) -> Card | None:
+        return query_card(player)
+
+    async def reply_card_async(player: int, card: Card) -> None:
+        reply_card(player, card)
+
+    assert (
+        asyncio.run(
+            game.round(starter, deepcopy(hands), query_card_async, reply_card_async)
+        )
+        == scores
+    )
+    assert next_move == len(moves)
+
+    next_move = 0
+    assert game.round_sync(starter, deepcopy(hands), query_card, reply_card) == scores
+    assert next_move == len(moves)
 
 
 def test_round():
@@ -232,3 +269,165 @@ def test_round():
         ),
         scores={0: 70, 1: 30},
     )
+
+
+def play_random_game(seed: int, use_sync: bool) -> tuple[list, dict[int, int]]:
+    """Play a game with random (sometimes invalid) moves and log all events."""
+    deal_random = Random(seed)
+    move_random = Random(seed + 1)
+    log: list = []
+
+    def deal_hands() -> Hands:
+        hands = deal_random_hands(deal_random)
+        log.append(("hands", deepcopy(hands)))
+        return hands
+
+    def query_bid(player: int) -> int:
+        return move_random.choice((0, 0, 50, 55, 60, 65, 70, 80, 100, 105, 42))
+
+    def reply_bid(player: int, bid: int) -> None:
+        log.append(("bid", player, bid))
+
+    def query_card(player: int) -> Card | None:
+        return move_random.choice(cards + [None])
+
+    def reply_card(player: int, card: Card) -> None:
+        log.append(("card", player, card))
+
+    settings = {"starter": 1, "max_rounds": 5, "winning_score": 500}
+
+    if use_sync:
+        results = game.play_sync(
+            deal_hands=deal_hands,
+            query_bid=query_bid,
+            reply_bid=reply_bid,
+            query_card=query_card,
+            reply_card=reply_card,
+            **settings,
+        )
+    else:
+
+        async def deal_hands_async() -> Hands:
+            return deal_hands()
+
+        async def query_bid_async(player: int) -> int:
+            return query_bid(player)
+
+        async def reply_bid_async(player: int, bid: int) -> None:
+            reply_bid(player, bid)
+
+        async def query_card_async(player: int) -> Card | None:
+            return query_card(player)
+
+        async def reply_card_async(player: int, card: Card) -> None:
+            reply_card(player, card)
+
+        results = asyncio.run(
+            game.play(
+                deal_hands=deal_hands_async,
+                query_bid=query_bid_async,
+                reply_bid=reply_bid_async,
+                query_card=query_card_async,
+                reply_card=reply_card_async,
+                **settings,
+            )
+        )
+
+    return log, results
+
+
+def test_play_sync_matches_play():
+    for seed in range(20):
+        async_log, async_results = play_random_game(seed, use_sync=False)
+        sync_log, sync_results = play_random_game(seed, use_sync=True)
+
+        assert sync_log == async_log
+        assert sync_results == async_results
+        assert async_log[0][0] == "hands"
+        assert async_log[1][:2] == ("bid", 1)
+
+
+def test_game_state():
+    hands = (
+        read_hand("C8 C9 CA D5 D6 H9 HT S5 S7 SJ"),
+        read_hand("D7 D8 DK H6 H7 H8 HJ HK S9 ST"),
+        read_hand("C5 C7 DA DJ H5 HA S6 S8 SA SQ"),
+        read_hand("C6 CJ CK CQ CT D9 DQ DT HQ SK"),
+    )
+    tricks = [
+        ("CA", "D7", "C5", "C6"),
+        ("C8", "ST", "C7", "CT"),
+        ("SK", "S5", "S9", "SA"),
+        ("SQ", "CJ", "S7", "D8"),
+        ("HQ", "HT", "H6", "HA"),
+        ("S8", "CK", "SJ", "H7"),
+        ("DT", "D6", "DK", "DA"),
+        ("DJ", "DQ", "D5", "H8"),
+        ("D9", "H9", "HJ", "S6"),
+        ("CQ", "C9", "HK", "H5"),
+    ]
+    moves = [move for trick in tricks for move in trick]
+    state = game.GameState.from_hands(0, hands)
+    initial_hands = list(state.hands)
+
+    assert state.legal_moves() == [card_indices[card] for card in sorted(hands[0])]
+    assert state.trump is None
+
+    for number, move in enumerate(moves):
+        card = card_indices[read_card(move)]
+        assert card in state.legal_moves()
+        assert state.play(card) == (number % 4 == 3)
+        assert state.trump == suits.index("C")
+
+    assert state.is_over
+    assert state.scores == [70, 30]
+
+    for _ in moves:
+        state.undo()
+
+    assert state.hands == initial_hands
+    assert state.scores == [0, 0]
+    assert state.player == 0
+    assert state.trick == []
+    assert state.trump is None
+
+
+def play_game_state_round(seed: int) -> None:
+    """Play a random round with both game.round() and a GameState."""
+    random = Random(seed)
+    hands = deal_random_hands(random)
+    state = game.GameState.from_hands(seed % 4, hands)
+    snapshots = []
+
+    def query_card(player: int) -> Card | None:
+        assert player == state.player
+        return random.choice(cards)
+
+    def reply_card(player: int, card: Card) -> None:
+        assert card_indices[card] in state.legal_moves()
+        snapshots.append(
+            (list(state.hands), state.player, list(state.trick), state.trump)
+        )
+        state.play(card_indices[card])
+
+    scores = game.round_sync(seed % 4, hands, query_card, reply_card)
+    assert state.is_over
+    assert state.scores == [scores[0], scores[1]]
+    assert state.hands == [0, 0, 0, 0]
+
+    for hands_mask, player, trick, trump in reversed(snapshots):
+        state.undo()
+        assert state.hands == hands_mask
+        assert state.player == player
+        assert state.trick == trick
+        assert state.trump == trump
+
+    assert state.scores == [0, 0]
+    assert state.hands == [
+        hand_to_mask(hand) for hand in deal_random_hands(Random(seed))
+    ]
+
+
+def test_game_state_matches_round():
+    for seed in range(50):
+        play_game_state_round(seed)
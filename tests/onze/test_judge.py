@@ -0,0 +1,44 @@
+from onze.judge import setup_table
+from onze.protocol import Command
+from onze.seats import Seat, SeatPool
+import asyncio
+import pytest
+
+
+class RecordingSeat(Seat):
+    def __init__(self, player: int):
+        self.player = player
+        self.commands: list[Command] = []
+        self.closed = False
+
+    async def close(self) -> None:
+        self.closed = True
+
+    async def send(self, command: Command) -> None:
+        self.commands.append(command)
+
+    async def receive(self) -> str:
+        return ""
+
+
+def test_setup_table_failure():
+    seats: list[RecordingSeat] = []
+
+    async def spawn(player: int, path: str) -> Seat:
+        await asyncio.sleep(0.01 * player)
+
+        if path == "broken":
+            raise OSError("cannot start bot")
+
+        seats.append(RecordingSeat(player))
+        return seats[-1]
+
+    async def setup() -> None:
+        await setup_table(["good", "broken"], SeatPool(spawn), log=lambda _: None)
+
+    # Seats which were started are closed when another one fails
+    with pytest.raises(OSError, match="cannot start bot"):
+        asyncio.run(setup())
+
+    assert [seat.player for seat in seats] == [0, 2]
+    assert all(seat.closed for seat in seats)
@@ -1,7 +1,13 @@
-from onze.cards import Card
+from onze.cards import Card, hand_to_mask
 from onze.protocol import (
     write_card,
     read_card,
+    write_card_index,
+    read_card_index,
+    write_trick_indices,
+    read_trick_indices,
+    write_hand_mask,
+    read_hand_mask,
     write_trick,
     read_trick,
     write_hand,
@@ -13,8 +19,16 @@ from onze.protocol import (
     QueryCardCommand,
     ReplyCardCommand,
     EndCommand,
+    NewGameCommand,
     write_command,
     read_command,
+    read_address,
+    pack_command,
+    unpack_command,
+    binary_sizes,
+    read_binary_command,
+    write_binary_command,
+    encode_command,
 )
 import pytest
 
@@ -96,6 +110,44 @@ def test_read_hand():
     }
 
 
+def test_write_card_index():
+    assert write_card_index(0) == "C5"
+    assert write_card_index(15) == "DT"
+    assert write_card_index(26) == "HJ"
+    assert write_card_index(39) == "SA"
+
+
+def test_read_card_index():
+    assert read_card_index("C5") == 0
+    assert read_card_index("DT") == 15
+    assert read_card_index("HJ") == 26
+    assert read_card_index("SA") == 39
+    assert read_card_index("C") is None
+    assert read_card_index("CTT") is None
+    assert read_card_index("CX") is None
+    assert read_card_index("X9") is None
+
+
+def test_trick_indices():
+    assert write_trick_indices([5, 4, 0, 39]) == "CT C9 C5 SA"
+    assert read_trick_indices("CT C9 C5 SA") == [5, 4, 0, 39]
+    assert read_trick_indices("CT XX X CT C C5 CTT") == [5, 5, 0]
+
+
+def test_hand_mask():
+    hand = {
+        Card(suit="C", rank="T"),
+        Card(suit="C", rank="5"),
+        Card(suit="S", rank="Q"),
+        Card(suit="S", rank="5"),
+        Card(suit="D", rank="K"),
+    }
+
+    assert write_hand_mask(hand_to_mask(hand)) == write_hand(hand)
+    assert read_hand_mask("CT C5 SQ S5 DK CT") == hand_to_mask(hand)
+    assert read_hand_mask("") == 0
+
+
 def test_write_command():
     assert write_command(PlayerCommand(player=1)) == "player 1"
 
@@ -121,6 +173,7 @@ def test_write_command():
     assert write_command(ReplyCardCommand(player=3, card=Card(suit="H", rank="Q")))
 
     assert write_command(EndCommand()) == "end"
+    assert write_command(NewGameCommand()) == "newgame"
 
     with pytest.raises(ValueError, match="unknown command type '<class 'dict'>'"):
         write_command({})
@@ -156,6 +209,116 @@ def test_read_command():
         read_command("card 2 XX")
 
     assert read_command("end") == EndCommand()
+    assert read_command("newgame") == NewGameCommand()
 
     with pytest.raises(ValueError, match="invalid command 'invalid'"):
         read_command("invalid")
+
+
+def test_read_address():
+    assert read_address("unix:/run/bot.sock") == ("unix", "/run/bot.sock")
+    assert read_address("tcp:localhost:4000") == ("tcp", "localhost", 4000)
+    assert read_address("tcp:[::1]:4000") == ("tcp", "::1", 4000)
+
+    for data in ("unix:", "tcp:localhost", "tcp:localhost:port", "udp:host:1"):
+        with pytest.raises(ValueError, match="invalid address"):
+            read_address(data)
+
+
+def test_pack_command():
+    hand = {Card("S", "A"), Card("C", "5"), Card("H", "J")}
+    commands = [
+        PlayerCommand(3),
+        HandCommand(hand),
+        QueryBidCommand(),
+        ReplyBidCommand(2, 105),
+        QueryCardCommand(),
+        ReplyCardCommand(1, Card("S", "A")),
+        EndCommand(),
+        NewGameCommand(),
+    ]
+
+    for command in commands:
+        packed = pack_command(command)
+        assert 0 <= packed < 1 << 64
+        assert unpack_command(packed) == command
+
+    assert pack_command(HandCommand(hand)) == 2 | hand_to_mask(hand) << 24
+    assert pack_command(ReplyBidCommand(2, 105)) == 4 | 2 << 8 | 105 << 16
+
+    with pytest.raises(ValueError, match="invalid command code"):
+        unpack_command(0)
+
+    with pytest.raises(ValueError, match="invalid card index"):
+        unpack_command(6 | 40 << 16)
+
+    with pytest.raises(ValueError, match="bid 256 does not fit"):
+        pack_command(ReplyBidCommand(2, 256))
+
+    with pytest.raises(ValueError, match="bid -5 does not fit"):
+        pack_command(ReplyBidCommand(2, -5))
+
+    with pytest.raises(ValueError, match="player 300 does not fit"):
+        pack_command(PlayerCommand(300))
+
+
+def test_binary_command():
+    hand = {Card("S", "A"), Card("C", "5"), Card("H", "J")}
+    commands = [
+        PlayerCommand(3),
+        HandCommand(hand),
+        QueryBidCommand(),
+        ReplyBidCommand(2, 105),
+        QueryCardCommand(),
+        ReplyCardCommand(1, Card("S", "A")),
+        EndCommand(),
+        NewGameCommand(),
+    ]
+
+    for command in commands:
+        data = write_binary_command(command)
+        assert len(data) == 1 + binary_sizes[data[0]]
+        assert read_binary_command(data[0], data[1:]) == command
+
+    assert write_binary_command(PlayerCommand(3)) == b"\x01\x03"
+    assert write_binary_command(HandCommand(hand)) == b"\x02" + hand_to_mask(
+        hand
+    ).to_bytes(5, "little")
+    assert write_binary_command(ReplyCardCommand(1, Card("S", "A"))) == b"\x06\x01\x27"
+    assert write_binary_command(EndCommand()) == b"\x07"
+
+    with pytest.raises(ValueError, match="invalid command code"):
+        read_binary_command(0, b"")
+
+    with pytest.raises(ValueError, match="invalid card index"):
+        read_binary_command(6, b"\x01\x28")
+
+    with pytest.raises(ValueError, match="do not fit in bytes"):
+        write_binary_command(ReplyBidCommand(2, 256))
+
+
+def test_encode_command():
+    commands = [
+        PlayerCommand(3),
+        HandCommand({Card("S", "A"), Card("C", "5"), Card("H", "J")}),
+        QueryBidCommand(),
+        ReplyBidCommand(2, 105),
+        ReplyBidCommand(1, 0),
+        ReplyBidCommand(0, 42),
+        QueryCardCommand(),
+        ReplyCardCommand(1, Card("S", "A")),
+        ReplyCardCommand(7, Card("H", "J")),
+        EndCommand(),
+        NewGameCommand(),
+    ]
+
+    for command in commands:
+        assert encode_command(command) == f"{write_command(command)}\n".encode()
+
+    # Lines of common commands are shared rather than rebuilt
+    assert encode_command(ReplyBidCommand(2, 105)) is encode_command(
+        ReplyBidCommand(2, 105)
+    )
+    assert encode_command(ReplyCardCommand(1, Card("S", "A"))) is encode_command(
+        ReplyCardCommand(1, Card("S", "A"))
+    )
@@ -0,0 +1,62 @@
+from onze.ratings import Rating, Ratings
+import math
+
+
+def test_expected():
+    ratings = Ratings()
+    assert ratings.expected(["a", "b"], ["c", "d"]) == 0.5
+
+    ratings.get("a").value = 1900
+    ratings.get("b").value = 1500
+    assert math.isclose(ratings.expected(["a", "b"], ["c"]), 1 / (1 + 10**-0.5))
+    assert math.isclose(
+        ratings.expected(["a", "b"], ["c"]) + ratings.expected(["c"], ["a", "b"]), 1
+    )
+    assert ratings.expected(["a", "a"], ["c"]) == ratings.expected(["a"], ["c"])
+
+
+def test_update():
+    ratings = Ratings(k=16)
+    ratings.update((["a", "b", "a", "b"][::2], ["c", "d"]), {0: 510, 1: 300})
+    assert ratings.bots == {
+        "a": Rating(1508, 1),
+        "c": Rating(1492, 1),
+        "d": Rating(1492, 1),
+    }
+
+    ratings.update((["a"], ["c"]), {0: 200, 1: 200})
+    assert ratings.get("a").value < 1508
+    assert math.isclose(ratings.get("a").value + ratings.get("c").value, 3000)
+    assert ratings.games == 2
+
+    # Playing against oneself does not change the rating
+    ratings.update((["d"], ["d"]), {0: 500, 1: 0})
+    assert ratings.get("d") == Rating(1492, 3)
+
+
+def test_stronger_bot_rises():
+    ratings = Ratings()
+
+    for game in range(200):
+        scores = {0: 500, 1: 100} if game % 4 else {0: 100, 1: 500}
+        ratings.update((["strong"], ["weak"]), scores)
+
+    (first, _), (second, _) = ratings.leaderboard()
+    assert (first, second) == ("strong", "weak")
+    # Expected score converges towards the actual winning rate
+    assert abs(ratings.expected(["strong"], ["weak"]) - 0.75) < 0.1
+
+
+def test_save_load(tmp_path):
+    ratings = Ratings(initial=1000, k=24)
+    ratings.update((["a"], ["b"]), {0: 510, 1: 300})
+    ratings.update((["b"], ["c"]), {0: 510, 1: 300})
+    path = tmp_path / "ratings.json"
+    ratings.save(path)
+    assert Ratings.load(path) == ratings
+    assert not (tmp_path / "ratings.json.tmp").exists()
+
+    resumed = Ratings.load(path)
+    resumed.update((["a"], ["c"]), {0: 0, 1: 510})
+    ratings.update((["a"], ["c"]), {0: 0, 1: 510})
+    assert resumed == ratings
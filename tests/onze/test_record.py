@@ -0,0 +1,153 @@
+from onze.cards import card_indices, deal_random_hands
+from onze.record import (
+    GameRecord,
+    RecordWriter,
+    iter_records,
+    read_record,
+    read_records,
+    replay,
+    write_record,
+)
+from dataclasses import replace
+import pytest
+import struct
+from random import Random
+
+
+def test_game_recorder(record_random_game):
+    for seed in range(20):
+        record = record_random_game(seed)
+        assert record.seats == ["a", "b", "c", "d"]
+        assert record.seed == seed
+        assert record.rounds[-1].scores == record.scores
+        assert record.duration > 0
+
+        for entry in record.rounds:
+            assert len(entry.cards) == 40
+            assert sum(entry.points.values()) == 100
+            assert entry.cards[0][0] == entry.bidder
+            assert (entry.bidder, entry.bid, entry.bidder / 10) in entry.bids
+            assert all(elapsed == player / 100 for player, _, elapsed in entry.cards)
+
+            for player, hand in enumerate(entry.hands):
+                played = sum(
+                    1 << card for other, card, _ in entry.cards if other == player
+                )
+                assert played == hand
+
+
+def test_game_recorder_matches_deals(record_random_game):
+    record = record_random_game(42)
+    random = Random(42)
+
+    for entry in record.rounds:
+        hands = deal_random_hands(random)
+        assert entry.hands == [
+            sum(1 << card_indices[card] for card in hand) for hand in hands
+        ]
+
+
+def strip(record: GameRecord) -> GameRecord:
+    """Remove the information which is not kept in binary records."""
+    return replace(
+        record,
+        seats=[],
+        started=0,
+        duration=0,
+        rounds=[
+            replace(
+                entry,
+                bids=[(player, bid, 0.0) for player, bid, _ in entry.bids],
+                cards=[(player, card, 0.0) for player, card, _ in entry.cards],
+            )
+            for entry in record.rounds
+        ],
+    )
+
+
+def test_write_read_record(record_random_game):
+    for seed in range(20):
+        record = record_random_game(seed, max_rounds=None)
+        data = write_record(record)
+        assert len(data) <= 20 + 64 * len(record.rounds)
+        assert read_record(data) == strip(record)
+
+    # Corrupted round counts and lengths are detected
+    data = write_record(record_random_game(1))
+    count = struct.unpack_from("<H", data, 16)[0]
+
+    with pytest.raises(ValueError, match=f"round {count}: truncated record"):
+        read_record(data[:16] + struct.pack("<H", count + 1) + data[18:])
+
+    with pytest.raises(ValueError, match="trailing data"):
+        read_record(data[:16] + struct.pack("<H", count - 1) + data[18:])
+
+    with pytest.raises(ValueError, match="truncated record"):
+        read_record(data[:-1])
+
+    with pytest.raises(ValueError, match="trailing data"):
+        read_record(data + b"\0")
+
+    record = record_random_game(0)
+    record.seed = -5
+
+    with pytest.raises(ValueError, match="seed -5 is not between"):
+        write_record(record)
+
+    record.seed = 1 << 64
+
+    with pytest.raises(ValueError, match="is not between"):
+        write_record(record)
+
+    record = record_random_game(1)
+    record.rounds[1].bids.pop()
+
+    with pytest.raises(ValueError, match="round 1: bids do not follow"):
+        write_record(record)
+
+    record = record_random_game(0)
+    entry = record.rounds[0]
+    entry.cards[0], entry.cards[1] = entry.cards[1], entry.cards[0]
+
+    with pytest.raises(ValueError, match="round 0: illegal card"):
+        write_record(record)
+
+
+def test_record_file(tmp_path, record_random_game):
+    path = tmp_path / "games.rec"
+    records = [record_random_game(seed) for seed in range(10)]
+
+    with RecordWriter(path) as writer:
+        for record in records[:5]:
+            writer.write(record)
+
+    # Records are appended to existing files
+    with RecordWriter(path) as writer:
+        for record in records[5:]:
+            writer.write(record)
+
+    assert [bytes(data) for data in iter_records(path)] == list(
+        map(write_record, records)
+    )
+    assert list(read_records(path)) == list(map(strip, records))
+
+    (tmp_path / "empty.rec").touch()
+    assert list(iter_records(tmp_path / "empty.rec")) == []
+
+    (tmp_path / "invalid.rec").write_bytes(b"invalid")
+
+    with pytest.raises(ValueError, match="not a game record file"):
+        list(iter_records(tmp_path / "invalid.rec"))
+
+
+def test_replay(record_random_game):
+    for seed in range(20):
+        record = record_random_game(seed)
+        assert replay(record) == record.scores
+        assert replay(read_record(write_record(record))) == record.scores
+
+    entry = record.rounds[0]
+    entry.cards[0], entry.cards[1] = entry.cards[1], entry.cards[0]
+
+    with pytest.raises(ValueError, match="illegal card"):
+        replay(record)
@@ -0,0 +1,72 @@
+from onze.record import RecordWriter, read_record, write_record
+from onze.replay import run_replay, verify_record
+import pytest
+import struct
+
+
+@pytest.mark.parametrize("use_sync", [False, True])
+def test_verify_record(use_sync, record_random_game):
+    for seed in range(20):
+        record = record_random_game(seed)
+        assert verify_record(record, use_sync=use_sync) == record.scores
+
+        decoded = read_record(write_record(record))
+        assert verify_record(decoded, use_sync=use_sync) == record.scores
+
+
+def test_verify_record_mismatch(record_random_game):
+    record = record_random_game(1)
+    record.seed += 1
+
+    with pytest.raises(ValueError, match="do not match the seed"):
+        verify_record(record)
+
+    record = record_random_game(1)
+    entry = record.rounds[-1]
+    entry.cards[-2], entry.cards[-1] = entry.cards[-1], entry.cards[-2]
+
+    with pytest.raises(ValueError, match="unexpected card"):
+        verify_record(record)
+
+    record = record_random_game(1)
+    record.scores[0] += 5
+
+    with pytest.raises(ValueError, match="do not match recorded"):
+        verify_record(record)
+
+    record = record_random_game(1)
+
+    with pytest.raises(ValueError, match="game ends after 1 of 6 recorded rounds"):
+        verify_record(record, winning_score=1)
+
+
+def test_run_replay(tmp_path, capsys, record_random_game):
+    path = tmp_path / "games.rec"
+    records = [record_random_game(seed) for seed in range(10)]
+    records[3].scores[1] -= 5
+
+    with RecordWriter(path) as writer:
+        for record in records:
+            writer.write(record)
+
+    assert run_replay([str(path), "--quiet"]) == 1
+    out, err = capsys.readouterr()
+    assert "9/10 games match" in out
+    assert "games.rec:3 seed=3 mismatch" in err
+
+
+def test_run_replay_corrupt(tmp_path, capsys, record_random_game):
+    path = tmp_path / "games.rec"
+
+    with RecordWriter(path) as writer:
+        writer.write(record_random_game(0))
+        writer.file.write(struct.pack("<I", 5) + bytes(5))
+        writer.write(record_random_game(1))
+        writer.file.write(struct.pack("<I", 100) + bytes(10))
+
+    assert run_replay([str(path), "--quiet"]) == 2
+    out, err = capsys.readouterr()
+    assert "2/4 games match" in out
+    assert "games.rec:1 corrupt: truncated record" in err
+    assert "games.rec:3 unreadable: " in err
+    assert "is truncated at byte" in err
@@ -0,0 +1,61 @@
+from onze.results import ResultsStore
+import sqlite3
+
+
+def test_results_store(tmp_path, record_random_game):
+    path = tmp_path / "results.db"
+    records = [record_random_game(seed) for seed in range(30)]
+    store = ResultsStore(path, batch_size=7)
+
+    for record in records:
+        store.add(record)
+
+    store.close()
+
+    # Reopening the store keeps existing results
+    store = ResultsStore(path)
+    store.add(records[0])
+    store.close()
+
+    with sqlite3.connect(path) as connection:
+        (games,) = connection.execute("select count(*) from games").fetchone()
+        assert games == 31
+
+        rows = connection.execute(
+            "select seed, score0, score1 from games order by id"
+        ).fetchall()
+        assert rows == [
+            (record.seed, record.scores[0], record.scores[1])
+            for record in records + records[:1]
+        ]
+
+        (rounds,) = connection.execute("select count(*) from rounds").fetchone()
+        assert rounds == 2 * sum(len(record.rounds) for record in records[:1]) + sum(
+            len(record.rounds) for record in records[1:]
+        )
+
+        (cards,) = connection.execute(
+            "select count(*) from cards where game = 1"
+        ).fetchone()
+        assert cards == 40 * len(records[0].rounds)
+
+        # Success rate of bids made by a bot, by bid value
+        rates = connection.execute(
+            "select bid, avg(case when bidder % 2 = 0 then points0 >= bid "
+            "else points1 >= bid end) from rounds where bidder_bot = ? "
+            "group by bid order by bid",
+            ("a",),
+        ).fetchall()
+        assert rates
+        assert all(0 <= rate <= 1 for _, rate in rates)
+
+        plan = " ".join(
+            str(row)
+            for row in connection.execute(
+                "explain query plan select * from rounds where bidder_bot = ?",
+                ("a",),
+            )
+        )
+        assert "rounds_bidder_bot" in plan
+
+    connection.close()
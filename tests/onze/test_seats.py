@@ -0,0 +1,350 @@
+from onze.protocol import (
+    Command,
+    PlayerCommand,
+    QueryBidCommand,
+    QueryCardCommand,
+    ReplyBidCommand,
+    ReplyCardCommand,
+    EndCommand,
+    write_binary_command,
+)
+from onze.cards import Card
+from onze.judge import release_table
+from onze.shm import Channel, ring_slots
+from onze.seats import (
+    Clock,
+    Seat,
+    SeatPool,
+    SharedMemorySeat,
+    StreamSeat,
+    SubprocessSeat,
+    Table,
+    read_features,
+)
+from contextlib import suppress
+from pathlib import Path
+import asyncio
+import os
+import sys
+
+bot_script = """\
+#!{executable}
+import os
+
+while (message := input()) != "end":
+    if message == "card ?":
+        print(os.getpid(), flush=True)
+"""
+
+
+def make_bot(path: Path, features: str | None) -> str:
+    path.mkdir()
+    run = path / "run"
+    run.write_text(bot_script.format(executable=sys.executable))
+    run.chmod(0o755)
+
+    if features is not None:
+        (path / "features").write_text(features)
+
+    return str(path)
+
+
+async def spawn(player: int, path: str) -> Seat:
+    return await SubprocessSeat.create(player, "./run", cwd=path)
+
+
+def test_read_features(tmp_path):
+    assert read_features(make_bot(tmp_path / "none", None)) == set()
+    assert read_features(make_bot(tmp_path / "some", "newgame\n\nother\n")) == {
+        "newgame",
+        "other",
+    }
+
+
+def test_seat_pool(tmp_path):
+    reusable = make_bot(tmp_path / "reusable", "newgame\n")
+    fresh = make_bot(tmp_path / "fresh", None)
+
+    async def play_games() -> dict[str, set[str]]:
+        pool = SeatPool(spawn)
+        pids: dict[str, set[str]] = {reusable: set(), fresh: set()}
+
+        for _ in range(3):
+            seats = {
+                player: await pool.acquire(player, (reusable, fresh)[player % 2])
+                for player in range(4)
+            }
+
+            for player, seat in seats.items():
+                assert seat.player == player
+                await seat.send(PlayerCommand(player))
+                path = (reusable, fresh)[player % 2]
+                pids[path].add(await seat.communicate(QueryCardCommand()))
+
+            for seat in seats.values():
+                await pool.release(seat)
+
+        assert len(pool.idle[reusable]) == 2
+        assert fresh not in pool.idle
+
+        # Seats of a failed game are not kept
+        seat = await pool.acquire(0, reusable)
+        await pool.release(seat, reuse=False)
+        assert not seat.alive
+        assert len(pool.idle[reusable]) == 1
+        await pool.release(await pool.acquire(0, reusable))
+
+        # Seats which still owe a late answer are not kept
+        table = Table({0: await pool.acquire(0, reusable)})
+        table.stale[0] = 1
+        await release_table(table, pool)
+        assert len(pool.idle[reusable]) == 0
+        await pool.close()
+        assert pool.idle == {}
+        return pids
+
+    pids = asyncio.run(play_games())
+    assert len(pids[reusable]) == 2
+    assert len(pids[fresh]) == 6
+
+
+class SleepySeat(Seat):
+    def __init__(self, player: int, delay: float):
+        self.player = player
+        self.delay = delay
+
+    async def close(self) -> None:
+        pass
+
+    async def send(self, command: Command) -> None:
+        pass
+
+    async def receive(self) -> str:
+        await asyncio.sleep(self.delay)
+        return "0"
+
+
+def test_table_latencies():
+    async def play() -> Table:
+        table = Table({player: SleepySeat(player, player / 100) for player in range(4)})
+
+        for _ in range(5):
+            for player in range(4):
+                await table.communicate(player, QueryBidCommand())
+                await table.communicate(player, QueryCardCommand())
+                await table.communicate(player, ReplyBidCommand(player, 0))
+
+        return table
+
+    table = asyncio.run(play())
+
+    for player in range(4):
+        assert table.latencies[player].keys() == {"bid", "card", "ReplyBidCommand"}
+
+        for histogram in table.latencies[player].values():
+            assert histogram.count == 5
+            assert histogram.quantile(0.5) >= player / 100 * 1e9
+
+    assert table.last_latency >= 0.03
+    assert table.waiting >= 15 * 0.06 * 1e9
+    summary = table.summary()
+    assert len(summary) == 13
+    assert summary[0].startswith("seat 0 bid: count=5 p50=")
+    assert summary[-1].startswith("total: elapsed=")
+
+
+class SlowBotSeat(Seat):
+    """Seat answering queries in order, each after a given delay."""
+
+    def __init__(self, player: int, delays: list[float]):
+        self.player = player
+        self.delays = iter(delays)
+        self.inbox: asyncio.Queue[Command] = asyncio.Queue()
+        self.outbox: asyncio.Queue[str] = asyncio.Queue()
+        self.task = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        count = 0
+
+        while True:
+            await self.inbox.get()
+            count += 1
+            await asyncio.sleep(next(self.delays))
+            await self.outbox.put(f"answer {count}")
+
+    async def close(self) -> None:
+        self.task.cancel()
+
+    async def send(self, command: Command) -> None:
+        await self.inbox.put(command)
+
+    async def receive(self) -> str:
+        return await self.outbox.get()
+
+
+def test_clock():
+    assert Clock().allowance() is None
+
+    clock = Clock(move_limit=1, bank=10)
+    assert clock.allowance() == 11
+    clock.charge(0.5)
+    assert clock.bank == 10
+    clock.charge(4)
+    assert clock.bank == 7
+    clock.charge(20)
+    assert clock.bank == 0
+    assert clock.allowance() == 1
+
+    clock = Clock(bank=5)
+    clock.charge(2)
+    assert clock.allowance() == 3
+
+
+def test_table_timeouts():
+    async def play() -> tuple[list[str], Table]:
+        seat = SlowBotSeat(0, [0.01, 0.34, 0.01, 0.01, 0.14, 0.01])
+        table = Table({0: seat}, {0: Clock(move_limit=0.1, bank=0.2)})
+        answers = [await table.communicate(0, QueryCardCommand()) for _ in range(6)]
+        await seat.close()
+        return answers, table
+
+    answers, table = asyncio.run(play())
+
+    # The second answer overruns the bank, after which the fifth answer
+    # overruns the move limit; late answers are never mistaken for later ones
+    assert answers == ["answer 1", "", "answer 3", "answer 4", "", "answer 6"]
+    assert table.overruns == {0: 2}
+    assert table.clocks[0].bank == 0
+    assert "seat 0 overruns: 2" in table.summary()
+
+
+def test_binary_receive_interrupted():
+    async def play() -> list[str]:
+        reader = asyncio.StreamReader()
+        seat = StreamSeat()
+        seat._open(reader, None)  # type: ignore
+        seat.binary = True
+        data = write_binary_command(ReplyCardCommand(0, Card("H", "A")))
+        answers = []
+
+        # An answer cut between its operation code and its payload is
+        # finished by the next call instead of being misread
+        reader.feed_data(data[:1])
+
+        with suppress(TimeoutError):
+            answers.append(await asyncio.wait_for(seat.receive(), 0.05))
+
+        reader.feed_data(data[1:] + write_binary_command(ReplyBidCommand(0, 55)))
+        answers.append(await seat.receive())
+        answers.append(await seat.receive())
+        return answers
+
+    assert asyncio.run(play()) == ["HA", "55"]
+
+
+def test_shared_memory_flush_interrupted():
+    async def play() -> list[int]:
+        seat = SharedMemorySeat()
+        seat.channel = Channel.create()
+        seat.messages = list(range(ring_slots + 10))
+        descriptors = [os.dup(fd) for fd in seat.channel.fds]
+        bot = Channel.attach("shm {} {} {}".format(*descriptors))
+
+        # The ring fills up, and the flush is interrupted while waiting
+        with suppress(TimeoutError):
+            await asyncio.wait_for(seat.flush(), 0.05)
+
+        received = [bot.receive() for _ in range(ring_slots)]
+        await seat.flush()
+        received += [bot.receive() for _ in range(10)]
+        assert bot.incoming.get() is None
+        bot.close()
+        seat.channel.close()
+        return received
+
+    assert asyncio.run(play()) == list(range(ring_slots + 10))
+
+
+class BufferWriter:
+    """Stream writer collecting written data."""
+
+    def __init__(self):
+        self.data = b""
+
+    def write(self, data: bytes) -> None:
+        self.data += data
+
+    async def drain(self) -> None:
+        pass
+
+
+def test_binary_handshake_timeout():
+    async def offer(late_answer: bytes) -> tuple[StreamSeat, list[str]]:
+        reader = asyncio.StreamReader()
+        seat = StreamSeat()
+        seat._open(reader, BufferWriter(), binary=True)  # type: ignore
+        seat.handshake_timeout = 0.05
+        await seat.send(PlayerCommand(0))
+        assert not seat.binary
+        reader.feed_data(late_answer + b"55\n")
+        return seat, [await seat.receive()]
+
+    # A late refusal is discarded, and the textual protocol goes on
+    seat, answers = asyncio.run(offer(b"text\n"))
+    assert answers == ["55"]
+    assert not seat.lost
+
+    # A late acceptance leaves the seat unable to understand the bot
+    seat, answers = asyncio.run(offer(b"binary 1\n"))
+    assert answers == [""]
+    assert seat.lost
+
+
+counting_script = """\
+#!{executable}
+count = 0
+
+while (message := input()) != "end":
+    count += 1
+
+    if message == "card ?":
+        print(count, flush=True)
+"""
+
+
+def test_buffered_writes(tmp_path):
+    path = tmp_path / "counting"
+    path.mkdir()
+    run = path / "run"
+    run.write_text(counting_script.format(executable=sys.executable))
+    run.chmod(0o755)
+
+    async def play() -> list[str]:
+        seat = await SubprocessSeat.create(0, "./run", cwd=str(path))
+        table = Table({0: seat})
+        assert seat.process.stdin is not None
+        writes = []
+        write = seat.process.stdin.write
+
+        def count_write(data: bytes) -> None:
+            writes.append(data)
+            write(data)
+
+        seat.process.stdin.write = count_write  # type: ignore
+        answers = []
+
+        for _ in range(3):
+            for player in range(4):
+                await table.broadcast(ReplyBidCommand(player, 0))
+
+            answers.append(await table.communicate(0, QueryCardCommand()))
+
+        await seat.send(PlayerCommand(0))
+        await seat.send(EndCommand())
+        await seat.close()
+        assert writes == [b"bid 0 0\nbid 1 0\nbid 2 0\nbid 3 0\ncard ?\n"] * 3 + [
+            b"player 0\nend\n"
+        ]
+        return answers
+
+    assert asyncio.run(play()) == ["5", "10", "15"]
@@ -0,0 +1,46 @@
+from onze.shm import Channel, Ring, memory_size, ring_slots
+import mmap
+import os
+
+
+def test_ring():
+    memory = memoryview(mmap.mmap(-1, memory_size))
+    writer = Ring(memory, 0)
+    reader = Ring(memory, 0)
+    assert reader.get() is None
+
+    for round in range(3):
+        for index in range(ring_slots):
+            assert writer.put(round << 40 | index)
+
+        assert not writer.put(1)
+
+        for index in range(ring_slots):
+            assert reader.get() == round << 40 | index
+
+        assert reader.get() is None
+
+    writer.release()
+    reader.release()
+
+
+def test_channel():
+    judge = Channel.create()
+    descriptors = [os.dup(fd) for fd in judge.fds]
+    bot = Channel.attach("shm {} {} {}".format(*descriptors))
+    assert judge.announce() == "shm {} {} {}".format(*judge.fds)
+
+    judge.outgoing.put(42)
+    judge.outgoing.put(1 << 63)
+    judge.signal()
+    assert bot.receive() == 42
+    assert bot.receive() == 1 << 63
+
+    bot.outgoing.put(7)
+    bot.signal()
+    assert os.eventfd_read(judge.bot_event) == 1
+    assert judge.incoming.get() == 7
+    assert judge.incoming.get() is None
+
+    bot.close()
+    judge.close()
@@ -0,0 +1,77 @@
+from onze.stats import SPRT, Histogram
+from random import Random
+import math
+
+
+def test_sprt_statistics():
+    test = SPRT(lower=0, upper=10)
+    assert test.decision() is None
+
+    for value in (4, 8, 6, 2):
+        test.add(value)
+
+    assert test.count == 4
+    assert test.mean == 5
+    assert math.isclose(test.variance, 20 / 3)
+    assert math.isclose(test.llr, 10 * (20 - 4 * 5) / (20 / 3))
+    assert math.isclose(test.bounds[0], math.log(0.05 / 0.95))
+    assert math.isclose(test.bounds[1], math.log(0.95 / 0.05))
+
+
+def test_sprt_constant():
+    test = SPRT(lower=0, upper=10)
+
+    for _ in range(100):
+        test.add(3)
+
+    assert test.variance == 0
+    assert test.decision() is None
+
+
+def test_sprt_minimum():
+    test = SPRT(lower=0, upper=50)
+    test.add(10)
+    test.add(15)
+    assert test.llr <= test.bounds[0]
+    assert test.decision() is None
+
+    for value in (10, 15) * 4:
+        test.add(value)
+
+    assert test.count == 10
+    assert test.decision() is False
+
+
+def test_sprt_decision():
+    random = Random(42)
+
+    for mean, expected in ((0, False), (50, True), (-50, False)):
+        test = SPRT(lower=0, upper=50, alpha=0.01, beta=0.01)
+        count = 0
+
+        while test.decision() is None:
+            test.add(random.gauss(mean, 200))
+            count += 1
+
+        assert test.decision() is expected
+        assert count < 1000
+
+
+def test_histogram():
+    histogram = Histogram()
+    assert histogram.quantile(0.5) == 0
+
+    values = list(range(1, 100_001))
+    Random(42).shuffle(values)
+
+    for value in values:
+        histogram.add(value * 1000)
+
+    assert histogram.count == 100_000
+    assert histogram.total == sum(values) * 1000
+    assert histogram.maximum == 100_000_000
+    assert histogram.quantile(1) == histogram.maximum
+
+    for fraction in (0.01, 0.5, 0.95, 0.99):
+        exact = fraction * histogram.maximum
+        assert exact <= histogram.quantile(fraction) <= exact * 2 ** (1 / 8) + 1000
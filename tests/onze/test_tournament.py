@@ -0,0 +1,217 @@
+from onze.tournament import (
+    Match,
+    Standing,
+    _get_result,
+    pair_differences,
+    run_match,
+    run_tournament,
+    schedule,
+    tally,
+)
+from onze.ratings import Ratings
+from pathlib import Path
+import multiprocessing
+import os
+import pytest
+import sqlite3
+import sys
+
+bot_script = """\
+#!{executable}
+while (message := input()) != "end":
+    if message == "bid ?":
+        print({bid}, flush=True)
+
+    if message == "card ?":
+        print("SA", flush=True)
+"""
+
+
+def make_bot(path: Path, bid: int, features: str) -> str:
+    path.mkdir()
+    run = path / "run"
+    run.write_text(bot_script.format(executable=sys.executable, bid=bid))
+    run.chmod(0o755)
+    (path / "features").write_text(features)
+    return str(path)
+
+
+def test_schedule():
+    matches = schedule(["a", "b", "c"], 4, seed=42)
+    assert len(matches) == 12
+    assert [match.index for match in matches] == list(range(12))
+    assert len({match.seed for match in matches}) == 12
+    assert matches == schedule(["a", "b", "c"], 4, seed=42)
+
+    for first, second in (("a", "b"), ("a", "c"), ("b", "c")):
+        teams = [
+            match.teams for match in matches if set(match.teams) == {first, second}
+        ]
+        assert teams.count((first, second)) == 2
+        assert teams.count((second, first)) == 2
+
+
+def test_schedule_duplicate():
+    matches = schedule(["a", "b", "c"], 2, seed=42, duplicate=True)
+    assert len(matches) == 12
+
+    for first, second in zip(matches[::2], matches[1::2]):
+        assert first.seed == second.seed
+        assert first.deal == second.deal
+        assert first.teams == second.teams[::-1]
+
+    assert len({match.deal for match in matches}) == 6
+
+
+def test_pair_differences():
+    differences = pair_differences(
+        [
+            (Match(1, ("b", "a"), 1, 0), {0: 200, 1: 510}),
+            (Match(2, ("a", "b"), 2, 1), {0: 80, 1: 500}),
+            (Match(0, ("a", "b"), 1, 0), {0: 400, 1: 350}),
+            (Match(4, ("a", "c"), 3, 2), {0: 505, 1: 20}),
+            (Match(5, ("c", "a"), 3, 2), {0: 100, 1: 500}),
+        ]
+    )
+    assert differences == {("a", "b"): [360], ("a", "c"): [885]}
+
+
+def test_tally():
+    standings = tally(
+        [
+            (Match(0, ("a", "b"), 1, 0), {0: 510, 1: 200}),
+            (Match(1, ("b", "a"), 2, 1), {0: 300, 1: 300}),
+            (Match(2, ("a", "c"), 3, 2), {0: -50, 1: 505}),
+        ]
+    )
+    assert standings == {
+        "a": Standing("a", 3, 1, 1, 1, 760, 1005),
+        "b": Standing("b", 2, 0, 1, 1, 500, 810),
+        "c": Standing("c", 1, 1, 0, 0, 505, -50),
+    }
+
+
+def test_run_tournament(tmp_path):
+    bots = [
+        make_bot(tmp_path / "pass", 0, "newgame\n"),
+        make_bot(tmp_path / "bid", 50, ""),
+    ]
+    ratings = tmp_path / "ratings.json"
+    standings = run_tournament(
+        [
+            *bots,
+            *("--games", "4", "--jobs", "2", "--seed", "1", "--max-rounds", "2"),
+            *("--ratings", str(ratings)),
+        ]
+    )
+    assert standings.keys() == set(bots)
+    assert Ratings.load(ratings).games == 4
+
+    for standing in standings.values():
+        assert standing.games == 4
+        assert standing.wins + standing.draws + standing.losses == 4
+
+    first, second = standings.values()
+    assert first.points_for == second.points_against
+
+
+def test_run_tournament_duplicate(tmp_path):
+    bots = [
+        make_bot(tmp_path / "pass", 0, "newgame\n"),
+        make_bot(tmp_path / "bid", 50, "newgame\n"),
+    ]
+    database = tmp_path / "results.db"
+    standings = run_tournament(
+        [
+            *bots,
+            *("--games", "2", "--duplicate", "--seed", "1", "--max-rounds", "1"),
+            *("--results-db", str(database)),
+        ]
+    )
+
+    for standing in standings.values():
+        assert standing.games == 4
+
+    with sqlite3.connect(database) as connection:
+        seeds = [seed for seed, in connection.execute("select seed from games")]
+        assert len(seeds) == 4
+        assert len(set(seeds)) == 2
+
+    connection.close()
+
+
+def test_run_match(tmp_path):
+    bots = [
+        make_bot(tmp_path / "pass", 0, "newgame\n"),
+        make_bot(tmp_path / "bid", 50, "newgame\n"),
+    ]
+    test = run_match(
+        [*bots, "--max-games", "5", "--jobs", "2", "--seed", "1", "--max-rounds", "0"]
+    )
+    assert test.count == 5
+    assert test.decision() is None
+
+    test = run_match(
+        [*bots, "--min-games", "3", "--jobs", "2", "--seed", "1", "--max-rounds", "0"]
+    )
+    assert test.count >= 3
+    assert test.decision() is not None
+
+
+def test_run_match_deal_order(tmp_path):
+    bots = [
+        make_bot(tmp_path / "pass", 0, "newgame\n"),
+        make_bot(tmp_path / "bid", 50, "newgame\n"),
+    ]
+    tests = [
+        run_match(
+            [*bots, "--min-games", "3", "--jobs", jobs, "--seed", "1"]
+            + ["--max-rounds", "0"]
+        )
+        for jobs in ("1", "4")
+    ]
+    assert tests[0].count == tests[1].count
+    assert tests[0].total == tests[1].total
+    assert tests[0].total_squares == tests[1].total_squares
+
+
+def test_run_match_failed_game(tmp_path, capsys):
+    bots = [
+        make_bot(tmp_path / "pass", 0, "newgame\n"),
+        make_bot(tmp_path / "bid", 50, "newgame\n"),
+    ]
+
+    # Crash the first time the bot is started
+    run = Path(bots[1]) / "run"
+    marker = tmp_path / "crashed"
+    run.write_text(
+        run.read_text().replace(
+            "while",
+            f"import os, pathlib\n"
+            f"if not os.path.exists({str(marker)!r}):\n"
+            f"    pathlib.Path({str(marker)!r}).touch()\n"
+            f"    raise SystemExit(1)\n"
+            f"while",
+            1,
+        )
+    )
+
+    test = run_match(
+        [*bots, "--max-games", "3", "--jobs", "1", "--seed", "1", "--max-rounds", "0"]
+    )
+    assert marker.exists()
+    assert test.count == 3
+    assert "failed, playing it again" in capsys.readouterr().out
+
+
+def test_get_result_crashed_worker():
+    results: multiprocessing.Queue = multiprocessing.Queue()
+    results.put((Match(0, ("a", "b"), 1, 0), None))
+    worker = multiprocessing.Process(target=os._exit, args=(3,))
+    worker.start()
+    worker.join()
+
+    assert _get_result(results, [worker]) == (Match(0, ("a", "b"), 1, 0), None)
+
+    with pytest.raises(RuntimeError, match="exit codes: 3"):
+        _get_result(results, [worker])